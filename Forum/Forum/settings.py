@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +84,22 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# 'shared' - кэш, общий для процессов (версии контента и дерева, api.caching):
+# в разработке файловый, чтобы изменения из run_tasks видел runserver,
+# в промышленных настройках - Redis (Forum.settings_production)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(Path(tempfile.gettempdir()) / 'forum-shared-cache'),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -129,3 +147,42 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
+
+# Очередь отложенных задач (api.tasks): при True задачи выполняются
+# сразу после фиксации транзакции, без обработчика run_tasks
+TASKS_EAGER = False
+
+# Сжатие ответов (api.middleware.CompressionMiddleware): ответы меньше
+# порога в байтах отдаются как есть
+COMPRESSION_MIN_SIZE = 1024
+
+# Время жизни закэшированных сжатых ответов (api.mixins.CompressedCacheMixin),
+# 0 отключает кэш
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Кэш сериализованных фрагментов тем и сообщений в памяти процесса
+# (api.fragments), предельный объем в байтах, 0 отключает кэш
+FRAGMENT_CACHE_MAX_BYTES = 32 * 2 ** 20
+
+# Время жизни закэшированного count списков со способом подсчета 'cached'
+# (api.paginator), в секундах
+PAGINATION_COUNT_TIMEOUT = 60
+
+# Дерево форума (tree/, api.tree): снимок со старыми счетчиками тем и
+# сообщений перестраивается не чаще, чем раз в столько секунд
+TREE_COUNTS_MAX_AGE = 30
+
+# Рассылка уведомлений (api.notifications): размер пачки вставки
+# уведомлений и чтения следящих за темой
+NOTIFICATION_BATCH_SIZE = 1000
+
+# Период полураспада рейтингов тем и сообщений (api.ranking), в часах
+RANKING_HALF_LIFE_HOURS = 24
+
+# Журнал изменений (changes/): пропуск id закрывается через столько секунд
+# после первого наблюдения, чтобы клиент не пропустил транзакции,
+# зафиксированные не по порядку id
+CHANGES_SETTLE_SECONDS = 1
+
+# Тесты выполняются параллельно по процессу на ядро (см. api.testing)
+TEST_RUNNER = 'api.testing.ParallelTestRunner'
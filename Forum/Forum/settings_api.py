@@ -0,0 +1,41 @@
+"""
+Облегченные настройки только для API: без админки, сессий, сообщений,
+статики и browsable API. Аутентификация только по токену.
+Приложения rest_framework и django_filters дают только шаблоны и
+теги browsable API и форм фильтров, без них библиотеки работают как
+обычные пакеты.
+Используются рабочими процессами, которым не нужна админка, например
+    python manage.py serve --settings=Forum.settings_api
+Сравнение с полными настройками: python manage.py profile_startup
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'django_filters',
+)]
+
+# Пользователя и CSRF для токенов определяет сам DRF
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+)]
+
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    'django.template.context_processors.request',
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+}
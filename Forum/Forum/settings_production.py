@@ -0,0 +1,67 @@
+"""
+Настройки для промышленного запуска (manage.py serve).
+Параметры окружения:
+    DJANGO_SECRET_KEY - секретный ключ (обязателен),
+    DJANGO_ALLOWED_HOSTS - разрешенные хосты через запятую,
+    DJANGO_DATABASE_NAME - путь к файлу базы SQLite,
+    DJANGO_REDIS_URL - адрес Redis для кэшей, по умолчанию redis://127.0.0.1:6379,
+    DJANGO_API_ONLY=1 - основа из облегченных настроек Forum.settings_api,
+    SERVER_WORKERS, SERVER_THREADS, SERVER_WORKER_CONNECTIONS,
+    SERVER_MAX_REQUESTS - параметры serve
+"""
+import os
+
+if os.environ.get('DJANGO_API_ONLY') == '1':
+    from .settings_api import *  # noqa: F401,F403
+else:
+    from .settings import *  # noqa: F401,F403
+
+# При DEBUG = True Django хранит в памяти каждый выполненный запрос к базе
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [host for host in os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+if os.environ.get('DJANGO_DATABASE_NAME'):
+    DATABASES['default']['NAME'] = os.environ['DJANGO_DATABASE_NAME']
+
+# Постоянные соединения: потоки рабочих процессов переиспользуют их между запросами
+DATABASES['default']['CONN_MAX_AGE'] = 60
+
+# Кэши общие для всех рабочих процессов и серверов: ответы, версии контента
+# и дерева. Разные базы Redis, потому что clear() очищает базу целиком
+REDIS_URL = os.environ.get('DJANGO_REDIS_URL', 'redis://127.0.0.1:6379').rstrip('/')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/0',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/1',
+    },
+}
+
+# Журнал каждого запроса сервера отключен, ошибки пишутся как обычно
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'django': {'handlers': ['console'], 'level': 'WARNING'},
+        'django.server': {'handlers': ['console'], 'level': 'WARNING',
+                          'propagate': False},
+        'api': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Параметры gunicorn (api.server, команда serve)
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))
+SERVER_WORKER_CONNECTIONS = int(os.environ.get('SERVER_WORKER_CONNECTIONS', 1000))
+SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 10000))
+SERVER_MAX_REQUESTS_JITTER = SERVER_MAX_REQUESTS // 10
@@ -1,5 +1,33 @@
 from django.contrib import admin
-from .models import Chapter, Category, Theme, Message
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from .models import Chapter, Category, Theme, Message, MessageRelation, ArchivedTheme, Job, Task, MessageRevision
+from .paginator import EstimatedCountPaginator
+
+
+class ChangelistRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле ввода id без запроса подписи связанного объекта для каждой строки"""
+
+    def label_and_url_for_value(self, value):
+        return '', ''
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовая админка для больших таблиц: без точного COUNT(*) в changelist,
+    с оценкой количества строк по плану запроса и вводом id вместо
+    выпадающих списков у внешних ключей в list_editable
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist_form(self, request, **kwargs):
+        widgets = kwargs.setdefault('widgets', {})
+        for name in self.list_editable:
+            field = self.model._meta.get_field(name)
+            if field.many_to_one:
+                widgets.setdefault(name, ChangelistRawIdWidget(
+                    field.remote_field, self.admin_site))
+        return super().get_changelist_form(request, **kwargs)
 
 
 @admin.register(Chapter)
@@ -16,20 +44,87 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'chapter']
     list_editable = ['name', 'chapter']
     list_display_links = ['id']
+    list_select_related = ['chapter']
+    search_fields = ['name']
 
 
 @admin.register(Theme)
-class ThemeAdmin(admin.ModelAdmin):
+class ThemeAdmin(LargeTableAdmin):
     """Регистрация модели Theme в админке"""
     list_display = ['id', 'name', 'status', 'category', 'user', 'created_at']
     list_editable = ['name', 'status', 'category']
     list_display_links = ['id']
+    list_select_related = ['category', 'user']
+    autocomplete_fields = ['category']
+    raw_id_fields = ['user']
+    date_hierarchy = 'created_at'
+    search_fields = ['name']
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(LargeTableAdmin):
     """Регистрация модели Message в админке"""
     list_display = ['id', 'theme', 'user', 'created_at']
     list_editable = ['theme']
     list_display_links = ['id']
+    list_select_related = ['theme', 'user']
+    raw_id_fields = ['theme', 'user']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(MessageRelation)
+class MessageRelationAdmin(LargeTableAdmin):
+    """Регистрация модели MessageRelation в админке"""
+    list_display = ['id', 'message', 'user', 'like']
+    list_display_links = ['id']
+    list_select_related = ['message', 'user']
+    raw_id_fields = ['message', 'user']
+    list_filter = ['like']
+
+
+@admin.register(ArchivedTheme)
+class ArchivedThemeAdmin(LargeTableAdmin):
+    """Регистрация модели ArchivedTheme в админке (только чтение)"""
+    list_display = ['id', 'name', 'category', 'messages_count', 'archived_at']
+    list_select_related = ['category']
+    exclude = ['payload']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Регистрация модели Job в админке"""
+    list_display = ['id', 'kind', 'target_id', 'status', 'processed',
+                    'total', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['processed', 'total', 'progress', 'error',
+                       'started_at', 'finished_at']
+    raw_id_fields = ['user']
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    """Регистрация модели Task в админке"""
+    list_display = ['id', 'name', 'status', 'attempts', 'run_after',
+                    'created_at', 'finished_at']
+    list_filter = ['name', 'status']
+
+
+@admin.register(MessageRevision)
+class MessageRevisionAdmin(LargeTableAdmin):
+    """Регистрация модели MessageRevision в админке (только чтение)"""
+    list_display = ['id', 'message', 'editor', 'valid_from', 'created_at']
+    list_select_related = ['message', 'editor']
+    raw_id_fields = ['message', 'editor']
+    exclude = ['patch']
+
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        #  регистрация задач очереди и обработчиков сигналов
+        from . import jobs, notifications  # noqa: F401
+        from . import signals
+        signals.connect()
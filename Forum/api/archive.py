@@ -0,0 +1,81 @@
+"""
+Архивация закрытых неактивных тем.
+Тема и ее сообщения переносятся в таблицу ArchivedTheme: сообщения
+сериализуются в JSON и сжимаются zlib в одно бинарное поле, после чего
+исходные строки удаляются из горячих таблиц пачками
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .deletion import DEFAULT_BATCH_SIZE, purge_queryset
+from .models import ArchivedTheme, CategoryCounter, Message, Theme, UserStats
+
+
+def pack_messages(messages):
+    """Сериализует список сообщений в сжатый JSON"""
+    data = json.dumps(messages, cls=DjangoJSONEncoder,
+                      ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'), 9)
+
+
+def unpack_messages(payload):
+    """Распаковывает сжатый JSON с сообщениями архивной темы"""
+    return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+
+def inactive_themes(inactive_days):
+    """Закрытые темы без активности за последние inactive_days дней"""
+    cutoff = timezone.now() - timedelta(days=inactive_days)
+    return Theme.objects.filter(status=False).annotate(
+        last_activity=Coalesce(
+            Greatest(Max('messages__updated_at'), 'created_at'),
+            'created_at'),
+    ).filter(last_activity__lt=cutoff)
+
+
+def archive_theme(theme, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Переносит тему в архив и удаляет ее из горячих таблиц в одной
+    транзакции: при ошибке удаления архивная запись не остается рядом с
+    исходной темой. Повторный запуск для той же темы безопасен: архивная
+    запись перезаписывается
+    """
+    with transaction.atomic():
+        messages = list(
+            Message.objects.filter(theme=theme)
+            .annotate(likes_count=Count('messagerelation',
+                                        filter=Q(messagerelation__like=True)))
+            .order_by('created_at', 'id')
+            .values('id', 'user_id', 'reply_to_id', 'content', 'created_at',
+                    'updated_at', 'likes_count'))
+        for message in messages:
+            message['user'] = message.pop('user_id')
+            message['reply_to'] = message.pop('reply_to_id')
+        last_activity = max(
+            [theme.created_at] + [message['updated_at'] for message in messages])
+        archived, _ = ArchivedTheme.objects.update_or_create(
+            id=theme.id,
+            defaults={
+                'category_id': theme.category_id,
+                'name': theme.name,
+                'user_id': theme.user_id,
+                'created_at': theme.created_at,
+                'last_activity_at': last_activity,
+                'messages_count': len(messages),
+                'payload': pack_messages(messages),
+            })
+        deltas = UserStats.objects.removal_deltas(
+            Message.objects.filter(theme=theme), Theme.objects.filter(pk=theme.pk))
+        counters = CategoryCounter.objects.removal_deltas(
+            Theme.objects.filter(pk=theme.pk))
+        purge_queryset(Theme.all_objects.filter(pk=theme.pk), batch_size)
+        UserStats.objects.apply_deltas(deltas)
+        CategoryCounter.objects.apply_deltas(counters)
+    return archived
@@ -0,0 +1,471 @@
+"""
+Бенчмарки производительности, запускаются командой benchmark <имя>.
+Бенчмарк регистрируется декоратором benchmark и возвращает список
+словарей-строк, которые команда выводит таблицей. Бенчмарки с uses_db=True
+выполняются на временной тестовой базе и не затрагивают рабочие данные
+"""
+import http.client
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from .compression import ENCODERS
+
+from .history import apply_patch, make_patch
+from .models import Category, Chapter, Message, Theme
+
+BENCHMARKS = {}
+
+WORDS = ('форум тема сообщение ответ цитата раздел категория модератор '
+         'пользователь лайк запрос база индекс страница кэш').split()
+
+
+def benchmark(name, uses_db=False):
+    """Регистрирует функцию как бенчмарк"""
+    def decorator(func):
+        func.uses_db = uses_db
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def timed(func, *args, repeat=1):
+    """Лучшее время выполнения func за repeat запусков, в миллисекундах"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def random_text(words, seed=0):
+    """Псевдослучайный текст из words слов, разбитый на абзацы"""
+    rnd = random.Random(seed)
+    lines = []
+    for start in range(0, words, 12):
+        lines.append(' '.join(rnd.choice(WORDS)
+                              for _ in range(min(12, words - start))))
+    return '\n'.join(lines)
+
+
+@benchmark('history')
+def history_storage(size=2000, edits=50):
+    """
+    Объем истории правок: дельты против полных копий.
+    size - число слов в сообщении, edits - число правок
+    """
+    rnd = random.Random(1)
+    versions = [random_text(size)]
+    for _ in range(edits):
+        words = versions[-1].split(' ')
+        words[rnd.randrange(len(words))] = rnd.choice(WORDS)
+        versions.append(' '.join(words))
+    patches = [make_patch(new, old)
+               for old, new in zip(versions, versions[1:])]
+    full = sum(len(version.encode('utf-8')) for version in versions[:-1])
+    compressed = sum(len(zlib.compress(version.encode('utf-8'), 9))
+                     for version in versions[:-1])
+    delta = sum(len(patch) for patch in patches)
+
+    def reconstruct():
+        content = versions[-1]
+        for patch in reversed(patches):
+            content = apply_patch(content, patch)
+        return content
+
+    elapsed, oldest = timed(reconstruct, repeat=5)
+    assert oldest == versions[0]
+    return [
+        {'storage': 'full copy', 'bytes_per_edit': full // edits},
+        {'storage': 'zlib copy', 'bytes_per_edit': compressed // edits},
+        {'storage': 'delta', 'bytes_per_edit': delta // edits,
+         'reconstruct_all_ms': round(elapsed, 2)},
+    ]
+
+
+def seed_forum(themes=10, messages_per_theme=100, words=40, seed=0):
+    """Заполняет базу темами и сообщениями, возвращает список тем"""
+    user = User.objects.create(username=f'bench{seed}')
+    chapter = Chapter.objects.create(name='bench')
+    category = Category.objects.create(chapter=chapter, name='bench')
+    theme_objs = Theme.objects.bulk_create([
+        Theme(category=category, name=f'theme {i}', user=user)
+        for i in range(themes)])
+    theme_objs = list(Theme.objects.filter(category=category).order_by('id'))
+    rnd = random.Random(seed)
+    messages = []
+    for theme in theme_objs:
+        previous = ''
+        for i in range(messages_per_theme):
+            text = random_text(words, seed=rnd.random())
+            #  каждый ответ цитирует предыдущее сообщение, как это делают на форуме
+            content = ''.join(f'> {line}\n' for line in previous.splitlines()) + text
+            messages.append(Message(user=user, theme=theme, content=content))
+            previous = text if i % 3 else content
+    Message.objects.bulk_create(messages, batch_size=500)
+    return theme_objs
+
+
+def content_bytes():
+    """Объем, занимаемый текстом сообщений в базе, в байтах"""
+    function = 'octet_length' if connection.vendor == 'postgresql' else 'length'
+    column = 'content' if connection.vendor == 'postgresql' else 'CAST(content AS BLOB)'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT SUM({function}({column})) FROM {Message._meta.db_table}')
+        return cursor.fetchone()[0] or 0
+
+
+@benchmark('compression', uses_db=True)
+def message_compression(themes=20, messages_per_theme=100, words=150, repeat=20):
+    """
+    Объем текста сообщений и время страницы списка до и после сжатия.
+    Данные создаются несжатыми, затем переводятся командой compress_messages
+    """
+    from .management.commands.compress_messages import compress_existing
+
+    field = Message._meta.get_field('content')
+    threshold = field.compress_threshold
+    field.compress_threshold = float('inf')
+    try:
+        theme_objs = seed_forum(themes, messages_per_theme, words)
+    finally:
+        field.compress_threshold = threshold
+    client = APIClient()
+    url = f'/api/v1/messages/?theme={theme_objs[0].id}&page=3'
+
+    def measure(stage):
+        elapsed, response = timed(client.get, url, repeat=repeat)
+        assert response.status_code == 200
+        return {'stage': stage, 'content_bytes': content_bytes(),
+                'list_page_ms': round(elapsed, 2)}
+
+    rows = [measure('plain')]
+    start = time.perf_counter()
+    converted = compress_existing()
+    rows.append(measure('compressed'))
+    rows[-1]['backfill_rows'] = converted
+    rows[-1]['backfill_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return rows
+
+
+def cpu_ms(func, *args, repeat=1, **kwargs):
+    """Среднее процессорное время func за repeat запусков, в миллисекундах"""
+    start = time.process_time()
+    for _ in range(repeat):
+        result = func(*args, **kwargs)
+    return (time.process_time() - start) * 1000 / repeat, result
+
+
+@benchmark('response_compression', uses_db=True)
+def response_compression(messages=200, repeat=20):
+    """
+    Размер и процессорное время ответов темы и списка сообщений:
+    без сжатия, со сжатием в middleware и из кэша сжатых ответов
+    """
+    theme = seed_forum(1, messages, words=30)[0]
+    client = APIClient()
+    urls = {
+        'theme-detail': f'/api/v1/themes/{theme.id}/',
+        'message-list': f'/api/v1/messages/?theme={theme.id}',
+    }
+    rows = []
+    for name, url in urls.items():
+        for encoding in ['identity'] + sorted(ENCODERS):
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+                no_cache, response = cpu_ms(
+                    client.get, url, repeat=repeat, HTTP_ACCEPT_ENCODING=encoding)
+            cache.clear()
+            miss, _ = cpu_ms(client.get, url, HTTP_ACCEPT_ENCODING=encoding)
+            hit, _ = cpu_ms(client.get, url, repeat=repeat,
+                            HTTP_ACCEPT_ENCODING=encoding)
+            rows.append({
+                'endpoint': name,
+                'encoding': encoding,
+                'bytes': len(response.content),
+                'no_cache_cpu_ms': round(no_cache, 2),
+                'cache_miss_cpu_ms': round(miss, 2),
+                'cache_hit_cpu_ms': round(hit, 2),
+            })
+    return rows
+
+
+@benchmark('fragments', uses_db=True)
+def fragment_caching(messages=500, themes=200, changed=10, repeat=20):
+    """
+    Процессорное время сериализации списка сообщений и тем: без кэша
+    фрагментов, с пустым кэшем, с заполненным кэшем и после изменения
+    changed процентов объектов
+    """
+    from .fragments import fragment_cache
+    from .serializers import MessageSerializer, ThemeSerializer
+    from .views import ThemeAPIList
+
+    theme = seed_forum(1, messages, words=30)[0]
+    seed_forum(themes - 1, 0, seed=1)
+    lists = {
+        'messages': (MessageSerializer,
+                     lambda: list(Message.objects.with_likes_count().filter(theme=theme))),
+        'themes': (ThemeSerializer, lambda: list(ThemeAPIList.queryset.all())),
+    }
+    rows = []
+    for name, (serializer_class, load) in lists.items():
+        objects = load()
+
+        def serialize():
+            return serializer_class(objects, many=True).data
+
+        with override_settings(FRAGMENT_CACHE_MAX_BYTES=0):
+            plain, expected = cpu_ms(serialize, repeat=repeat)
+        cache_ = fragment_cache()
+        cache_.clear()
+        cold, _ = cpu_ms(serialize)
+        warm, result = cpu_ms(serialize, repeat=repeat)
+        assert result == expected
+        step = max(1, 100 // max(changed, 1))
+        for obj in objects[::step]:
+            obj.save(update_fields=['updated_at'])
+        objects = load()
+        partial, _ = cpu_ms(serialize)
+        rows.append({
+            'list': name,
+            'objects': len(objects),
+            'no_cache_cpu_ms': round(plain, 2),
+            'cold_cpu_ms': round(cold, 2),
+            'warm_cpu_ms': round(warm, 2),
+            f'changed_{changed}pct_cpu_ms': round(partial, 2),
+            'cache_kb': round(cache_.stats()['bytes'] / 1024),
+        })
+    return rows
+
+
+@benchmark('rows', uses_db=True)
+def row_mapping(rows=200, repeat=20):
+    """
+    Процессорное время страницы из rows объектов: сериализатор (без кэша
+    фрагментов и с заполненным кэшем) против строк .values() и RowMapper.
+    Время включает чтение страницы из базы
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .fragments import fragment_cache
+    from .rows import MessageRowMapper, ThemeRowMapper
+    from .serializers import MessageSerializer, ThemeSerializer
+    from .views import MessageAPIList, ThemeAPIList
+
+    theme = seed_forum(1, rows, words=30)[0]
+    seed_forum(rows - 1, 0, seed=1)
+    lists = {
+        'messages': (MessageSerializer, MessageRowMapper(),
+                     MessageAPIList.queryset.filter(theme=theme)[:rows]),
+        'themes': (ThemeSerializer, ThemeRowMapper(),
+                   ThemeAPIList.queryset.all()[:rows]),
+    }
+    result = []
+    for name, (serializer_class, mapper, queryset) in lists.items():
+        def serialize():
+            return serializer_class(list(queryset.all()), many=True).data
+
+        def map_rows():
+            return mapper.map(mapper.values(queryset.all()))
+
+        with override_settings(FRAGMENT_CACHE_MAX_BYTES=0):
+            plain, expected = cpu_ms(serialize, repeat=repeat)
+        fragment_cache().clear()
+        serialize()
+        warm, _ = cpu_ms(serialize, repeat=repeat)
+        mapped, actual = cpu_ms(map_rows, repeat=repeat)
+        assert JSONRenderer().render(actual) == JSONRenderer().render(expected)
+        result.append({
+            'list': name,
+            'objects': len(actual),
+            'serializer_cpu_ms': round(plain, 2),
+            'fragments_warm_cpu_ms': round(warm, 2),
+            'rows_cpu_ms': round(mapped, 2),
+            'us_per_row': round(mapped * 1000 / max(len(actual), 1), 1),
+        })
+    return result
+
+
+@benchmark('digests', uses_db=True)
+def digest_building(subscriptions=100000, users=10000, themes=2000,
+                    messages=5000, batch_size=1000, sample=200):
+    """
+    Сборка дайджестов подписок: set-based запрос на пачку пользователей
+    (api.digests.run_digests) против цикла по пользователям и их подпискам.
+    Цикл измеряется на sample пользователях и пересчитывается на всех
+    """
+    from datetime import timedelta
+
+    from django.db import reset_queries
+    from django.utils import timezone
+
+    from .digests import run_digests
+    from .models import ThemeSubscription
+
+    rnd = random.Random(0)
+    theme_objs = seed_forum(themes, 0)
+    author = theme_objs[0].user
+    User.objects.bulk_create(
+        [User(username=f'reader{i}') for i in range(users)], batch_size=1000)
+    user_ids = list(User.objects.filter(
+        username__startswith='reader').values_list('pk', flat=True))
+    per_user = subscriptions // users
+    since = timezone.now() - timedelta(days=1)
+    ThemeSubscription.objects.bulk_create([
+        ThemeSubscription(user_id=user_id, theme_id=theme.pk, digested_at=since)
+        for user_id in user_ids for theme in rnd.sample(theme_objs, per_user)],
+        batch_size=2000)
+    Message.objects.bulk_create([
+        Message(user=author, theme=rnd.choice(theme_objs), content='new')
+        for _ in range(messages)], batch_size=1000)
+    cutoff = timezone.now()
+
+    def per_user_loop(ids):
+        digests = {}
+        for user_id in ids:
+            for subscription in ThemeSubscription.objects.filter(user_id=user_id):
+                new = Message.objects.filter(
+                    theme_id=subscription.theme_id,
+                    created_at__gt=subscription.digested_at,
+                    created_at__lte=cutoff).exclude(user_id=user_id).count()
+                if new:
+                    digests.setdefault(user_id, []).append(new)
+        return digests
+
+    with override_settings(DEBUG=True):
+        reset_queries()
+        loop_ms, loop_digests = timed(per_user_loop, user_ids[:sample])
+        loop_queries = len(connection.queries)
+        delivered = {}
+        reset_queries()
+        set_ms, result = timed(run_digests, delivered.update, batch_size)
+        set_queries = len(connection.queries)
+    assert all(len(delivered.get(user_id, [])) == len(loop_digests.get(user_id, []))
+               for user_id in user_ids[:sample])
+    return [
+        {'method': 'per_user_loop', 'users': users,
+         'subscriptions': ThemeSubscription.objects.count(),
+         'ms': round(loop_ms * users / sample), 'queries': loop_queries * users // sample,
+         'note': f'оценка по {sample} пользователям'},
+        {'method': 'set_based', 'users': result['users'],
+         'subscriptions': ThemeSubscription.objects.count(),
+         'ms': round(set_ms), 'queries': set_queries,
+         'note': f'дайджестов {result["digests"]}'},
+    ]
+
+
+def _run_manage(env, *args, **kwargs):
+    """Запускает manage.py в отдельном процессе с заданным окружением"""
+    return subprocess.Popen(
+        [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+
+
+def _listener():
+    """
+    Слушающий сокет на свободном порту, передается серверу через
+    --bind fd://<номер>: соединения ждут в очереди сокета до готовности
+    рабочих процессов
+    """
+    return socket.create_server(('127.0.0.1', 0))
+
+
+def _load(port, path, concurrency, seconds):
+    """Нагрузка из concurrency потоков в течение seconds, возвращает задержки"""
+    deadline = time.monotonic() + seconds
+    latencies = []
+    errors = []
+
+    def client():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            finally:
+                connection.close()
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(1)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), len(errors)
+
+
+@benchmark('server')
+def server_throughput(workers=0, threads=4, concurrency=16, seconds=5,
+                      themes=20):
+    """
+    Пропускная способность команды serve в зависимости от числа процессов.
+    Сервер запускается с Forum.settings_production на временной базе
+    (нужен Redis, DJANGO_REDIS_URL), нагрузку создают concurrency
+    клиентских потоков этого процесса.
+    workers=0 - ряд 1, 2, 4 ... до удвоенного числа ядер
+    """
+    cores = os.cpu_count() or 1
+    counts = [workers] if workers else sorted(
+        {2 ** i for i in range(8) if 2 ** i <= 2 * cores})
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE='Forum.settings_production',
+                   DJANGO_SECRET_KEY='benchmark',
+                   DJANGO_ALLOWED_HOSTS='127.0.0.1',
+                   DJANGO_DATABASE_NAME=os.path.join(directory, 'db.sqlite3'))
+        _run_manage(env, 'migrate').wait()
+        _run_manage(env, 'shell', '-c', 'from api.benchmarks import seed_forum; '
+                    f'seed_forum({themes}, 5)').wait()
+        rows = []
+        listener = _listener()
+        port = listener.getsockname()[1]
+        for count in counts:
+            server = _run_manage(
+                env, 'serve', '--bind', f'fd://{listener.fileno()}',
+                '--workers', str(count), '--threads', str(threads),
+                pass_fds=(listener.fileno(),))
+            try:
+                _load(port, '/api/v1/themes/', concurrency, 1)
+                latencies, errors = _load(
+                    port, '/api/v1/themes/', concurrency, seconds)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+            rows.append({
+                'cores': cores,
+                'workers': count,
+                'threads': threads,
+                'requests_per_s': round(len(latencies) / seconds, 1),
+                'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1)
+                if latencies else '',
+                'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1)
+                if latencies else '',
+                'errors': errors,
+            })
+        listener.close()
+    return rows
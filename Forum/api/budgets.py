@@ -0,0 +1,275 @@
+"""
+Бюджеты эндпоинтов api.urls: число SQL запросов, суммарное время SQL
+и размер ответа на эталонном наборе данных (seed()).
+Каждый маршрут api.urls обязан иметь бюджет; маршруты подключаемых
+приложений (include, djoser) не проверяются. Запрос выполняется с
+пустыми кэшами ответов и фрагментов (худший случай) внутри транзакции,
+которая затем откатывается, поэтому изменяющие запросы не влияют
+друг на друга.
+Число запросов и размер ответа проверяет BudgetTestCase (добавляется
+ParallelTestRunner к набору тестов, метка budgets), таблицу бюджетов и
+фактических значений, включая время SQL, выводит команда check_budgets.
+Число запросов не должно зависеть от числа строк в ответе: если новое
+вложенное поле сериализатора добавляет запрос на объект, бюджет будет
+превышен на наборе seed(), где в каждом списке несколько объектов
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from rest_framework.test import APIClient
+
+from . import factories
+from .archive import archive_theme
+from .caching import shared_cache
+from .fragments import fragment_cache
+from .history import record_revision
+from .models import Job, Message, Theme, ThemeSubscription
+from .notifications import notify
+
+
+class Budget:
+    """
+    Бюджет маршрута и запрос, которым он проверяется.
+    args, params и body - функции от набора данных seed(),
+    user - 'admin', 'author' (автор первых темы и сообщения) или None,
+    settings - настройки, переопределяемые на время запроса
+    """
+
+    def __init__(self, queries, max_bytes, sql_ms=50, method='get', args=None,
+                 params=None, body=None, user=None, status=200, settings=None):
+        self.queries = queries
+        self.max_bytes = max_bytes
+        self.sql_ms = sql_ms
+        self.method = method
+        self.args = args
+        self.params = params
+        self.body = body
+        self.user = user
+        self.status = status
+        self.settings = settings or {}
+
+
+BUDGETS = {
+    #  разделы и категории
+    'chapter-list': Budget(2, 200),
+    'chapter-detail': Budget(4, 500, args=lambda d: [d.chapters[0].pk]),
+    'chapter-update': Budget(
+        3, 100, method='patch', args=lambda d: [d.chapters[0].pk],
+        body=lambda d: {'description': 'desc'}, user='admin'),
+    'chapter-create': Budget(
+        2, 100, method='post', body=lambda d: {'name': 'chapter'},
+        user='admin', status=201),
+    'category-list': Budget(3, 700),
+    'category-detail': Budget(6, 1200, args=lambda d: [d.categories[0].pk]),
+    'category-update': Budget(
+        3, 100, method='patch', args=lambda d: [d.categories[0].pk],
+        body=lambda d: {'description': 'desc'}, user='admin'),
+    'category-create': Budget(
+        3, 100, method='post', user='admin', status=201,
+        body=lambda d: {'chapter': d.chapters[0].pk, 'name': 'category'}),
+    'tree': Budget(6, 750),
+
+    #  темы
+    'theme-list': Budget(5, 4200),
+    'theme-trending': Budget(5, 4500),
+    'theme-detail': Budget(5, 1700, args=lambda d: [d.themes[0].pk]),
+    'theme-update': Budget(
+        4, 100, method='patch', args=lambda d: [d.themes[0].pk],
+        body=lambda d: {'name': 'theme'}, user='author'),
+    'theme-create': Budget(
+        11, 100, method='post', user='author', status=201,
+        body=lambda d: {'category': d.categories[0].pk, 'name': 'theme',
+                        'user': d.users[0].pk}),
+    'theme-delete': Budget(
+        19, 0, method='delete', args=lambda d: [d.themes[0].pk],
+        user='admin', status=204),
+    'theme-watched': Budget(1, 800, user='author'),
+    'theme-watch': Budget(5, 100, method='post', args=lambda d: [d.themes[-1].pk],
+                          user='author', status=201),
+    'archived-theme-list': Budget(2, 400),
+    'archived-theme-detail': Budget(1, 700, args=lambda d: [d.archived.pk]),
+
+    #  сообщения и оценки
+    'message-list': Budget(2, 3400),
+    'message-top': Budget(2, 5200),
+    'message-detail': Budget(1, 300, args=lambda d: [d.messages[0].pk]),
+    'message-update': Budget(
+        10, 300, method='patch', args=lambda d: [d.messages[0].pk],
+        body=lambda d: {'content': 'changed'}, user='author'),
+    'message-create': Budget(
+        12, 200, method='post', user='author', status=201,
+        body=lambda d: {'theme': d.themes[0].pk, 'content': 'content',
+                        'user': d.users[0].pk}),
+    'message-delete': Budget(
+        11, 0, method='delete', args=lambda d: [d.messages[0].pk],
+        user='admin', status=204),
+    'message-history': Budget(2, 400, args=lambda d: [d.messages[0].pk],
+                              user='admin'),
+    'message-thread': Budget(2, 900, args=lambda d: [d.messages[0].pk]),
+    'message-like': Budget(
+        8, 100, method='patch', args=lambda d: [d.relations[0].pk],
+        body=lambda d: {'like': False}, user='author'),
+
+    #  синхронизация, пользователи, фоновые операции
+    'changes': Budget(2, 2500, params=lambda d: {'since': 0, 'limit': 50},
+                      settings={'CHANGES_SETTLE_SECONDS': 0}),
+    'user-stats': Budget(1, 200, args=lambda d: [d.users[0].pk]),
+    'notification-list': Budget(2, 400, user='author'),
+    'notification-read': Budget(1, 100, method='post', user='author'),
+    'moderation-close-themes': Budget(
+        1, 500, method='post', user='admin', status=202,
+        body=lambda d: {'themes': [theme.pk for theme in d.themes]}),
+    'moderation-move-themes': Budget(
+        2, 500, method='post', user='admin', status=202,
+        body=lambda d: {'themes': [d.themes[0].pk], 'category': d.categories[1].pk}),
+    'moderation-delete-messages': Budget(
+        2, 500, method='post', user='admin', status=202,
+        body=lambda d: {'user': d.users[1].pk, 'since': '2020-01-01T00:00:00Z'}),
+    'job-detail': Budget(1, 300, args=lambda d: [d.job.pk], user='admin'),
+    'task-metrics': Budget(3, 200, user='admin'),
+}
+
+
+def routes():
+    """Имена маршрутов api.urls в порядке объявления"""
+    from .urls import urlpatterns
+    return [pattern.name for pattern in urlpatterns
+            if isinstance(pattern, URLPattern)]
+
+
+def seed():
+    """
+    Эталонный набор данных: в каждом списке несколько объектов,
+    одна архивная тема, сообщение с историей правок и веткой ответов
+    (с уведомлениями о них), тема без подписки автора и фоновая операция
+    """
+    data = factories.forum(users=4, chapters=2, categories=2, themes=3,
+                           messages=4, likes=2)
+    data.admin = User.objects.create(username='admin', is_staff=True)
+    closed = Theme.objects.create(category=data.categories[-1], name='archived',
+                                  user=data.users[0], status=False)
+    for i in range(2):
+        Message.objects.create(theme=closed, user=data.users[i],
+                               content=f'archived {i}')
+    data.archived = archive_theme(closed)
+    message = data.messages[0]
+    for content in ('content v2', 'content v3'):
+        old_content, old_updated_at = message.content, message.updated_at
+        message.content = content
+        message.save()
+        record_revision(message, old_content, old_updated_at, data.admin)
+    data.job = Job.objects.create(kind=Job.DELETE_CATEGORY,
+                                  target_id=data.categories[0].pk)
+    reply = Message.objects.create(theme=message.theme, user=data.users[1],
+                                   reply_to=message, content='reply')
+    nested = Message.objects.create(theme=message.theme, user=data.users[2],
+                                    reply_to=reply, content='nested reply')
+    for pk in (reply.pk, nested.pk):
+        notify(pk)
+    ThemeSubscription.objects.filter(
+        user=data.users[0], theme=data.themes[-1]).delete()
+    return data
+
+
+class QueryTimer:
+    """
+    Обертка выполнения запросов (connection.execute_wrapper), суммирующая
+    их время. Время в connection.queries округлено до миллисекунды и
+    быстрые запросы в нем нулевые
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def measure(name, data):
+    """
+    Выполняет запрос маршрута name на наборе data и возвращает
+    фактические значения и текст SQL запросов
+    """
+    budget = BUDGETS[name]
+    client = APIClient()
+    user = {'admin': data.admin, 'author': data.users[0]}.get(budget.user)
+    if user is not None:
+        client.force_authenticate(user)
+    url = reverse(name, args=budget.args(data) if budget.args else None)
+    kwargs = {'format': 'json'}
+    if budget.body:
+        kwargs['data'] = budget.body(data)
+    elif budget.params:
+        kwargs['data'] = budget.params(data)
+    cache.clear()
+    shared_cache().clear()
+    fragments = fragment_cache()
+    if fragments is not None:
+        fragments.clear()
+    with transaction.atomic(), override_settings(**budget.settings):
+        timer = QueryTimer()
+        with CaptureQueriesContext(connection) as context, \
+                connection.execute_wrapper(timer):
+            response = getattr(client, budget.method)(url, **kwargs)
+        transaction.set_rollback(True)
+    return {
+        'status': response.status_code,
+        'queries': len(context),
+        'sql_ms': timer.seconds * 1000,
+        'bytes': len(response.content),
+        'sql': [query['sql'] for query in context],
+    }
+
+
+def violations(name, actual, timing=True):
+    """
+    Список нарушений бюджета маршрута name, timing=False - без времени
+    SQL (зависит от машины, тесты его не проверяют)
+    """
+    budget = BUDGETS[name]
+    problems = []
+    if actual['status'] != budget.status:
+        problems.append(f'статус {actual["status"]}, ожидается {budget.status}')
+    if actual['queries'] > budget.queries:
+        problems.append(f'запросов {actual["queries"]} > {budget.queries}')
+    if timing and actual['sql_ms'] > budget.sql_ms:
+        problems.append(f'время SQL {actual["sql_ms"]:.1f} мс > {budget.sql_ms} мс')
+    if actual['bytes'] > budget.max_bytes:
+        problems.append(f'размер ответа {actual["bytes"]} > {budget.max_bytes}')
+    return problems
+
+
+def report(data):
+    """
+    Строки таблицы бюджетов и фактических значений для всех маршрутов
+    и SQL запросы маршрутов с нарушениями (имя -> список запросов)
+    """
+    rows, failed = [], {}
+    for name in routes():
+        if name not in BUDGETS:
+            rows.append({'route': name, 'result': 'нет бюджета'})
+            failed[name] = []
+            continue
+        budget = BUDGETS[name]
+        actual = measure(name, data)
+        problems = violations(name, actual)
+        if problems:
+            failed[name] = actual['sql']
+        rows.append({
+            'route': name,
+            'method': budget.method.upper(),
+            'status': actual['status'],
+            'queries': f'{actual["queries"]}/{budget.queries}',
+            'sql_ms': f'{actual["sql_ms"]:.1f}/{budget.sql_ms}',
+            'bytes': f'{actual["bytes"]}/{budget.max_bytes}',
+            'result': '; '.join(problems) or 'ok',
+        })
+    return rows, failed
@@ -0,0 +1,57 @@
+"""
+Версии контента форума для инвалидации кэша ответов.
+Версии хранятся в общем для всех процессов кэше (алиас 'shared' в
+CACHES): изменение в фоновой задаче или другом рабочем процессе
+инвалидирует ответы везде. Кроме общей версии есть версии областей:
+'theme:<id>' - сообщения и оценки темы, 'messages' - все сообщения.
+Сообщения и оценки увеличивают только версии своих областей, остальные
+изменения и массовые операции - общую версию. Ключ закэшированного
+ответа включает общую версию и версии своих областей
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+SHARED_CACHE_ALIAS = 'shared'
+CONTENT_VERSION_KEY = 'api:content-version'
+
+
+def shared_cache():
+    """Кэш, общий для рабочих процессов и фоновых задач"""
+    alias = SHARED_CACHE_ALIAS if SHARED_CACHE_ALIAS in settings.CACHES else 'default'
+    return caches[alias]
+
+
+def _version_keys(scopes):
+    return [CONTENT_VERSION_KEY] + [f'{CONTENT_VERSION_KEY}:{scope}' for scope in scopes]
+
+
+def content_version(*scopes):
+    """
+    Текущая версия контента: общая и версии областей scopes через точку.
+    Отсутствующая (вытесненная) версия начинается с текущего времени в
+    миллисекундах, чтобы не совпасть с прежними значениями
+    """
+    cache = shared_cache()
+    keys = _version_keys(scopes)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns() // 10 ** 6, timeout=None)
+            versions[key] = cache.get(key, 0)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump_content_version(*scopes):
+    """
+    Инвалидирует закэшированные ответы областей scopes, без scopes -
+    все закэшированные ответы
+    """
+    cache = shared_cache()
+    keys = _version_keys(scopes)[1:] if scopes else [CONTENT_VERSION_KEY]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 10 ** 6, timeout=None)
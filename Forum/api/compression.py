@@ -0,0 +1,57 @@
+"""
+Сжатие тел HTTP ответов с согласованием по заголовку Accept-Encoding.
+Поддерживается gzip и, если установлен пакет brotli, br
+"""
+import gzip
+import re
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+
+ENCODERS = {'gzip': lambda data: gzip.compress(data, compresslevel=6, mtime=0)}
+if brotli is not None:
+    ENCODERS['br'] = lambda data: brotli.compress(data, quality=5)
+
+#  порядок предпочтения при равном q
+PREFERENCE = ['br', 'gzip']
+
+ACCEPT_RE = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def min_size():
+    """Минимальный размер тела, начиная с которого ответ сжимается"""
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+
+def negotiate(accept_encoding):
+    """Выбирает кодировку из заголовка Accept-Encoding или None"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = ACCEPT_RE.match(part)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            weights[coding.lower()] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for coding in PREFERENCE:
+        if coding not in ENCODERS:
+            continue
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(data, encoding):
+    """Сжимает данные выбранной кодировкой"""
+    return ENCODERS[encoding](data)
@@ -0,0 +1,115 @@
+"""
+Пакетное физическое удаление записей.
+Стандартный QuerySet.delete() собирает коллектором все каскадно зависимые
+объекты в память и удаляет их в одной транзакции. Здесь удаление идет
+снизу вверх ограниченными пачками первичных ключей и сырыми DELETE,
+поэтому память и время блокировок не зависят от размера удаляемого дерева.
+Сигналы pre_delete/post_delete при таком удалении не отправляются,
+поэтому кэш ответов инвалидируется и журнал изменений пополняется явно.
+Связи PROTECT, RESTRICT и DO_NOTHING с существующими зависимыми записями
+останавливают удаление до первой удаленной строки (ProtectedError)
+"""
+from django.db import models, router
+from django.db.models import ProtectedError
+
+from .caching import bump_content_version
+from .models import ChangeLog
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def count_cascade(queryset):
+    """
+    Верхняя оценка числа строк, которые удалит purge_queryset: записи
+    queryset и все каскадно зависимые, по одному COUNT на каждую связь.
+    Строки, достижимые по нескольким связям, учитываются несколько раз
+    """
+    model = queryset.model
+    total = queryset.order_by().count()
+    for relation in model._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is not models.CASCADE:
+            continue
+        children = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': queryset.order_by().values('pk')})
+        total += count_cascade(children)
+    return total
+
+
+PROTECTING = (models.PROTECT, models.RESTRICT, models.DO_NOTHING)
+
+
+def _check_relation(relation, children):
+    """Отказ удалять записи, на которые ссылаются по защищающей или неизвестной связи"""
+    if relation.on_delete in PROTECTING:
+        protected = list(children[:10])
+        if protected:
+            raise ProtectedError(
+                f'Удаление запрещено связью {relation.related_model.__name__}.'
+                f'{relation.field.name} ({relation.on_delete.__name__})',
+                set(protected))
+    elif relation.on_delete not in (models.CASCADE, models.SET_NULL,
+                                    models.SET_DEFAULT) and children.exists():
+        raise ProtectedError(
+            f'Пакетное удаление не поддерживает on_delete связи '
+            f'{relation.related_model.__name__}.{relation.field.name}', set())
+
+
+def check_protected(queryset):
+    """
+    Проверяет все дерево каскадно зависимых записей queryset на ссылки
+    по защищающим связям до удаления, ProtectedError при их наличии
+    """
+    for relation in queryset.model._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        children = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': queryset.order_by().values('pk')})
+        if relation.on_delete is models.CASCADE:
+            check_protected(children)
+        elif relation.on_delete not in (models.SET_NULL, models.SET_DEFAULT):
+            _check_relation(relation, children)
+
+
+def purge_queryset(queryset, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+    """
+    Удаляет записи queryset вместе со всеми каскадно зависимыми записями.
+    Зависимости берутся из метаданных моделей: CASCADE удаляется рекурсивно,
+    SET_NULL и SET_DEFAULT обновляются одним UPDATE на пачку, защищающие
+    связи проверяются заранее (check_protected) и перед каждой пачкой.
+    on_batch(model, deleted) вызывается после каждой удаленной пачки.
+    Возвращает общее количество удаленных строк
+    """
+    check_protected(queryset)
+    return _purge(queryset, batch_size, on_batch)
+
+
+def _purge(queryset, batch_size, on_batch):
+    model = queryset.model
+    using = router.db_for_write(model)
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by().values_list(
+            'pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        relations = [(relation, relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': pks}))
+            for relation in model._meta.related_objects
+            if not relation.many_to_many]
+        for relation, children in relations:
+            if relation.on_delete not in (models.CASCADE, models.SET_NULL,
+                                          models.SET_DEFAULT):
+                _check_relation(relation, children)
+        for relation, children in relations:
+            if relation.on_delete is models.CASCADE:
+                deleted += _purge(children, batch_size, on_batch)
+            elif relation.on_delete is models.SET_NULL:
+                children.update(**{relation.field.name: None})
+            elif relation.on_delete is models.SET_DEFAULT:
+                children.update(**{relation.field.name: relation.field.get_default()})
+        ChangeLog.objects.record_purged(model, pks)
+        count = model._base_manager.filter(pk__in=pks)._raw_delete(using)
+        deleted += count
+        bump_content_version()
+        if on_batch is not None:
+            on_batch(model, count)
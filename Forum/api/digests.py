@@ -0,0 +1,86 @@
+"""
+Дайджесты подписок на темы: для пачки пользователей одним запросом с
+группировкой вычисляется, в каких темах из подписок появились чужие
+сообщения после границы последнего дайджеста (digested_at подписки).
+Сообщения соединяются с подписками по индексу (theme, created_at),
+после сборки граница пачки сдвигается одним UPDATE
+"""
+from django.db.models import Count, F, FilteredRelation, Min, Q
+from django.utils import timezone
+
+from .models import ThemeSubscription
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _with_new_messages(subscriptions, cutoff):
+    """Подписки с соединенными новыми сообщениями темы (связь new) до cutoff"""
+    return subscriptions.annotate(new=FilteredRelation(
+        'theme__messages',
+        condition=Q(theme__messages__created_at__gt=F('digested_at'),
+                    theme__messages__created_at__lte=cutoff,
+                    theme__messages__is_deleted=False)
+        & ~Q(theme__messages__user_id=F('user_id'))))
+
+
+def build_digests(user_ids, cutoff=None):
+    """
+    Дайджесты пользователей user_ids: {user_id: [{'theme', 'name',
+    'new_messages', 'first_message'}]} по темам с новыми сообщениями
+    """
+    cutoff = cutoff or timezone.now()
+    rows = _with_new_messages(ThemeSubscription.objects.filter(
+        user_id__in=user_ids, theme__is_deleted=False), cutoff).filter(
+        new__isnull=False).order_by().values(
+        'user_id', 'theme_id', 'theme__name').annotate(
+        new_messages=Count('new__id'), first_message=Min('new__id'))
+    digests = {}
+    for row in rows.order_by('user_id', 'theme_id'):
+        digests.setdefault(row['user_id'], []).append({
+            'theme': row['theme_id'],
+            'name': row['theme__name'],
+            'new_messages': row['new_messages'],
+            'first_message': row['first_message'],
+        })
+    return digests
+
+
+def mark_digested(user_ids, cutoff):
+    """Сдвигает границу дайджеста подписок пользователей user_ids до cutoff"""
+    return ThemeSubscription.objects.filter(
+        user_id__in=user_ids, digested_at__lt=cutoff).update(digested_at=cutoff)
+
+
+def run_digests(deliver, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Собирает дайджесты всех подписчиков пачками по batch_size
+    пользователей и передает словарь пачки в deliver. Граница
+    сдвигается после доставки, поэтому при ошибке deliver пачка будет
+    собрана заново. Возвращает число пользователей и дайджестов
+    """
+    cutoff = timezone.now()
+    subscribers = ThemeSubscription.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct()
+    users = digested = 0
+    last = 0
+    while True:
+        batch = list(subscribers.filter(user_id__gt=last)[:batch_size])
+        if not batch:
+            return {'users': users, 'digests': digested}
+        digests = build_digests(batch, cutoff)
+        if digests:
+            deliver(digests)
+        mark_digested(batch, cutoff)
+        users += len(batch)
+        digested += len(digests)
+        last = batch[-1]
+
+
+def watched_themes(user_id):
+    """Темы из подписок пользователя с числом новых сообщений после дайджеста"""
+    rows = _with_new_messages(ThemeSubscription.objects.filter(
+        user_id=user_id, theme__is_deleted=False), timezone.now()).order_by(
+        ).values('theme_id', 'theme__name').annotate(
+        new_messages=Count('new__id')).order_by('theme_id')
+    return [{'theme': row['theme_id'], 'name': row['theme__name'],
+             'new_messages': row['new_messages']} for row in rows]
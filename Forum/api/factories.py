@@ -0,0 +1,90 @@
+"""
+Фабрики данных для тестов и бенчмарков.
+Объекты создаются пачками через bulk_create: один INSERT на пачку вместо
+INSERT и обработчиков сигналов на каждый объект. Производные данные,
+которые при обычном сохранении создают обработчики сигналов (рейтинги,
+счетчики пользователей и списков, подписки авторов на темы, журнал
+изменений, версия контента), достраиваются одним проходом в finish()
+"""
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+
+from . import ranking
+from .caching import bump_content_version
+from .models import (Category, CategoryCounter, ChangeLog, Chapter, Message,
+                     MessageRelation, Theme, ThemeCounter, ThemeSubscription,
+                     UserStats)
+
+BATCH_SIZE = 500
+
+
+def create(model, rows, **common):
+    """
+    Создает объекты model из словарей rows (поля common общие для всех)
+    и возвращает их с заполненным pk
+    """
+    return model.objects.bulk_create(
+        [model(**common, **row) for row in rows], batch_size=BATCH_SIZE)
+
+
+def finish(users=(), categories=(), themes=(), messages=(), relations=()):
+    """Достраивает производные данные для объектов, созданных через create()"""
+    for model, objects in ((Category, categories), (Theme, themes),
+                           (Message, messages)):
+        ChangeLog.objects.record(model, [obj.pk for obj in objects],
+                                 ChangeLog.CREATED)
+    message_ids = {message.pk for message in messages}
+    message_ids.update(relation.message_id for relation in relations)
+    theme_ids = {theme.pk for theme in themes}
+    theme_ids.update(Message.objects.filter(pk__in=message_ids).values_list(
+        'theme_id', flat=True))
+    ranking.recompute_themes(theme_ids)
+    ranking.recompute_messages(message_ids)
+    user_ids = {user.pk for user in users}
+    user_ids.update(theme.user_id for theme in themes)
+    user_ids.update(Message.objects.filter(pk__in=message_ids).values_list(
+        'user_id', flat=True))
+    UserStats.objects.reconcile(user_ids)
+    ThemeCounter.objects.reconcile(theme_ids)
+    ThemeSubscription.objects.subscribe(
+        [(theme.user_id, theme.pk) for theme in themes]
+        + list(Message.objects.filter(pk__in=message_ids).values_list(
+            'user_id', 'theme_id')))
+    CategoryCounter.objects.reconcile(
+        {theme.category_id for theme in themes} | {
+            category.pk for category in categories})
+    bump_content_version()
+
+
+def forum(users=10, chapters=1, categories=2, themes=10, messages=10,
+          likes=0):
+    """
+    Связанный набор данных для больших тестов: users пользователей,
+    chapters разделов по categories категорий, themes тем в категории,
+    messages сообщений в теме и лайки likes первых пользователей на
+    каждое сообщение. Авторы тем и сообщений чередуются по кругу.
+    Возвращает SimpleNamespace со списками созданных объектов
+    """
+    assert likes <= users, 'Лайков на сообщение не больше, чем пользователей'
+    user_objs = create(User, [{'username': f'user{i}'} for i in range(users)])
+    chapter_objs = create(Chapter, [{'name': f'chapter {i}'}
+                                    for i in range(chapters)])
+    category_objs = create(Category, [
+        {'chapter': chapter, 'name': f'category {chapter.pk}.{i}'}
+        for chapter in chapter_objs for i in range(categories)])
+    theme_objs = create(Theme, [
+        {'category': category, 'name': f'theme {category.pk}.{i}',
+         'user': user_objs[i % users]}
+        for category in category_objs for i in range(themes)])
+    message_objs = create(Message, [
+        {'theme': theme, 'content': f'content {theme.pk}.{i}',
+         'user': user_objs[i % users]}
+        for theme in theme_objs for i in range(messages)])
+    relation_objs = create(MessageRelation, [
+        {'message': message, 'user': user, 'like': True}
+        for message in message_objs for user in user_objs[:likes]])
+    finish(user_objs, category_objs, theme_objs, message_objs, relation_objs)
+    return SimpleNamespace(users=user_objs, chapters=chapter_objs,
+                           categories=category_objs, themes=theme_objs,
+                           messages=message_objs, relations=relation_objs)
@@ -0,0 +1,64 @@
+"""
+Поле модели с прозрачным сжатием длинного текста.
+Значения длиннее порога хранятся в той же текстовой колонке в виде
+маркер + base85(zlib(текст)), короткие - как есть. Старые несжатые строки
+читаются без изменений, поэтому перевод существующих данных можно
+выполнять постепенно (команда compress_messages).
+Поиск по подстроке (contains, icontains) по сжатым значениям не работает
+"""
+import base64
+import zlib
+
+from django.db import models
+
+#  управляющие символы, которые не встречаются в обычном тексте сообщений
+COMPRESSED_PREFIX = '\x01'
+ESCAPED_PREFIX = '\x02'
+
+DEFAULT_COMPRESS_THRESHOLD = 1024
+
+
+def compress_text(value, threshold=DEFAULT_COMPRESS_THRESHOLD):
+    """Кодирует текст для хранения, сжимая его при выгоде"""
+    if len(value) >= threshold:
+        packed = COMPRESSED_PREFIX + base64.b85encode(
+            zlib.compress(value.encode('utf-8'), 6)).decode('ascii')
+        if len(packed) < len(value.encode('utf-8')):
+            return packed
+    if value.startswith((COMPRESSED_PREFIX, ESCAPED_PREFIX)):
+        return ESCAPED_PREFIX + value
+    return value
+
+
+def decompress_text(value):
+    """Декодирует хранимое значение обратно в текст"""
+    if value.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b85decode(value[1:])).decode('utf-8')
+    if value.startswith(ESCAPED_PREFIX):
+        return value[1:]
+    return value
+
+
+class CompressedTextField(models.TextField):
+    """TextField, прозрачно сжимающий значения длиннее compress_threshold"""
+
+    def __init__(self, *args, compress_threshold=DEFAULT_COMPRESS_THRESHOLD, **kwargs):
+        self.compress_threshold = compress_threshold
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compress_threshold != DEFAULT_COMPRESS_THRESHOLD:
+            kwargs['compress_threshold'] = self.compress_threshold
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress_text(value, self.compress_threshold)
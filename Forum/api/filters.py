@@ -0,0 +1,129 @@
+"""
+Фильтры списков тем и сообщений.
+IndexedFilterSet принимает только те сочетания фильтров и сортировки,
+которые обслуживаются одним индексом: фильтры равенства совпадают с
+началом индекса, следующий столбец индекса задает диапазон и сортировку.
+Остальные сочетания отклоняются с ошибкой 400, чтобы запрос клиента
+синхронизации не превращался в полный просмотр таблицы
+"""
+import django_filters
+from django.core.exceptions import ValidationError
+
+from .models import Message, Theme
+
+
+class IndexedFilterSet(django_filters.FilterSet):
+    """
+    FilterSet с проверкой сочетаний по индексам.
+    index_columns - столбцы индексов модели (включая первичный ключ),
+    equality_filters и range_filters - фильтры равенства и диапазонные
+    фильтры со столбцами, к которым они относятся.
+    Без ?ordering= при диапазонном фильтре результат сортируется по его столбцу
+    """
+    ordering_param = 'ordering'
+    index_columns = [('id',)]
+    equality_filters = {}
+    range_filters = {}
+
+    def used_columns(self):
+        data = self.form.cleaned_data
+        equality = {column for name, column in self.equality_filters.items()
+                    if data.get(name) not in (None, '')}
+        ranges = {column for name, column in self.range_filters.items()
+                  if data.get(name) not in (None, '')}
+        return equality, ranges
+
+    def ordering_column(self, ranges):
+        raw = self.data.get(self.ordering_param, '')
+        fields = [field.strip().lstrip('-') for field in raw.split(',')
+                  if field.strip()]
+        if len(fields) > 1:
+            return None
+        if fields:
+            return fields[0]
+        if ranges:
+            return next(iter(ranges))
+        return self.queryset.model._meta.ordering[0].lstrip('-')
+
+    def find_index(self, equality, ranges, ordering):
+        """Индекс, обслуживающий сочетание, или None"""
+        if len(ranges) > 1 or ordering is None:
+            return None
+        for columns in self.index_columns:
+            size = len(equality)
+            if set(columns[:size]) != equality or size >= len(columns):
+                continue
+            if ranges and ranges != {columns[size]}:
+                continue
+            if ordering == columns[size]:
+                return columns
+        return None
+
+    def is_valid(self):
+        if not super().is_valid():
+            return False
+        equality, ranges = self.used_columns()
+        ordering = self.ordering_column(ranges)
+        if self.find_index(equality, ranges, ordering) is None:
+            self.form.add_error(None, ValidationError(
+                'Сочетание фильтров и сортировки не поддерживается индексами. '
+                'Допустимые индексы: %(indexes)s',
+                params={'indexes': '; '.join(
+                    ', '.join(columns) for columns in self.index_columns)}))
+            return False
+        return True
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        _, ranges = self.used_columns()
+        if ranges and not self.data.get(self.ordering_param):
+            queryset = queryset.order_by(next(iter(ranges)))
+        return queryset
+
+
+class ThemeFilter(IndexedFilterSet):
+    """Фильтры списка тем"""
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name='created_at', lookup_expr='gt')
+    id_gt = django_filters.NumberFilter(field_name='id', lookup_expr='gt')
+
+    equality_filters = {'category': 'category', 'user': 'user',
+                        'status': 'status'}
+    range_filters = {'created_after': 'created_at', 'id_gt': 'id'}
+    index_columns = [
+        ('id',),
+        ('created_at',),
+        ('category', 'created_at'),
+        ('category', 'status', 'created_at'),
+        ('user', 'created_at'),
+        ('status', 'created_at'),
+    ]
+
+    class Meta:
+        model = Theme
+        fields = ['category', 'user', 'status']
+
+
+class MessageFilter(IndexedFilterSet):
+    """Фильтры списка сообщений, в том числе для инкрементальной синхронизации"""
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name='created_at', lookup_expr='gt')
+    id_gt = django_filters.NumberFilter(field_name='id', lookup_expr='gt')
+    updated_since = django_filters.IsoDateTimeFilter(
+        field_name='updated_at', lookup_expr='gte')
+
+    equality_filters = {'theme': 'theme'}
+    range_filters = {'created_after': 'created_at', 'id_gt': 'id',
+                     'updated_since': 'updated_at'}
+    index_columns = [
+        ('id',),
+        ('created_at',),
+        ('updated_at',),
+        ('theme', 'id'),
+        ('theme', 'created_at'),
+        ('theme', 'updated_at'),
+    ]
+
+    class Meta:
+        model = Message
+        fields = ['theme']
@@ -0,0 +1,102 @@
+"""
+Кэш сериализованных фрагментов объектов (api.serializers.FragmentCacheMixin).
+Фрагмент - представление объекта без изменчивых полей, ключ включает
+класс сериализатора, модель, pk и версию объекта (обычно updated_at),
+поэтому изменение объекта просто перестает совпадать со старым ключом.
+Кэш хранится в памяти процесса: LRU с ограничением суммарного размера
+фрагментов в байтах (FRAGMENT_CACHE_MAX_BYTES, 0 отключает кэш).
+Размер фрагмента оценивается по вложенным значениям через sys.getsizeof
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def fragment_size(value):
+    """Приблизительный объем памяти значения с вложенными значениями, в байтах"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(fragment_size(key) + fragment_size(item)
+                    for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(fragment_size(item) for item in value)
+    return size
+
+
+class FragmentCache:
+    """LRU кэш фрагментов с учетом размера, безопасен для потоков"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        """Найденные фрагменты по ключам, найденные становятся самыми свежими"""
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = entry[0]
+                self.hits += 1
+        return found
+
+    def set_many(self, fragments):
+        """Сохраняет фрагменты, вытесняя давно не использованные"""
+        sized = [(key, fragment, fragment_size(fragment))
+                 for key, fragment in fragments.items()]
+        with self.lock:
+            for key, fragment, size in sized:
+                if size > self.max_bytes:
+                    continue
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.size -= old[1]
+                self.entries[key] = (fragment, size)
+                self.size += size
+            while self.size > self.max_bytes:
+                _, (_, size) = self.entries.popitem(last=False)
+                self.size -= size
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set(self, key, fragment):
+        self.set_many({key: fragment})
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size,
+                    'max_bytes': self.max_bytes, 'hits': self.hits,
+                    'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def fragment_cache():
+    """Кэш фрагментов процесса или None, если он отключен"""
+    global _cache
+    max_bytes = getattr(settings, 'FRAGMENT_CACHE_MAX_BYTES', 32 * 2 ** 20)
+    if not max_bytes:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.max_bytes != max_bytes:
+            _cache = FragmentCache(max_bytes)
+        return _cache
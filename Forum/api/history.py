@@ -0,0 +1,92 @@
+"""
+История изменений сообщений в виде сжатых обратных дельт.
+Для каждой правки хранится патч, который из новой версии текста получает
+предыдущую. Полный текст хранится только у актуальной версии (Message.content),
+старые версии восстанавливаются последовательным применением патчей.
+
+Формат патча - JSON список операций над новой версией, сжатый zlib:
+    целое n > 0  - скопировать n символов
+    целое n < 0  - пропустить -n символов
+    строка       - вставить строку
+"""
+import json
+import re
+import zlib
+
+from .models import MessageRevision
+
+#  дельта строится по словам и пробельным промежуткам: это быстрее
+#  посимвольного сравнения и дает компактные патчи для текста
+TOKEN_RE = re.compile(r'\s+|[^\s]+')
+
+
+def make_patch(new, old):
+    """Строит сжатый патч, восстанавливающий old из new"""
+    #  difflib нужен только при правке, не при запуске процесса
+    from difflib import SequenceMatcher
+
+    new_tokens = TOKEN_RE.findall(new)
+    old_tokens = TOKEN_RE.findall(old)
+    matcher = SequenceMatcher(None, new_tokens, old_tokens, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(sum(map(len, new_tokens[i1:i2])))
+            continue
+        if i2 > i1:
+            ops.append(-sum(map(len, new_tokens[i1:i2])))
+        if j2 > j1:
+            ops.append(''.join(old_tokens[j1:j2]))
+    data = json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'), 9)
+
+
+def apply_patch(new, patch):
+    """Применяет патч к новой версии текста и возвращает предыдущую"""
+    ops = json.loads(zlib.decompress(bytes(patch)).decode('utf-8'))
+    parts = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.append(new[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(parts)
+
+
+def record_revision(message, old_content, old_updated_at, editor=None):
+    """Сохраняет предыдущую версию сообщения, если текст изменился"""
+    if old_content == message.content:
+        return None
+    return MessageRevision.objects.create(
+        message=message,
+        editor=editor if editor is not None and editor.is_authenticated else None,
+        patch=make_patch(message.content, old_content),
+        valid_from=old_updated_at)
+
+
+def message_history(message):
+    """
+    Восстанавливает все версии сообщения, начиная с актуальной.
+    Возвращает список словарей revision/content/valid_from/editor
+    """
+    versions = [{
+        'revision': None,
+        'content': message.content,
+        'valid_from': message.updated_at,
+        'editor': None,
+    }]
+    content = message.content
+    for revision in message.revisions.order_by('-id'):
+        content = apply_patch(content, revision.patch)
+        versions[-1]['editor'] = revision.editor_id
+        versions.append({
+            'revision': revision.id,
+            'content': content,
+            'valid_from': revision.valid_from,
+            'editor': None,
+        })
+    return versions
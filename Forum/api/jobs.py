@@ -0,0 +1,218 @@
+"""
+Выполнение фоновых операций (модель Job).
+Обработчик операции регистрируется декоратором job_handler по типу операции,
+сама операция выполняется задачей очереди api.run_job (см. api.tasks).
+Массовые операции модерации выполняются пачками по batch_size объектов:
+UPDATE по списку id пачки и поддержка счетчиков, журнала изменений и
+версий кэша для каждой пачки, прогресс фиксируется после пачки
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .caching import bump_content_version
+from .deletion import DEFAULT_BATCH_SIZE, count_cascade, purge_queryset
+from .models import (Category, CategoryCounter, ChangeLog, Chapter, Job,
+                     Message, MessageScore, Theme, ThemeCounter, UserStats)
+from .tasks import enqueue, task
+from .tree import bump_tree_version
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Регистрирует обработчик для типа операции"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue_job(kind, target_id=None, user=None, unique=True, **params):
+    """
+    Создает операцию и ставит ее выполнение в очередь задач.
+    Если unique и операция того же типа над тем же объектом уже ждет или
+    выполняется, возвращается она (массовые операции с разными
+    параметрами ставятся с unique=False)
+    """
+    job = Job.objects.filter(
+        kind=kind, target_id=target_id,
+        status__in=[Job.PENDING, Job.RUNNING]).first() if unique else None
+    if job is None:
+        job = Job.objects.create(
+            kind=kind, target_id=target_id, params=params,
+            user=user if user is not None and user.is_authenticated else None)
+        enqueue('api.run_job', job.pk, dedup_key=f'job:{job.pk}')
+    return job
+
+
+def claim_job(job):
+    """Атомарно переводит операцию в статус выполнения, True при успехе"""
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+        status=Job.RUNNING, started_at=now)
+    if claimed:
+        job.status = Job.RUNNING
+        job.started_at = now
+    return bool(claimed)
+
+
+def run_job(job):
+    """Выполняет захваченную операцию и фиксирует итоговый статус"""
+    try:
+        JOB_HANDLERS[job.kind](job)
+    except Exception as exc:
+        logger.exception('Операция %s завершилась с ошибкой', job.pk)
+        job.status = Job.FAILED
+        job.error = repr(exc)
+    else:
+        job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def fail_job(job_id):
+    """Незавершенная операция, задача которой исчерпала попытки, получает FAILED"""
+    Job.objects.filter(pk=job_id, status__in=[Job.PENDING, Job.RUNNING]).update(
+        status=Job.FAILED, error='Задача операции не завершилась',
+        finished_at=timezone.now())
+
+
+@task('api.run_job', max_attempts=1, on_failure=fail_job)
+def run_job_task(job_id):
+    """Задача очереди: выполнение операции, если ее еще никто не захватил"""
+    job = Job.objects.get(pk=job_id)
+    if claim_job(job):
+        run_job(job)
+
+
+@job_handler(Job.DELETE_CHAPTER)
+def delete_chapter(job):
+    """Пакетное удаление раздела со всем содержимым"""
+    chapters = Chapter.objects.filter(pk=job.target_id)
+    job.total = count_cascade(chapters)
+    job.save(update_fields=['total'])
+    deltas = UserStats.objects.removal_deltas(
+        Message.objects.filter(theme__category__chapter_id=job.target_id),
+        Theme.objects.filter(category__chapter_id=job.target_id))
+    purge_queryset(chapters, job.params.get(
+        'batch_size', DEFAULT_BATCH_SIZE), job.report)
+    UserStats.objects.apply_deltas(deltas)
+    bump_tree_version()
+
+
+@job_handler(Job.DELETE_CATEGORY)
+def delete_category(job):
+    """Пакетное удаление категории со всем содержимым"""
+    categories = Category.objects.filter(pk=job.target_id)
+    job.total = count_cascade(categories)
+    job.save(update_fields=['total'])
+    deltas = UserStats.objects.removal_deltas(
+        Message.objects.filter(theme__category_id=job.target_id),
+        Theme.objects.filter(category_id=job.target_id))
+    purge_queryset(categories, job.params.get(
+        'batch_size', DEFAULT_BATCH_SIZE), job.report)
+    UserStats.objects.apply_deltas(deltas)
+    bump_tree_version()
+
+
+def batches(ids, batch_size):
+    """Пачки списка ids по batch_size"""
+    for start in range(0, len(ids), batch_size):
+        yield ids[start:start + batch_size]
+
+
+def soft_delete_messages(pks):
+    """
+    Мягкое удаление живых сообщений pks с поддержкой счетчиков авторов,
+    тем и ответов родителей (приращения вычисляются группировкой до удаления)
+    """
+    messages = Message.objects.filter(pk__in=pks)
+    with transaction.atomic():
+        stats = UserStats.objects.removal_deltas(messages)
+        counters = ThemeCounter.objects.removal_deltas(messages)
+        replies = messages.filter(reply_to__isnull=False).order_by().values(
+            'reply_to_id').annotate(count=Count('pk')).values_list(
+            'reply_to_id', 'count')
+        parents = {}
+        for parent_id, count in replies:
+            parents.setdefault(count, []).append(parent_id)
+        removed = messages.soft_delete()
+        MessageScore.objects.filter(message_id__in=pks).delete()
+        UserStats.objects.apply_deltas(stats)
+        ThemeCounter.objects.apply_deltas(counters)
+        for count, parent_ids in parents.items():
+            Message.all_objects.filter(pk__in=parent_ids).update(
+                replies_count=F('replies_count') - count)
+    return removed
+
+
+@job_handler(Job.CLOSE_THEMES)
+def close_themes(job):
+    """Закрытие тем params['themes'] пачками"""
+    ids = job.params['themes']
+    job.total = len(ids)
+    job.save(update_fields=['total'])
+    for batch in batches(ids, job.params.get('batch_size', DEFAULT_BATCH_SIZE)):
+        with transaction.atomic():
+            pks = list(Theme.objects.filter(pk__in=batch, status=True).values_list(
+                'pk', flat=True))
+            Theme.objects.filter(pk__in=pks).update(
+                status=False, updated_at=timezone.now())
+            ChangeLog.objects.record(Theme, pks, ChangeLog.UPDATED)
+        bump_content_version()
+        job.report(Theme, len(batch))
+
+
+@job_handler(Job.MOVE_THEMES)
+def move_themes(job):
+    """Перенос тем params['themes'] в категорию target_id пачками"""
+    ids = job.params['themes']
+    job.total = len(ids)
+    job.save(update_fields=['total'])
+    for batch in batches(ids, job.params.get('batch_size', DEFAULT_BATCH_SIZE)):
+        with transaction.atomic():
+            pks = list(Theme.objects.filter(pk__in=batch).exclude(
+                category_id=job.target_id).values_list('pk', flat=True))
+            themes = Theme.objects.filter(pk__in=pks)
+            deltas = CategoryCounter.objects.removal_deltas(themes)
+            moved = themes.update(category_id=job.target_id,
+                                  updated_at=timezone.now())
+            deltas[job.target_id] = deltas.get(job.target_id, 0) + moved
+            CategoryCounter.objects.apply_deltas(deltas)
+            ChangeLog.objects.record(Theme, pks, ChangeLog.UPDATED)
+        bump_content_version()
+        job.report(Theme, len(batch))
+    bump_tree_version()
+
+
+@job_handler(Job.DELETE_USER_MESSAGES)
+def delete_user_messages(job):
+    """
+    Мягкое удаление сообщений пользователя target_id, созданных в
+    промежутке [params['since'], params['until']) (границы необязательны)
+    """
+    messages = Message.objects.filter(user_id=job.target_id)
+    if job.params.get('since'):
+        messages = messages.filter(created_at__gte=parse_datetime(job.params['since']))
+    if job.params.get('until'):
+        messages = messages.filter(created_at__lt=parse_datetime(job.params['until']))
+    job.total = messages.count()
+    job.save(update_fields=['total'])
+    batch_size = job.params.get('batch_size', DEFAULT_BATCH_SIZE)
+    last = 0
+    while True:
+        pks = list(messages.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        soft_delete_messages(pks)
+        job.report(Message, len(pks))
+        last = pks[-1]
+    bump_tree_version()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_theme, inactive_themes
+from api.deletion import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Перенос закрытых неактивных тем в архив"""
+    help = 'Переносит закрытые неактивные темы в архивную таблицу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inactive-days', type=int, default=90)
+        parser.add_argument('--limit', type=int, default=1000,
+                            help='Максимум тем за один запуск')
+        parser.add_argument('--batch-size', type=int,
+                            default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        themes = inactive_themes(
+            options['inactive_days']).order_by('id')[:options['limit']]
+        archived = 0
+        for theme in themes:
+            archive_theme(theme, options['batch_size'])
+            archived += 1
+        self.stdout.write(f'Архивировано тем: {archived}')
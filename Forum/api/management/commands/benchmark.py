@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from api.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    """Запуск бенчмарков из api.benchmarks"""
+    help = 'Запускает бенчмарк и выводит результаты таблицей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Имя бенчмарка')
+        parser.add_argument('--param', action='append', default=[],
+                            help='Параметр бенчмарка в виде имя=число')
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if name not in BENCHMARKS:
+            raise CommandError(
+                f'Доступные бенчмарки: {", ".join(sorted(BENCHMARKS))}')
+        func = BENCHMARKS[name]
+        params = {}
+        for param in options['param']:
+            key, _, value = param.partition('=')
+            params[key] = int(value)
+        old_config = None
+        if func.uses_db:
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            rows = func(**params)
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+        self.print_table(rows)
+
+    def print_table(self, rows):
+        columns = []
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+        widths = {column: max([len(column)] + [len(str(row.get(column, '')))
+                                                for row in rows])
+                  for column in columns}
+        self.stdout.write('  '.join(column.ljust(widths[column])
+                                    for column in columns))
+        for row in rows:
+            self.stdout.write('  '.join(str(row.get(column, '')).ljust(
+                widths[column]) for column in columns))
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.digests import DEFAULT_BATCH_SIZE, run_digests
+
+
+class Command(BaseCommand):
+    """Сборка дайджестов подписок на темы"""
+    help = ('Собирает дайджесты новых сообщений в темах из подписок пачками '
+            'пользователей и выводит их строками JSON для рассылки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def deliver(digests):
+            for user_id, themes in digests.items():
+                self.stdout.write(json.dumps(
+                    {'user': user_id, 'themes': themes}, ensure_ascii=False))
+
+        result = run_digests(deliver, options['batch_size'])
+        self.stderr.write(f'Подписчиков: {result["users"]}, '
+                          f'дайджестов: {result["digests"]}')
@@ -0,0 +1,33 @@
+from django.core.management.base import CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from api import budgets
+from api.management.commands.benchmark import Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    """Проверка бюджетов эндпоинтов из api.budgets"""
+    help = ('Выполняет запрос каждого маршрута api.urls на эталонных данных '
+            'и выводит таблицу бюджетов и фактических значений')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sql', action='store_true',
+                            help='Вывести SQL запросы маршрутов с нарушениями')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            rows, failed = budgets.report(budgets.seed())
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        self.print_table(rows)
+        if options['sql']:
+            for name, queries in failed.items():
+                self.stdout.write(f'\n{name}:')
+                for sql in queries:
+                    self.stdout.write(f'  {sql}')
+        if failed:
+            raise CommandError(f'Бюджет нарушен: {", ".join(failed)}')
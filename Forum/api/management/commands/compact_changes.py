@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import ChangeLog
+
+
+class Command(BaseCommand):
+    """Сокращение журнала изменений"""
+    help = ('Удаляет записи журнала изменений, замененные более новыми, '
+            'и устаревшие записи об удалении')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--tombstone-days', type=int, default=30,
+                            help='Сколько дней хранить записи об удалении')
+
+    def handle(self, *args, **options):
+        compacted = ChangeLog.objects.compact(options['batch_size'])
+        expired = ChangeLog.objects.expire_tombstones(
+            timezone.now() - timedelta(days=options['tombstone_days']))
+        self.stdout.write(f'Заменено более новыми: {compacted}, '
+                          f'устаревших удалений: {expired}')
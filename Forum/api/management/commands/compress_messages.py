@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+
+from api.fields import COMPRESSED_PREFIX
+from api.models import Message
+
+
+def compress_existing(batch_size=500, on_batch=None):
+    """
+    Пересохраняет длинные несжатые сообщения пачками по возрастанию pk.
+    Сжатие выполняет само поле при записи, updated_at не меняется
+    """
+    field = Message._meta.get_field('content')
+    last_pk = 0
+    converted = 0
+    while True:
+        ids = list(Message.all_objects.filter(pk__gt=last_pk)
+                   .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return converted
+        last_pk = ids[-1]
+        batch = list(
+            Message.all_objects.filter(pk__in=ids)
+            .annotate(stored_length=Length('content'))
+            .filter(stored_length__gte=field.compress_threshold)
+            .exclude(content__startswith=COMPRESSED_PREFIX)
+            .only('pk', 'content'))
+        if batch:
+            Message.all_objects.bulk_update(batch, ['content'])
+            converted += len(batch)
+        if on_batch is not None:
+            on_batch(last_pk, converted)
+
+
+class Command(BaseCommand):
+    """Сжатие текста уже существующих сообщений"""
+    help = 'Переводит длинные несжатые сообщения в сжатый формат пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        def report(last_pk, converted):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'pk <= {last_pk}: сжато {converted}')
+
+        converted = compress_existing(options['batch_size'], report)
+        self.stdout.write(f'Сжато сообщений: {converted}')
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.startup import profile
+
+
+class Command(BaseCommand):
+    """Профилирование холодного запуска рабочего процесса (см. api.startup)"""
+    help = ('Сравнивает время запуска, память и импорт по приложениям '
+            'для нескольких модулей настроек')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'settings_modules', nargs='*',
+            help='Модули настроек, по умолчанию текущий и Forum.settings_api')
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--top', type=int, default=15,
+                            help='Число групп модулей в отчете')
+
+    def handle(self, *args, **options):
+        modules = options['settings_modules'] or [
+            os.environ['DJANGO_SETTINGS_MODULE'], 'Forum.settings_api']
+        reports = [profile(module, options['runs']) for module in modules]
+        for report in reports:
+            self.stdout.write(
+                f"{report['settings']}: запуск {report['startup_ms']:.0f} мс, "
+                f"RSS {report['rss_mb']:.1f} МБ, модулей {report['modules']}")
+        for report in reports:
+            self.stdout.write(f"\n{report['settings']}")
+            self.stdout.write(f"{'группа':40} {'импорт, мс':>12} {'память, КБ':>12}")
+            groups = sorted(report['groups'].items(),
+                            key=lambda item: -item[1]['import_ms'])
+            for name, group in groups[:options['top']]:
+                self.stdout.write(f"{name:40} {group['import_ms']:12.1f} "
+                                  f"{group['memory_kb']:12.0f}")
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.deletion import DEFAULT_BATCH_SIZE, purge_queryset
+from api.models import Message, Theme
+
+
+class Command(BaseCommand):
+    """Физическое удаление мягко удаленных тем и сообщений пачками"""
+    help = 'Физически удаляет помеченные на удаление темы и сообщения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Сколько часов хранить удаленные записи')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        for model in (Theme, Message):
+            queryset = model.all_objects.filter(
+                is_deleted=True, deleted_at__lt=cutoff)
+            deleted = purge_queryset(queryset, options['batch_size'])
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: удалено строк {deleted}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.ranking import recompute_all
+
+
+class Command(BaseCommand):
+    """Полный пересчет рейтингов тем и сообщений"""
+    help = 'Пересчитывает рейтинги тем и сообщений пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = recompute_all(options['batch_size'])
+        self.stdout.write(f'Пересчитано рейтингов: {total}')
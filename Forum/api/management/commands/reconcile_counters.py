@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Category, CategoryCounter, Theme, ThemeCounter
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков сообщений тем и тем категорий группировкой"""
+    help = 'Пересчитывает счетчики списков (ThemeCounter, CategoryCounter) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for parent, counter in ((Theme, ThemeCounter), (Category, CategoryCounter)):
+            total = 0
+            last_pk = 0
+            while True:
+                ids = list(parent.objects.filter(pk__gt=last_pk).order_by(
+                    'pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                total += counter.objects.reconcile(ids)
+                last_pk = ids[-1]
+            self.stdout.write(
+                f'Пересчитано счетчиков {counter._meta.verbose_name_plural}: {total}')
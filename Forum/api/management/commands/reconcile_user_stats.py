@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.models import UserStats
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков пользователей группировкой по таблицам"""
+    help = 'Пересчитывает счетчики пользователей (UserStats) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--missing', action='store_true',
+                            help='только пользователи без строки счетчиков')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['missing']:
+            users = users.filter(stats__isnull=True)
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(users.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += UserStats.objects.reconcile(ids)
+            last_pk = ids[-1]
+        self.stdout.write(f'Пересчитано пользователей: {total}')
@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+#  модуль импортируется дочерними процессами пула до django.setup(),
+#  поэтому api.tasks (и модели) импортируются только внутри функций
+
+
+def _init_worker():
+    """
+    Процессы пула запускаются через spawn и не наследуют соединения
+    с базой родителя, поэтому Django настраивается в каждом заново
+    """
+    django.setup()
+
+
+def _execute(task_id):
+    from api.tasks import execute
+    return execute(task_id)
+
+
+class Command(BaseCommand):
+    """Обработчик очереди задач с пулом процессов"""
+    help = 'Выполняет задачи из очереди (api.tasks) в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help='Размер пула процессов, 0 - выполнять в текущем')
+        parser.add_argument('--batch', type=int, default=50,
+                            help='Сколько задач захватывать за раз')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза при пустой очереди, сек')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Через сколько секунд вернуть зависшую задачу')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь до опустошения и выйти')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        pool = None
+        if processes:
+            pool = ProcessPoolExecutor(
+                processes, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker)
+        try:
+            self.loop(pool, options)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def loop(self, pool, options):
+        from api.tasks import claim_tasks, requeue_stale
+
+        while True:
+            requeue_stale(options['stale_after'])
+            task_ids = claim_tasks(options['batch'])
+            if task_ids:
+                if pool is None:
+                    statuses = [_execute(task_id) for task_id in task_ids]
+                else:
+                    statuses = list(pool.map(_execute, task_ids))
+                self.stdout.write(f'Обработано задач: {len(statuses)}, '
+                                  f'ошибок: {statuses.count("failed")}')
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
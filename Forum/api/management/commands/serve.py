@@ -0,0 +1,58 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.server import ForumApplication
+
+
+class Command(BaseCommand):
+    """Запуск gunicorn с настройками Django (см. api.server)"""
+    help = ('Запускает многопроцессный WSGI сервер gunicorn; '
+            'для промышленного запуска используйте --settings=Forum.settings_production')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default='127.0.0.1:8000',
+                            help='Адрес в виде host:port, unix:путь или fd://номер')
+        parser.add_argument('--workers', type=int, default=getattr(
+            settings, 'SERVER_WORKERS', os.cpu_count() or 1))
+        parser.add_argument('--threads', type=int,
+                            default=getattr(settings, 'SERVER_THREADS', 4))
+        parser.add_argument('--worker-connections', type=int, default=getattr(
+            settings, 'SERVER_WORKER_CONNECTIONS', 1000),
+            help='Предел одновременно принятых соединений рабочего процесса')
+        parser.add_argument('--max-requests', type=int, default=getattr(
+            settings, 'SERVER_MAX_REQUESTS', 0),
+            help='Перезапуск рабочего процесса после N запросов, 0 - без перезапуска')
+        parser.add_argument('--max-requests-jitter', type=int, default=getattr(
+            settings, 'SERVER_MAX_REQUESTS_JITTER', 0))
+        parser.add_argument('--graceful-timeout', type=int, default=30)
+        parser.add_argument('--backlog', type=int, default=2048)
+        parser.add_argument('--no-preload', action='store_false', dest='preload',
+                            help='Загружать приложение в каждом рабочем процессе')
+
+    def handle(self, *args, **options):
+        if not hasattr(os, 'fork'):
+            raise CommandError('Команда serve работает только на POSIX системах')
+        bind = options['bind']
+        host, _, port = bind.rpartition(':')
+        if not bind.startswith(('unix:', 'fd://')) and (
+                not host or not port.isdigit()):
+            raise CommandError('Ожидается адрес в виде host:port')
+        if options['workers'] < 1 or options['threads'] < 1:
+            raise CommandError('Число процессов и потоков должно быть больше 0')
+        if settings.DEBUG:
+            self.stderr.write('Внимание: DEBUG включен, каждый запрос к базе '
+                              'сохраняется в памяти рабочего процесса')
+        ForumApplication({
+            'bind': [bind],
+            'worker_class': 'gthread',
+            'workers': options['workers'],
+            'threads': options['threads'],
+            'worker_connections': options['worker_connections'],
+            'max_requests': options['max_requests'],
+            'max_requests_jitter': options['max_requests_jitter'],
+            'graceful_timeout': options['graceful_timeout'],
+            'backlog': options['backlog'],
+            'preload_app': options['preload'],
+        }).run()
@@ -0,0 +1,33 @@
+from django.utils.cache import patch_vary_headers
+
+from .compression import compress, min_size, negotiate
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов gzip/br с порогом размера COMPRESSION_MIN_SIZE.
+    Ответы, уже сжатые заранее (например, из кэша api.mixins), не трогаются
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < min_size()):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
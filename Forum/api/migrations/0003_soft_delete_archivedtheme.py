@@ -0,0 +1,55 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0002_messagerelation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удалено'),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddField(
+            model_name='theme',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удалена'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedTheme',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID исходной темы')),
+                ('name', models.CharField(max_length=500, verbose_name='Название темы')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('last_activity_at', models.DateTimeField(verbose_name='Дата последней активности')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('messages_count', models.PositiveIntegerField(default=0, verbose_name='Количество сообщений')),
+                ('payload', models.BinaryField(verbose_name='Сжатые сообщения')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_themes', to='api.category', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_themes', to=settings.AUTH_USER_MODEL, verbose_name='Создатель темы')),
+            ],
+            options={
+                'verbose_name': 'Архивная тема',
+                'verbose_name_plural': 'Архивные темы',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
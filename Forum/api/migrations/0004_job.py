@@ -0,0 +1,39 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0003_soft_delete_archivedtheme'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('delete_chapter', 'Удаление раздела'), ('delete_category', 'Удаление категории')], max_length=50, verbose_name='Тип операции')),
+                ('target_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID объекта')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершена'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=20, verbose_name='Статус')),
+                ('processed', models.PositiveBigIntegerField(default=0, verbose_name='Обработано строк')),
+                ('total', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Всего строк (оценка)')),
+                ('progress', models.JSONField(blank=True, default=dict, verbose_name='Прогресс по моделям')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата запуска')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Инициатор')),
+            ],
+            options={
+                'verbose_name': 'Фоновая операция',
+                'verbose_name_plural': 'Фоновые операции',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0005_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('patch', models.BinaryField(verbose_name='Сжатая дельта')),
+                ('valid_from', models.DateTimeField(verbose_name='Дата версии')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='message_revisions', to=settings.AUTH_USER_MODEL, verbose_name='Автор изменения')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='api.message', verbose_name='Сообщение')),
+            ],
+            options={
+                'verbose_name': 'Версия сообщения',
+                'verbose_name_plural': 'Версии сообщений',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
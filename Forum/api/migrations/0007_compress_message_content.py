@@ -0,0 +1,19 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:22
+
+import api.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_messagerevision'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='content',
+            field=api.fields.CompressedTextField(verbose_name='Текст сообщения'),
+        ),
+    ]
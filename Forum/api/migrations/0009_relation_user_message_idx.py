@@ -0,0 +1,17 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_index_created_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='messagerelation',
+            index=models.Index(fields=['user', 'message'], name='relation_user_message_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_relation_user_message_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageScore',
+            fields=[
+                ('message', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='api.message', verbose_name='Сообщение')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг сообщения',
+                'verbose_name_plural': 'Рейтинги сообщений',
+            },
+        ),
+        migrations.CreateModel(
+            name='ThemeScore',
+            fields=[
+                ('theme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='api.theme', verbose_name='Тема')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг темы',
+                'verbose_name_plural': 'Рейтинги тем',
+            },
+        ),
+        migrations.AddField(
+            model_name='messagerelation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата оценки'),
+        ),
+        migrations.AddIndex(
+            model_name='themescore',
+            index=models.Index(fields=['-score'], name='themescore_score_idx'),
+        ),
+        migrations.AddField(
+            model_name='messagescore',
+            name='theme',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_scores', to='api.theme', verbose_name='Тема'),
+        ),
+        migrations.AddIndex(
+            model_name='messagescore',
+            index=models.Index(fields=['-score'], name='messagescore_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagescore',
+            index=models.Index(fields=['theme', '-score'], name='messagescore_theme_score_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_user_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['theme', 'id'], name='message_theme_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['theme', 'created_at'], name='message_theme_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['theme', 'updated_at'], name='message_theme_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theme',
+            index=models.Index(fields=['category', 'created_at'], name='theme_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theme',
+            index=models.Index(fields=['category', 'status', 'created_at'], name='theme_cat_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theme',
+            index=models.Index(fields=['user', 'created_at'], name='theme_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theme',
+            index=models.Index(fields=['status', 'created_at'], name='theme_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.2 on 2026-10-19 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theme',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.2 on 2026-10-19 13:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_theme_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryCounter',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='api.category', verbose_name='Категория')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество тем')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Счетчик тем категории',
+                'verbose_name_plural': 'Счетчики тем категорий',
+            },
+        ),
+        migrations.CreateModel(
+            name='ThemeCounter',
+            fields=[
+                ('theme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='api.theme', verbose_name='Тема')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество сообщений')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Счетчик сообщений темы',
+                'verbose_name_plural': 'Счетчики сообщений тем',
+            },
+        ),
+    ]
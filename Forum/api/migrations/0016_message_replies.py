@@ -0,0 +1,29 @@
+# Generated by Django 4.0.2 on 2026-10-19 13:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_list_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=220, verbose_name='Путь в ветке ответов'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='replies_count',
+            field=models.IntegerField(default=0, verbose_name='Количество ответов'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='reply_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replies', to='api.message', verbose_name='Ответ на сообщение'),
+        ),
+    ]
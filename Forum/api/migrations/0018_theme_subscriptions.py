@@ -0,0 +1,56 @@
+# Generated by Django 4.0.2 on 2026-10-19 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def subscribe_participants(apps, schema_editor):
+    """Подписывает авторов тем и участников обсуждений на их темы"""
+    Theme = apps.get_model('api', 'Theme')
+    Message = apps.get_model('api', 'Message')
+    ThemeSubscription = apps.get_model('api', 'ThemeSubscription')
+    pairs = Theme.objects.order_by().values_list('user_id', 'pk').union(
+        Message.objects.order_by().values_list('user_id', 'theme_id'))
+    batch = []
+    for user_id, theme_id in pairs.iterator():
+        batch.append(ThemeSubscription(user_id=user_id, theme_id=theme_id))
+        if len(batch) == 1000:
+            ThemeSubscription.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ThemeSubscription.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0017_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThemeSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата подписки')),
+                ('digested_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Граница последнего дайджеста')),
+                ('theme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='api.theme', verbose_name='Тема')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='theme_subscriptions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Подписка на тему',
+                'verbose_name_plural': 'Подписки на темы',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='themesubscription',
+            index=models.Index(fields=['user', 'theme'], name='subscription_user_theme_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='themesubscription',
+            constraint=models.UniqueConstraint(fields=('theme', 'user'), name='subscription_theme_user_uniq'),
+        ),
+        migrations.RunPython(subscribe_participants, migrations.RunPython.noop),
+    ]
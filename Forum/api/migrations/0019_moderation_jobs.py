@@ -0,0 +1,18 @@
+# Generated by Django 4.0.2 on 2026-10-19 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_theme_subscriptions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('delete_chapter', 'Удаление раздела'), ('delete_category', 'Удаление категории'), ('close_themes', 'Закрытие тем'), ('move_themes', 'Перенос тем в категорию'), ('delete_user_messages', 'Удаление сообщений пользователя')], max_length=50, verbose_name='Тип операции'),
+        ),
+    ]
@@ -0,0 +1,181 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .caching import content_version
+from .compression import compress, min_size, negotiate
+from .jobs import enqueue_job
+from .serializers import JobSerializer
+
+ID_RE = re.compile(r'[0-9]+')
+
+
+def parse_id(value):
+    """
+    Id из параметра запроса или None. Проверяются только ASCII-цифры:
+    str.isdigit пропускает '²' и другие цифры Unicode, на которых падает int
+    """
+    value = str(value).strip()
+    return int(value) if ID_RE.fullmatch(value) else None
+
+
+class BackgroundDestroyMixin:
+    """
+    Удаление объекта фоновой операцией вместо каскада внутри запроса.
+    Возвращает 202 и описание операции, прогресс доступен по jobs/<id>/
+    """
+    job_kind = None
+
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        job = enqueue_job(self.job_kind, instance.pk, request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class BackgroundJobMixin:
+    """
+    Массовая операция фоновой операцией вместо обработки внутри запроса.
+    Параметры проверяет serializer_class, job_arguments() возвращает
+    объект операции и ее параметры. Возвращает 202 и описание операции,
+    прогресс доступен по jobs/<id>/
+    """
+    job_kind = None
+
+    def job_arguments(self, data):
+        """Пара (target_id, параметры операции) по проверенным данным"""
+        raise NotImplementedError
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target_id, params = self.job_arguments(serializer.validated_data)
+        job = enqueue_job(self.job_kind, target_id, request.user,
+                          unique=False, **params)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class CompressedCacheMixin:
+    """
+    Кэш готовых JSON ответов GET в сжатом виде.
+    При попадании в кэш ответ отдается без сериализации и без сжатия,
+    при промахе тело сжимается один раз и сохраняется вместе с
+    заголовками CACHED_HEADERS (тип, кодировка, Vary и Allow от DRF).
+    Ключ - хэш md5 версий контента (api.caching) областей
+    get_cache_scopes(), пути с параметрами, кодировки и, при
+    cache_vary_on_user, пользователя
+    """
+    CACHED_HEADERS = ('Content-Type', 'Content-Encoding', 'Vary', 'Allow')
+    cache_vary_on_user = False
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+    def get_cache_scopes(self, request):
+        """Области версий контента (api.caching), от которых зависит ответ"""
+        return ()
+
+    def get_response_cache_key(self, request, encoding):
+        user = request.user.pk if self.cache_vary_on_user and \
+            request.user.is_authenticated else 0
+        version = content_version(*self.get_cache_scopes(request))
+        query = request.GET.urlencode()
+        return 'api:response:' + hashlib.md5(
+            f'{version}:{request.path}?{query}:{user}:{encoding or "identity"}'
+            .encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout or request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        key = self.get_response_cache_key(request, encoding)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_response(*cached)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        response = self.finalize_response(request, response, *args, **kwargs)
+        response.render()
+        body = response.content
+        if encoding is not None and len(body) >= min_size():
+            body = compress(body, encoding)
+            response.content = body
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        headers = {name: response[name] for name in self.CACHED_HEADERS
+                   if response.has_header(name)}
+        cache.set(key, (body, headers), timeout)
+        return response
+
+    def cached_response(self, body, headers):
+        response = HttpResponse(body)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+class BatchLookupMixin:
+    """
+    Пакетное получение объектов списка по ?ids=1,2,3 одним запросом.
+    Порядок результатов совпадает с порядком ids, ненайденные id
+    возвращаются в поле missing. Фильтры и пагинация в этом режиме не применяются
+    """
+    batch_param = 'ids'
+    max_batch_size = 200
+
+    def get_batch_ids(self, raw):
+        ids = []
+        for part in raw.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            pk = parse_id(part)
+            if pk is None:
+                raise ValidationError(
+                    {self.batch_param: f'Некорректный id: {part}'})
+            if pk not in ids:
+                ids.append(pk)
+        if len(ids) > self.max_batch_size:
+            raise ValidationError(
+                {self.batch_param: f'Не более {self.max_batch_size} id за запрос'})
+        return ids
+
+    def list(self, request, *args, **kwargs):
+        raw = request.query_params.get(self.batch_param)
+        if raw is None:
+            return super().list(request, *args, **kwargs)
+        ids = self.get_batch_ids(raw)
+        objects = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [objects[pk] for pk in ids if pk in objects], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in objects],
+        })
+
+
+class ValuesListMixin:
+    """
+    Быстрый путь списка (api.rows): страница выбирается через .values()
+    и преобразуется row_mapper без создания моделей и полей сериализатора.
+    Фильтры, сортировка и пагинация применяются как обычно, вывод
+    совпадает с выводом serializer_class
+    """
+    row_mapper = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.row_mapper.values(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.row_mapper.map(page, request))
+        return Response(self.row_mapper.map(queryset, request))
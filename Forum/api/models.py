@@ -1,5 +1,32 @@
-from django.db import models
+import time
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .caching import bump_content_version, shared_cache
+from .fields import CompressedTextField
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet с поддержкой мягкого удаления"""
+
+    def soft_delete(self):
+        """Помечает записи удаленными одним UPDATE без загрузки в память"""
+        pks = list(self.values_list('pk', flat=True))
+        updated = self.update(is_deleted=True, deleted_at=timezone.now())
+        ChangeLog.objects.record(self.model, pks, ChangeLog.DELETED)
+        bump_content_version()
+        return updated
+
+
+class AliveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Менеджер по умолчанию, скрывающий мягко удаленные записи"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
 
 
 class Chapter(models.Model):
@@ -40,36 +67,178 @@ class Theme(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.PROTECT, related_name='themes', verbose_name='Создатель темы')
     created_at = models.DateTimeField(
-        auto_now_add=True, verbose_name='Дата создания')
+        auto_now_add=True, db_index=True, verbose_name='Дата создания')
+    #  версия темы для кэша фрагментов (api.fragments)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения')
+    is_deleted = models.BooleanField(
+        default=False, db_index=True, verbose_name='Удалена')
+    deleted_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата удаления')
+
+    objects = AliveManager()
+    all_objects = models.Manager.from_queryset(SoftDeleteQuerySet)()
 
     def __str__(self):
         return f'{self.id} - Тема - {self.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #  категория при загрузке нужна, чтобы перенести счетчик при смене категории
+        instance.loaded_category_id = instance.category_id \
+            if 'category_id' in field_names else None
+        return instance
+
+    def soft_delete(self):
+        """
+        Мягкое удаление темы вместе с ее сообщениями.
+        Физически записи удаляет команда purge_deleted
+        """
+        with transaction.atomic():
+            messages = Message.objects.filter(theme=self)
+            themes = Theme.objects.filter(pk=self.pk)
+            deltas = UserStats.objects.removal_deltas(messages, themes)
+            messages.soft_delete()
+            removed = themes.soft_delete()
+            MessageScore.objects.filter(theme=self).delete()
+            ThemeScore.objects.filter(theme=self).delete()
+            ThemeCounter.objects.filter(theme=self).delete()
+            UserStats.objects.apply_deltas(deltas)
+            CategoryCounter.objects.apply_deltas({self.category_id: -removed})
+
     class Meta:
         ordering = ['created_at']
         verbose_name = 'Тема'
         verbose_name_plural = 'Темы'
+        #  индексы под фильтры списка тем (api.filters.ThemeFilter)
+        indexes = [
+            models.Index(fields=['category', 'created_at'],
+                         name='theme_category_created_idx'),
+            models.Index(fields=['category', 'status', 'created_at'],
+                         name='theme_cat_status_created_idx'),
+            models.Index(fields=['user', 'created_at'],
+                         name='theme_user_created_idx'),
+            models.Index(fields=['status', 'created_at'],
+                         name='theme_status_created_idx'),
+        ]
+
+
+class MessageQuerySet(SoftDeleteQuerySet):
+    """QuerySet сообщений"""
+
+    def with_likes_count(self):
+        """
+        Аннотирует количество лайков коррелированным подзапросом:
+        он вычисляется только для строк страницы, без GROUP BY по таблице
+        """
+        likes = MessageRelation.objects.filter(
+            message=models.OuterRef('pk'), like=True
+        ).order_by().values('message').annotate(
+            count=models.Count('id')).values('count')
+        return self.annotate(likes_count=Coalesce(
+            models.Subquery(likes), 0))
+
+    def replies_of(self, message):
+        """Все ответы на message, включая вложенные, по префиксу пути"""
+        return self.filter(path__startswith=message.subtree_prefix)
+
+
+#  сегмент материализованного пути ответа: id предка фиксированной длины
+PATH_SEGMENT_DIGITS = 10
+MAX_REPLY_DEPTH = 20
+
+
+def path_segment(message_id):
+    return f'{message_id:0{PATH_SEGMENT_DIGITS}d}/'
 
 
 class Message(models.Model):
-    """Сообщение в теме"""
+    """
+    Сообщение в теме. Ответ ссылается на сообщение reply_to и хранит
+    материализованный путь path - id всех предков от корня ветки, поэтому
+    ветка ответов на сообщение выбирается одним запросом по префиксу
+    пути (subtree_prefix), а replies_count - число живых прямых ответов
+    """
     user = models.ForeignKey(
         User, on_delete=models.PROTECT, related_name='messages', verbose_name='Пользователь')
     theme = models.ForeignKey(
         Theme, on_delete=models.CASCADE, related_name='messages', verbose_name='Тема')
-    content = models.TextField(verbose_name='Текст сообщения')
+    reply_to = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='replies', verbose_name='Ответ на сообщение')
+    path = models.CharField(
+        max_length=(PATH_SEGMENT_DIGITS + 1) * MAX_REPLY_DEPTH, blank=True,
+        default='', db_index=True, verbose_name='Путь в ветке ответов')
+    replies_count = models.IntegerField(
+        default=0, verbose_name='Количество ответов')
+    content = CompressedTextField(verbose_name='Текст сообщения')
     created_at = models.DateTimeField(
-        auto_now_add=True, verbose_name='Дата публикации')
+        auto_now_add=True, db_index=True, verbose_name='Дата публикации')
     updated_at = models.DateTimeField(
-        auto_now=True, verbose_name='Дата обновления')
+        auto_now=True, db_index=True, verbose_name='Дата обновления')
+    is_deleted = models.BooleanField(
+        default=False, db_index=True, verbose_name='Удалено')
+    deleted_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата удаления')
+
+    objects = AliveManager.from_queryset(MessageQuerySet)()
+    all_objects = models.Manager.from_queryset(MessageQuerySet)()
 
     def __str__(self):
         return f'{self.id} - Пост - {self.content[:10]}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #  тема при загрузке нужна, чтобы перенести счетчик при смене темы
+        instance.loaded_theme_id = instance.theme_id \
+            if 'theme_id' in field_names else None
+        return instance
+
+    @property
+    def depth(self):
+        """Глубина в ветке ответов, у сообщения верхнего уровня 0"""
+        return len(self.path) // (PATH_SEGMENT_DIGITS + 1)
+
+    @property
+    def subtree_prefix(self):
+        """Префикс пути всех ответов на сообщение, включая вложенные"""
+        return self.path + path_segment(self.pk)
+
+    def save(self, *args, **kwargs):
+        #  путь вычисляется один раз при создании по пути родителя
+        if self._state.adding and self.reply_to_id is not None and not self.path:
+            if self.reply_to.depth >= MAX_REPLY_DEPTH:
+                raise ValueError('Превышена глубина ветки ответов')
+            self.path = self.reply_to.subtree_prefix
+        super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        """Мягкое удаление сообщения"""
+        with transaction.atomic():
+            messages = Message.objects.filter(pk=self.pk)
+            deltas = UserStats.objects.removal_deltas(messages)
+            removed = messages.soft_delete()
+            MessageScore.objects.filter(message=self).delete()
+            UserStats.objects.apply_deltas(deltas)
+            ThemeCounter.objects.apply_deltas({self.theme_id: -removed})
+            if removed and self.reply_to_id is not None:
+                Message.all_objects.filter(pk=self.reply_to_id).update(
+                    replies_count=models.F('replies_count') - 1)
+
     class Meta:
         ordering = ['created_at']
         verbose_name = 'Сообщение'
         verbose_name_plural = 'Сообщения'
+        #  индексы под фильтры списка сообщений (api.filters.MessageFilter)
+        indexes = [
+            models.Index(fields=['theme', 'id'], name='message_theme_id_idx'),
+            models.Index(fields=['theme', 'created_at'],
+                         name='message_theme_created_idx'),
+            models.Index(fields=['theme', 'updated_at'],
+                         name='message_theme_updated_idx'),
+        ]
 
 
 class MessageRelation(models.Model):
@@ -79,10 +248,723 @@ class MessageRelation(models.Model):
     message = models.ForeignKey(
         Message, on_delete=models.CASCADE, verbose_name='Сообщение')
     like = models.BooleanField(default=False, verbose_name='Лайк')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата оценки')
 
     def __str__(self):
         return f"{self.user.username}_{self.like}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #  значение лайка при загрузке нужно, чтобы отличить новый лайк от повторного,
+        #  а момент лайка - чтобы при снятии вычесть его вклад из рейтинга
+        instance.loaded_like = instance.like if 'like' in field_names else None
+        instance.loaded_updated_at = (instance.updated_at
+                                      if 'updated_at' in field_names else None)
+        return instance
+
     class Meta:
         verbose_name = 'Relation'
         verbose_name_plural = 'Relations'
+        indexes = [
+            models.Index(fields=['user', 'message'],
+                         name='relation_user_message_idx'),
+        ]
+
+
+class ArchivedTheme(models.Model):
+    """
+    Архивная тема: закрытая и неактивная тема, перенесенная из горячих
+    таблиц. Сообщения хранятся одним сжатым JSON блоком (см. api.archive)
+    """
+    id = models.BigIntegerField(
+        primary_key=True, verbose_name='ID исходной темы')
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='archived_themes', verbose_name='Категория')
+    name = models.CharField(max_length=500, verbose_name='Название темы')
+    user = models.ForeignKey(
+        User, on_delete=models.PROTECT, related_name='archived_themes', verbose_name='Создатель темы')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    last_activity_at = models.DateTimeField(
+        verbose_name='Дата последней активности')
+    archived_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата архивации')
+    messages_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество сообщений')
+    payload = models.BinaryField(verbose_name='Сжатые сообщения')
+
+    def __str__(self):
+        return f'{self.id} - Архивная тема - {self.name}'
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Архивная тема'
+        verbose_name_plural = 'Архивные темы'
+
+
+class Job(models.Model):
+    """Фоновая операция с отслеживанием прогресса (см. api.jobs)"""
+    DELETE_CHAPTER = 'delete_chapter'
+    DELETE_CATEGORY = 'delete_category'
+    CLOSE_THEMES = 'close_themes'
+    MOVE_THEMES = 'move_themes'
+    DELETE_USER_MESSAGES = 'delete_user_messages'
+    KIND_CHOICES = [
+        (DELETE_CHAPTER, 'Удаление раздела'),
+        (DELETE_CATEGORY, 'Удаление категории'),
+        (CLOSE_THEMES, 'Закрытие тем'),
+        (MOVE_THEMES, 'Перенос тем в категорию'),
+        (DELETE_USER_MESSAGES, 'Удаление сообщений пользователя'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(
+        max_length=50, choices=KIND_CHOICES, verbose_name='Тип операции')
+    target_id = models.BigIntegerField(
+        null=True, blank=True, verbose_name='ID объекта')
+    params = models.JSONField(
+        default=dict, blank=True, verbose_name='Параметры')
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True, verbose_name='Статус')
+    processed = models.PositiveBigIntegerField(
+        default=0, verbose_name='Обработано строк')
+    total = models.PositiveBigIntegerField(
+        null=True, blank=True, verbose_name='Всего строк (оценка)')
+    progress = models.JSONField(
+        default=dict, blank=True, verbose_name='Прогресс по моделям')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs', verbose_name='Инициатор')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания')
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата запуска')
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата завершения')
+
+    def __str__(self):
+        return f'{self.id} - Операция - {self.kind} - {self.status}'
+
+    def report(self, model, count):
+        """Фиксирует в базе прогресс после очередной пачки"""
+        label = model._meta.model_name
+        self.progress[label] = self.progress.get(label, 0) + count
+        self.processed += count
+        self.save(update_fields=['progress', 'processed'])
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Фоновая операция'
+        verbose_name_plural = 'Фоновые операции'
+
+
+class Task(models.Model):
+    """Задача очереди отложенной работы (см. api.tasks)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name='Имя задачи')
+    args = models.JSONField(default=list, blank=True, verbose_name='Аргументы')
+    dedup_key = models.CharField(
+        max_length=200, null=True, blank=True, verbose_name='Ключ дедупликации')
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name='Статус')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveIntegerField(
+        default=3, verbose_name='Максимум попыток')
+    run_after = models.DateTimeField(
+        default=timezone.now, verbose_name='Не раньше')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата постановки')
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата запуска')
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата завершения')
+
+    def __str__(self):
+        return f'{self.id} - Задача - {self.name} - {self.status}'
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='task_status_run_after_idx'),
+        ]
+        constraints = [
+            #  одна ожидающая задача на ключ дедупликации
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status='pending'),
+                name='task_pending_dedup_key_uniq'),
+        ]
+
+
+class MessageRevision(models.Model):
+    """
+    Предыдущая версия сообщения в виде сжатой обратной дельты:
+    патч восстанавливает эту версию из следующей (см. api.history)
+    """
+    message = models.ForeignKey(
+        Message, on_delete=models.CASCADE, related_name='revisions', verbose_name='Сообщение')
+    editor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='message_revisions', verbose_name='Автор изменения')
+    patch = models.BinaryField(verbose_name='Сжатая дельта')
+    valid_from = models.DateTimeField(verbose_name='Дата версии')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата изменения')
+
+    def __str__(self):
+        return f'{self.id} - Версия сообщения - {self.message_id}'
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Версия сообщения'
+        verbose_name_plural = 'Версии сообщений'
+
+
+class ThemeScore(models.Model):
+    """
+    Рейтинг темы с затуханием по времени (см. api.ranking).
+    Хранится в логарифмической шкале, поэтому не требует пересчета со временем
+    """
+    theme = models.OneToOneField(
+        Theme, on_delete=models.CASCADE, primary_key=True, related_name='score', verbose_name='Тема')
+    score = models.FloatField(verbose_name='Рейтинг')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата обновления')
+
+    def __str__(self):
+        return f'{self.theme_id} - Рейтинг темы - {self.score}'
+
+    class Meta:
+        verbose_name = 'Рейтинг темы'
+        verbose_name_plural = 'Рейтинги тем'
+        indexes = [
+            models.Index(fields=['-score'], name='themescore_score_idx'),
+        ]
+
+
+class MessageScore(models.Model):
+    """Рейтинг сообщения с затуханием по времени (см. api.ranking)"""
+    message = models.OneToOneField(
+        Message, on_delete=models.CASCADE, primary_key=True, related_name='score', verbose_name='Сообщение')
+    theme = models.ForeignKey(
+        Theme, on_delete=models.CASCADE, related_name='message_scores', verbose_name='Тема')
+    score = models.FloatField(verbose_name='Рейтинг')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата обновления')
+
+    def __str__(self):
+        return f'{self.message_id} - Рейтинг сообщения - {self.score}'
+
+    class Meta:
+        verbose_name = 'Рейтинг сообщения'
+        verbose_name_plural = 'Рейтинги сообщений'
+        indexes = [
+            models.Index(fields=['-score'], name='messagescore_score_idx'),
+            models.Index(fields=['theme', '-score'],
+                         name='messagescore_theme_score_idx'),
+        ]
+
+
+class UserStatsManager(models.Manager):
+    """
+    Поддержка счетчиков пользователей. Изменения передаются словарем
+    {user_id: {поле: приращение}} и применяются UPDATE с выражением F,
+    по одному запросу на каждый различный набор приращений
+    """
+
+    def apply_deltas(self, deltas):
+        """
+        Применяет приращения. Пользователи без строки счетчиков получают ее
+        полным пересчетом, поэтому вызывать после изменения данных
+        """
+        groups = {}
+        for user_id, fields in deltas.items():
+            fields = tuple(sorted(
+                (name, value) for name, value in fields.items() if value))
+            if fields:
+                groups.setdefault(fields, []).append(user_id)
+        missing = []
+        for fields, user_ids in groups.items():
+            rows = self.filter(user_id__in=user_ids)
+            if rows.update(updated_at=timezone.now(), **{
+                    name: models.F(name) + value for name, value in fields}) < len(user_ids):
+                existing = set(rows.values_list('user_id', flat=True))
+                missing.extend(pk for pk in user_ids if pk not in existing)
+        if missing:
+            self.reconcile(missing)
+
+    def removal_deltas(self, messages, themes=None):
+        """
+        Приращения счетчиков при удалении живых сообщений и тем,
+        вычисляются группировкой до удаления
+        """
+        deltas = {}
+
+        def subtract(queryset, user_field, name):
+            rows = queryset.order_by().values(user_field).annotate(
+                count=models.Count('pk')).values_list(user_field, 'count')
+            for user_id, count in rows:
+                deltas.setdefault(user_id, {})[name] = -count
+
+        subtract(messages, 'user_id', 'messages_count')
+        subtract(MessageRelation.objects.filter(
+            message__in=messages.values('pk'), like=True),
+            'message__user_id', 'likes_received')
+        if themes is not None:
+            subtract(themes, 'user_id', 'themes_count')
+        return deltas
+
+    def reconcile(self, user_ids):
+        """
+        Полный пересчет счетчиков пачки пользователей группировкой по таблицам.
+        Строки счетчиков блокируются до подсчета и обновляются на месте:
+        приращения F() параллельных транзакций ждут пересчета, а не теряются
+        между удалением и вставкой строк
+        """
+        user_ids = list(user_ids)
+
+        def counts(queryset, user_field):
+            return dict(queryset.order_by().values(user_field).annotate(
+                count=models.Count('pk')).values_list(user_field, 'count'))
+
+        with transaction.atomic():
+            rows = {row.pk: row for row in self.select_for_update().filter(
+                user_id__in=user_ids)}
+            messages = counts(
+                Message.objects.filter(user_id__in=user_ids), 'user_id')
+            themes = counts(Theme.objects.filter(user_id__in=user_ids), 'user_id')
+            likes = counts(MessageRelation.objects.filter(
+                message__user_id__in=user_ids, message__is_deleted=False,
+                like=True), 'message__user_id')
+            existing = list(User.objects.filter(pk__in=user_ids).values_list(
+                'pk', flat=True))
+            stats = [UserStats(user_id=pk, messages_count=messages.get(pk, 0),
+                               themes_count=themes.get(pk, 0),
+                               likes_received=likes.get(pk, 0),
+                               updated_at=timezone.now())
+                     for pk in existing]
+            self.bulk_update([row for row in stats if row.pk in rows], [
+                'messages_count', 'themes_count', 'likes_received', 'updated_at'])
+            #  строку отсутствующего пользователя могла создать параллельная
+            #  транзакция тем же полным пересчетом
+            self.bulk_create([row for row in stats if row.pk not in rows],
+                             ignore_conflicts=True)
+        return len(existing)
+
+
+class UserStats(models.Model):
+    """
+    Счетчики пользователя, поддерживаемые при записи (см. api.signals).
+    Учитываются живые темы и сообщения и лайки на живые сообщения,
+    расхождения после массовых операций исправляет команда reconcile_user_stats
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name='Пользователь')
+    messages_count = models.IntegerField(
+        default=0, verbose_name='Количество сообщений')
+    themes_count = models.IntegerField(
+        default=0, verbose_name='Количество тем')
+    likes_received = models.IntegerField(
+        default=0, verbose_name='Получено лайков')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата обновления')
+
+    objects = UserStatsManager()
+
+    def __str__(self):
+        return f'{self.user_id} - Статистика пользователя'
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class ListCounterManager(models.Manager):
+    """
+    Поддержка счетчиков живых дочерних объектов родителя (сообщений темы,
+    тем категории). Модель счетчика задает родителя полем parent_field,
+    дочерние объекты - обратной связью родителя children. Изменения
+    передаются словарем {parent_id: приращение}
+    """
+
+    def children(self):
+        """Менеджер дочерней модели и столбец связи с родителем"""
+        parent = self.model._meta.get_field(self.model.parent_field).related_model
+        relation = parent._meta.get_field(self.model.children)
+        return relation.related_model.objects, relation.field.attname
+
+    def apply_deltas(self, deltas):
+        """
+        Применяет приращения одним UPDATE на каждое различное приращение.
+        Родители без строки счетчика получают ее полным пересчетом
+        """
+        groups = {}
+        for parent_id, value in deltas.items():
+            if value:
+                groups.setdefault(value, []).append(parent_id)
+        missing = []
+        for value, parent_ids in groups.items():
+            rows = self.filter(pk__in=parent_ids)
+            if rows.update(count=models.F('count') + value,
+                           updated_at=timezone.now()) < len(parent_ids):
+                existing = set(rows.values_list('pk', flat=True))
+                missing.extend(pk for pk in parent_ids if pk not in existing)
+        if missing:
+            self.reconcile(missing)
+
+    def removal_deltas(self, children):
+        """Приращения при удалении живых дочерних объектов, до удаления"""
+        _, attname = self.children()
+        rows = children.order_by().values(attname).annotate(
+            count=models.Count('pk')).values_list(attname, 'count')
+        return {parent_id: -count for parent_id, count in rows}
+
+    def reconcile(self, parent_ids):
+        """
+        Полный пересчет счетчиков пачки родителей группировкой. Строки
+        блокируются до подсчета и обновляются на месте, как в
+        UserStatsManager.reconcile
+        """
+        parent_ids = list(parent_ids)
+        manager, attname = self.children()
+        parent = self.model._meta.get_field(self.model.parent_field).related_model
+        with transaction.atomic():
+            rows = set(self.select_for_update().filter(
+                pk__in=parent_ids).values_list('pk', flat=True))
+            counts = dict(manager.filter(**{f'{attname}__in': parent_ids}).order_by(
+            ).values(attname).annotate(count=models.Count('pk')).values_list(
+                attname, 'count'))
+            existing = list(parent.objects.filter(pk__in=parent_ids).values_list(
+                'pk', flat=True))
+            counters = [self.model(pk=pk, count=counts.get(pk, 0),
+                                   updated_at=timezone.now()) for pk in existing]
+            self.bulk_update([row for row in counters if row.pk in rows],
+                             ['count', 'updated_at'])
+            self.bulk_create([row for row in counters if row.pk not in rows],
+                             ignore_conflicts=True)
+        return len(existing)
+
+    def count_for(self, parent_id):
+        """
+        Значение счетчика родителя. Отсутствующий счетчик вычисляется
+        без записи: строки создают сигналы и команда reconcile_counters
+        """
+        count = self.filter(pk=parent_id).values_list('count', flat=True).first()
+        if count is None:
+            manager, attname = self.children()
+            count = manager.filter(**{attname: parent_id}).count()
+        return count
+
+
+class ThemeCounter(models.Model):
+    """
+    Число живых сообщений темы для пагинации списка сообщений темы
+    (api.paginator, стратегия 'counter'). Поддерживается при записи,
+    включая перенос сообщения в другую тему, расхождения после массовых
+    операций исправляет команда reconcile_counters
+    """
+    parent_field = 'theme'
+    children = 'messages'
+
+    theme = models.OneToOneField(
+        Theme, on_delete=models.CASCADE, primary_key=True, related_name='counter', verbose_name='Тема')
+    count = models.IntegerField(default=0, verbose_name='Количество сообщений')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата обновления')
+
+    objects = ListCounterManager()
+
+    def __str__(self):
+        return f'{self.theme_id} - Счетчик сообщений темы - {self.count}'
+
+    class Meta:
+        verbose_name = 'Счетчик сообщений темы'
+        verbose_name_plural = 'Счетчики сообщений тем'
+
+
+class CategoryCounter(models.Model):
+    """Число живых тем категории для пагинации списка тем категории"""
+    parent_field = 'category'
+    children = 'themes'
+
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, primary_key=True, related_name='counter', verbose_name='Категория')
+    count = models.IntegerField(default=0, verbose_name='Количество тем')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата обновления')
+
+    objects = ListCounterManager()
+
+    def __str__(self):
+        return f'{self.category_id} - Счетчик тем категории - {self.count}'
+
+    class Meta:
+        verbose_name = 'Счетчик тем категории'
+        verbose_name_plural = 'Счетчики тем категорий'
+
+
+class ChangeLogManager(models.Manager):
+    """Запись, выдача и сокращение журнала изменений"""
+    GAP_KEY = 'api:changes:gap:{}'
+
+    def record(self, model_or_kind, object_ids, action):
+        """Добавляет записи об изменении объектов одним INSERT"""
+        kind = model_or_kind if isinstance(model_or_kind, str) \
+            else model_or_kind._meta.model_name
+        if kind not in dict(ChangeLog.KIND_CHOICES):
+            return
+        self.bulk_create([
+            ChangeLog(kind=kind, object_id=object_id, action=action)
+            for object_id in object_ids], batch_size=500)
+
+    def record_purged(self, model, pks):
+        """
+        Записи об удалении перед физическим удалением пачки (api.deletion).
+        Мягко удаленные записи уже отражены в журнале при пометке
+        """
+        if model._meta.model_name not in dict(ChangeLog.KIND_CHOICES):
+            return
+        if any(field.name == 'is_deleted' for field in model._meta.fields):
+            pks = list(model._base_manager.filter(
+                pk__in=pks, is_deleted=False).values_list('pk', flat=True))
+        self.record(model, pks, ChangeLog.DELETED)
+
+    def head(self):
+        """Токен последней записи журнала"""
+        return self.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def settled(self, pks, since):
+        """
+        Число первых pks (токены после since по возрастанию), которые можно
+        выдать. Видимая запись уже зафиксирована, а еще не зафиксированная
+        запись с меньшим id может быть только в пропуске id. Пропуск
+        закрывается, если он виден дольше CHANGES_SETTLE_SECONDS: откат
+        транзакции и сокращение журнала оставляют пропуски навсегда.
+        Время первого наблюдения пропусков страницы хранится в общем кэше
+        процессов (api.caching), поэтому страница с пропусками
+        задерживается не больше одного раза. В SQLite записи фиксируются
+        по порядку id, и пропуски появляются только после отката и
+        сокращения журнала
+        """
+        wait = getattr(settings, 'CHANGES_SETTLE_SECONDS', 1)
+        gaps = [pk for previous, pk in zip([since] + pks, pks)
+                if pk != previous + 1]
+        if not wait or not gaps:
+            return len(pks)
+        cache = shared_cache()
+        now = time.time()
+        seen = cache.get_many([self.GAP_KEY.format(pk) for pk in gaps])
+        new = {self.GAP_KEY.format(pk): now for pk in gaps
+               if self.GAP_KEY.format(pk) not in seen}
+        if new:
+            cache.set_many(new, timeout=max(3600, wait * 10))
+        seen.update(new)
+        for pk in gaps:
+            if seen[self.GAP_KEY.format(pk)] > now - wait:
+                return pks.index(pk)
+        return len(pks)
+
+    def compact(self, batch_size=5000):
+        """
+        Удаляет записи, после которых есть более новая запись о том же объекте:
+        клиент, пропустивший их, все равно получит последнюю.
+        Проход идет пачками по диапазонам первичного ключа
+        """
+        newer = self.filter(kind=models.OuterRef('kind'),
+                            object_id=models.OuterRef('object_id'),
+                            pk__gt=models.OuterRef('pk'))
+        removed = 0
+        last_pk = 0
+        head = self.head()
+        while last_pk < head:
+            upper = last_pk + batch_size
+            removed += self.filter(pk__gt=last_pk, pk__lte=upper).filter(
+                models.Exists(newer)).delete()[0]
+            last_pk = upper
+        return removed
+
+    def expire_tombstones(self, older_than):
+        """
+        Удаляет записи об удалении старше older_than и добавляет отметку
+        RESET с новым id, object_id отметки - id последней удаленной записи:
+        клиент с токеном меньше него мог пропустить удаление и должен
+        выполнить полную синхронизацию
+        """
+        tombstones = self.filter(
+            action=ChangeLog.DELETED, created_at__lt=older_than
+        ).exclude(kind=ChangeLog.RESET)
+        last = tombstones.order_by('-pk').values_list('pk', flat=True).first()
+        if last is None:
+            return 0
+        with transaction.atomic():
+            removed = tombstones.filter(pk__lte=last).delete()[0]
+            previous = self.filter(kind=ChangeLog.RESET).values_list(
+                'object_id', flat=True).first() or 0
+            self.filter(kind=ChangeLog.RESET).delete()
+            self.create(kind=ChangeLog.RESET, object_id=max(last, previous),
+                        action=ChangeLog.DELETED)
+        return removed
+
+
+class ChangeLog(models.Model):
+    """
+    Журнал изменений для инкрементальной синхронизации клиентов (changes/).
+    Записи только добавляются, первичный ключ служит токеном синхронизации.
+    Заполняется обработчиками сигналов и явно при массовых операциях
+    """
+    CREATED = 'c'
+    UPDATED = 'u'
+    DELETED = 'd'
+    ACTION_CHOICES = [
+        (CREATED, 'Создан'),
+        (UPDATED, 'Изменен'),
+        (DELETED, 'Удален'),
+    ]
+
+    RESET = 'reset'
+    KIND_CHOICES = [
+        ('category', 'Категория'),
+        ('theme', 'Тема'),
+        ('message', 'Сообщение'),
+        ('like', 'Оценки сообщения'),
+        (RESET, 'Журнал сокращен'),
+    ]
+
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, verbose_name='Тип объекта')
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    action = models.CharField(
+        max_length=1, choices=ACTION_CHOICES, verbose_name='Действие')
+    created_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Дата изменения')
+
+    objects = ChangeLogManager()
+
+    def __str__(self):
+        return f'{self.id} - {self.kind} {self.object_id} - {self.action}'
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['kind', 'object_id', 'id'],
+                         name='changelog_object_idx'),
+            models.Index(fields=['action', 'created_at'],
+                         name='changelog_action_created_idx'),
+        ]
+
+
+class Notification(models.Model):
+    """
+    Уведомление пользователя о сообщении: ответ, упоминание или новое
+    сообщение в теме (см. api.notifications). Хранит только ссылки,
+    автор, тема и текст берутся из сообщения. Первичный ключ служит
+    курсором постраничной выдачи
+    """
+    REPLY = 'r'
+    MENTION = 'm'
+    THEME = 't'
+    KIND_CHOICES = [
+        (REPLY, 'Ответ'),
+        (MENTION, 'Упоминание'),
+        (THEME, 'Сообщение в теме'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='notifications', verbose_name='Получатель')
+    message = models.ForeignKey(
+        Message, on_delete=models.CASCADE, related_name='notifications', verbose_name='Сообщение')
+    kind = models.CharField(
+        max_length=1, choices=KIND_CHOICES, verbose_name='Тип уведомления')
+    is_read = models.BooleanField(default=False, verbose_name='Прочитано')
+    created_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Дата уведомления')
+
+    def __str__(self):
+        return f'{self.id} - Уведомление - {self.user_id} - {self.kind}'
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        indexes = [
+            #  постраничная выдача пользователю по убыванию id
+            models.Index(fields=['user', '-id'], name='notification_user_id_idx'),
+            models.Index(fields=['user', 'id'], condition=models.Q(is_read=False),
+                         name='notification_unread_idx'),
+        ]
+        constraints = [
+            #  повтор задачи рассылки не создает дубликатов
+            models.UniqueConstraint(fields=['user', 'message'],
+                                    name='notification_user_message_uniq'),
+        ]
+
+
+class ThemeSubscriptionManager(models.Manager):
+    """Подписки на темы"""
+
+    def subscribe(self, pairs):
+        """
+        Подписывает пары (user_id, theme_id) одним INSERT,
+        существующие подписки не меняются
+        """
+        self.bulk_create([self.model(user_id=user_id, theme_id=theme_id)
+                          for user_id, theme_id in set(pairs)],
+                         ignore_conflicts=True)
+
+
+class ThemeSubscription(models.Model):
+    """
+    Подписка пользователя на тему: уведомления о новых сообщениях и
+    дайджест (см. api.digests). digested_at - граница последнего
+    дайджеста, в следующий попадут сообщения после нее
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='theme_subscriptions', verbose_name='Пользователь')
+    theme = models.ForeignKey(
+        Theme, on_delete=models.CASCADE, related_name='subscriptions', verbose_name='Тема')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата подписки')
+    digested_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Граница последнего дайджеста')
+
+    objects = ThemeSubscriptionManager()
+
+    def __str__(self):
+        return f'{self.id} - Подписка - {self.user_id} на {self.theme_id}'
+
+    class Meta:
+        verbose_name = 'Подписка на тему'
+        verbose_name_plural = 'Подписки на темы'
+        indexes = [
+            models.Index(fields=['user', 'theme'], name='subscription_user_theme_idx'),
+        ]
+        constraints = [
+            #  индекс уникальности по (theme, user) служит и для рассылки
+            models.UniqueConstraint(fields=['theme', 'user'],
+                                    name='subscription_theme_user_uniq'),
+        ]
@@ -0,0 +1,89 @@
+"""
+Уведомления об ответах, упоминаниях (@имя в тексте сообщения) и новых
+сообщениях в темах из подписок (ThemeSubscription). Создание сообщения
+только ставит задачу очереди api.notify_message (см. api.tasks),
+получатели вычисляются и уведомления вставляются пачками вне запроса. Каждый пользователь
+получает о сообщении одно уведомление: ответ важнее упоминания,
+упоминание важнее сообщения в теме. Автор о своем сообщении
+не уведомляется
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import Message, Notification, ThemeSubscription
+from .tasks import enqueue, task
+
+#  имя пользователя Django: буквы, цифры и символы .+-_ ; @ внутри слова
+#  (адреса почты) упоминанием не считается
+MENTION_RE = re.compile(r'(?<![\w@.+-])@([\w.+-]+)')
+MAX_MENTIONS = 20
+
+
+def parse_mentions(content):
+    """Имена упомянутых пользователей в порядке появления, не более MAX_MENTIONS"""
+    names = []
+    for match in MENTION_RE.finditer(content):
+        name = match.group(1).rstrip('.')
+        if name and name not in names:
+            names.append(name)
+            if len(names) == MAX_MENTIONS:
+                break
+    return names
+
+
+def theme_subscribers(theme_id):
+    """Id подписчиков темы (ThemeSubscription) по индексу (theme, user)"""
+    return ThemeSubscription.objects.filter(theme_id=theme_id).order_by(
+        'user_id').values_list('user_id', flat=True)
+
+
+def create_notifications(message_id, recipients, batch_size):
+    """Вставляет уведомления пачками, recipients - пары (user_id, kind)"""
+    batch = []
+    for user_id, kind in recipients:
+        batch.append(Notification(user_id=user_id, message_id=message_id,
+                                  kind=kind))
+        if len(batch) == batch_size:
+            Notification.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Notification.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def notify(message_id, batch_size=None):
+    """Уведомления о сообщении: прямые получатели, затем следящие за темой"""
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 1000)
+    message = Message.objects.filter(pk=message_id).values(
+        'user_id', 'theme_id', 'reply_to__user_id', 'content').first()
+    if message is None:
+        return
+    direct = {}
+    mentions = parse_mentions(message['content'])
+    if mentions:
+        for user_id in User.objects.filter(username__in=mentions).values_list(
+                'pk', flat=True):
+            direct[user_id] = Notification.MENTION
+    if message['reply_to__user_id'] is not None:
+        direct[message['reply_to__user_id']] = Notification.REPLY
+    direct.pop(message['user_id'], None)
+    create_notifications(message_id, direct.items(), batch_size)
+    skip = set(direct) | {message['user_id']}
+    subscribers = theme_subscribers(message['theme_id']).iterator(
+        chunk_size=batch_size)
+    create_notifications(
+        message_id, ((user_id, Notification.THEME) for user_id in subscribers
+                     if user_id not in skip), batch_size)
+
+
+@task('api.notify_message')
+def notify_message_task(message_id):
+    """Задача очереди: рассылка уведомлений о новом сообщении"""
+    notify(message_id)
+
+
+def enqueue_notifications(message):
+    """Ставит рассылку уведомлений о сообщении в очередь после фиксации"""
+    enqueue('api.notify_message', message.pk,
+            dedup_key=f'notify:{message.pk}')
@@ -1,8 +1,190 @@
+"""
+Пагинация списков и способы подсчета count.
+Способ подсчета выбирает представление атрибутом count_strategy:
+    'exact' - COUNT(*) на каждый запрос (по умолчанию);
+    'cached' - COUNT(*) кэшируется по тексту запроса на
+        PAGINATION_COUNT_TIMEOUT секунд;
+    'counter' - поддерживаемый счетчик родителя (count_counters
+        представления: фильтр -> модель счетчика), если из фильтров задан
+        только этот, иначе 'estimated';
+    'estimated' - оценка планировщика (estimate_count) для выборок
+        не меньше EXACT_COUNT_THRESHOLD строк, иначе точный COUNT(*).
+Неточный count не ломает навигацию: страница выбирается с одной лишней
+строкой, next определяется по данным, а count исправляется, если данные
+ему противоречат (на последней странице он становится точным)
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
 from rest_framework.pagination import PageNumberPagination
 
+from .mixins import parse_id
+
+COUNT_STRATEGIES = ('exact', 'cached', 'counter', 'estimated')
+
+#  оценка планировщика используется начиная с этого числа строк
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class CountingPaginator(Paginator):
+    """
+    Paginator с внешним подсчетом: counter() возвращает пару
+    (count, точный ли он). При неточном count страница выбирается
+    с одной лишней строкой и count согласуется с данными
+    """
+
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def counted(self):
+        if self.counter is None:
+            return super().count, True
+        return self.counter()
+
+    @cached_property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def exact(self):
+        return self.counted[1]
+
+    def validate_number(self, number):
+        """При неточном count верхняя граница номера страницы не проверяется"""
+        if self.exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if not items and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        seen = bottom + len(items)
+        count = self.count
+        if not has_more:
+            count = seen
+        elif count <= seen:
+            count = seen + 1
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(items, number, self)
+
+
+def exact_count(queryset):
+    return queryset.count(), True
+
+
+def cached_count(queryset):
+    """COUNT(*), закэшированный по тексту запроса"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'api:count:' + hashlib.md5(
+        f'{queryset.db}:{sql}:{params!r}'.encode('utf-8')).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 60))
+    return count, False
+
+
+def estimated_count(queryset):
+    """Оценка планировщика для больших выборок, иначе точный COUNT(*)"""
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+        return exact_count(queryset)
+    return estimate, False
+
+
+def counter_count(queryset, request, view):
+    """
+    Значение счетчика родителя, если запрос фильтрует только по нему,
+    иначе оценка estimated_count
+    """
+    counters = getattr(view, 'count_counters', {})
+    filterset_class = getattr(view, 'filterset_class', None)
+    names = set(filterset_class.base_filters) if filterset_class else set(counters)
+    used = {name for name in names if request.query_params.get(name) not in (None, '')}
+    if len(used) == 1:
+        name = used.pop()
+        parent_id = parse_id(request.query_params[name])
+        if name in counters and parent_id is not None:
+            return counters[name].objects.count_for(parent_id), False
+    return estimated_count(queryset)
+
 
 class CustomPagination(PageNumberPagination):
-    """Пагинатор для тем и сообщений"""
+    """
+    Пагинатор для тем и сообщений, способ подсчета count задает
+    атрибут представления count_strategy (см. описание модуля)
+    """
     page_size = 15
     max_page_size = 200
-    last_page_strings = ('the_end',)
\ No newline at end of file
+    last_page_strings = ('the_end',)
+
+    def get_counter(self, queryset, request, view):
+        strategy = getattr(view, 'count_strategy', 'exact')
+        if strategy not in COUNT_STRATEGIES:
+            raise ValueError(f'Неизвестный способ подсчета: {strategy}')
+        if strategy == 'cached':
+            return lambda: cached_count(queryset)
+        if strategy == 'counter':
+            return lambda: counter_count(queryset, request, view)
+        if strategy == 'estimated':
+            return lambda: estimated_count(queryset)
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.counter = self.get_counter(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountingPaginator(object_list, per_page, counter=self.counter)
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк queryset по плану запроса PostgreSQL без COUNT(*).
+    Для других СУБД оценки нет, возвращается None
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки для больших таблиц: при оценке планировщика
+    не меньше EXACT_COUNT_THRESHOLD точный COUNT(*) не выполняется
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)[0]
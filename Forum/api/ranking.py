@@ -0,0 +1,196 @@
+"""
+Рейтинги тем и сообщений с экспоненциальным затуханием по времени.
+
+Вклад события с весом w в момент t к моменту now равен
+    w * exp(-(now - t) / tau),
+поэтому порядок элементов по сумме вкладов не меняется со временем, если
+хранить не сумму, а ее логарифм, отсчитанный от фиксированной эпохи:
+    score = ln(sum(w * exp((t - EPOCH) / tau)))
+Новое событие добавляется атомарным UPDATE по формуле logaddexp,
+и переполнения не происходит. Текущее значение (hotness) равно
+exp(score - (now - EPOCH) / tau).
+
+Снятый лайк вычитает свой вклад (момент лайка - updated_at при
+загрузке оценки) по формуле score + ln(1 - exp(w - score)). Если вклад
+сравним со всей суммой и точности не хватает, рейтинг объекта
+пересчитывается полностью. Полный пересчет (команда recompute_rankings)
+также исправляет расхождения после массовых операций
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Message, MessageRelation, MessageScore, Theme, ThemeScore
+
+EPOCH = datetime(2022, 1, 1, tzinfo=dt_timezone.utc)
+
+#  веса событий
+MESSAGE_BASE_WEIGHT = 0.1
+THEME_BASE_WEIGHT = 0.1
+LIKE_WEIGHT = 1.0
+REPLY_WEIGHT = 1.0
+THEME_LIKE_WEIGHT = 0.5
+
+#  минимальный запас score над вычитаемым вкладом в шкале логарифма
+SUBTRACT_MARGIN = 1e-6
+
+
+def tau():
+    """Постоянная затухания в секундах по периоду полураспада"""
+    hours = getattr(settings, 'RANKING_HALF_LIFE_HOURS', 24)
+    return hours * 3600 / math.log(2)
+
+
+def event_score(weight, moment):
+    """Логарифм вклада события в шкале от EPOCH"""
+    return math.log(weight) + (moment - EPOCH).total_seconds() / tau()
+
+
+def logsumexp(values):
+    """Логарифм суммы экспонент без переполнения"""
+    values = list(values)
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def hotness(score, now=None):
+    """Текущее значение рейтинга с учетом затухания"""
+    now = now or timezone.now()
+    return math.exp(score - (now - EPOCH).total_seconds() / tau())
+
+
+def _add(model, lookup, value, **defaults):
+    """Атомарно добавляет вклад value к рейтингу (logaddexp в SQL)"""
+    value = Value(value)
+    combined = Greatest(F('score'), value) + Ln(
+        Value(1.0) + Exp(-Abs(F('score') - value)))
+    if model.objects.filter(**lookup).update(score=combined):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(score=value.value, **lookup, **defaults)
+    except IntegrityError:
+        #  строку успели создать параллельно
+        model.objects.filter(**lookup).update(score=combined)
+
+
+def _subtract(model, lookup, value):
+    """
+    Атомарно вычитает вклад value из рейтинга (log(exp(score) - exp(value))
+    в SQL). False, если строки нет или вклад сравним со всей суммой
+    """
+    value = Value(value)
+    return bool(model.objects.filter(
+        **lookup, score__gt=value + Value(SUBTRACT_MARGIN)).update(
+        score=F('score') + Ln(Value(1.0) - Exp(value - F('score')))))
+
+
+def on_theme_created(theme):
+    """Новая тема: базовый рейтинг темы"""
+    _add(ThemeScore, {'theme_id': theme.pk},
+         event_score(THEME_BASE_WEIGHT, theme.created_at))
+
+
+def on_message_created(message):
+    """Новое сообщение: базовый рейтинг сообщения и вклад ответа в тему"""
+    moment = message.created_at
+    _add(MessageScore, {'message_id': message.pk},
+         event_score(MESSAGE_BASE_WEIGHT, moment), theme_id=message.theme_id)
+    _add(ThemeScore, {'theme_id': message.theme_id},
+         event_score(REPLY_WEIGHT, moment))
+
+
+def on_like(relation):
+    """Новый лайк: вклад в рейтинг сообщения и его темы"""
+    message = Message.all_objects.only(
+        'theme_id', 'is_deleted').get(pk=relation.message_id)
+    if message.is_deleted:
+        return
+    moment = relation.updated_at
+    _add(MessageScore, {'message_id': relation.message_id},
+         event_score(LIKE_WEIGHT, moment), theme_id=message.theme_id)
+    _add(ThemeScore, {'theme_id': message.theme_id},
+         event_score(THEME_LIKE_WEIGHT, moment))
+
+
+def on_unlike(relation, liked_at):
+    """
+    Снятый лайк: вычитает вклад лайка, поставленного в liked_at, из
+    рейтингов сообщения и темы. Без liked_at или при нехватке точности
+    рейтинг пересчитывается
+    """
+    message = Message.all_objects.only(
+        'theme_id', 'is_deleted').get(pk=relation.message_id)
+    if message.is_deleted:
+        return
+    if liked_at is None or not _subtract(
+            MessageScore, {'message_id': relation.message_id},
+            event_score(LIKE_WEIGHT, liked_at)):
+        recompute_messages([relation.message_id])
+    if liked_at is None or not _subtract(
+            ThemeScore, {'theme_id': message.theme_id},
+            event_score(THEME_LIKE_WEIGHT, liked_at)):
+        recompute_themes([message.theme_id])
+
+
+def recompute_messages(message_ids):
+    """Полный пересчет рейтингов пачки сообщений"""
+    messages = list(Message.objects.filter(pk__in=message_ids).values_list(
+        'pk', 'theme_id', 'created_at'))
+    terms = {pk: [event_score(MESSAGE_BASE_WEIGHT, created_at)]
+             for pk, _, created_at in messages}
+    themes = {pk: theme_id for pk, theme_id, _ in messages}
+    likes = MessageRelation.objects.filter(
+        message_id__in=terms, like=True).values_list('message_id', 'updated_at')
+    for message_id, updated_at in likes:
+        terms[message_id].append(event_score(LIKE_WEIGHT, updated_at))
+    with transaction.atomic():
+        MessageScore.objects.filter(message_id__in=message_ids).delete()
+        MessageScore.objects.bulk_create([
+            MessageScore(message_id=pk, theme_id=themes[pk],
+                         score=logsumexp(values))
+            for pk, values in terms.items()])
+
+
+def recompute_themes(theme_ids):
+    """Полный пересчет рейтингов пачки тем"""
+    themes = Theme.objects.filter(pk__in=theme_ids).values_list(
+        'pk', 'created_at')
+    terms = {pk: [event_score(THEME_BASE_WEIGHT, created_at)]
+             for pk, created_at in themes}
+    replies = Message.objects.filter(theme_id__in=terms).values_list(
+        'theme_id', 'created_at')
+    for theme_id, created_at in replies:
+        terms[theme_id].append(event_score(REPLY_WEIGHT, created_at))
+    likes = MessageRelation.objects.filter(
+        message__theme_id__in=terms, message__is_deleted=False, like=True
+    ).values_list('message__theme_id', 'updated_at')
+    for theme_id, updated_at in likes:
+        terms[theme_id].append(event_score(THEME_LIKE_WEIGHT, updated_at))
+    with transaction.atomic():
+        ThemeScore.objects.filter(theme_id__in=theme_ids).delete()
+        ThemeScore.objects.bulk_create([
+            ThemeScore(theme_id=pk, score=logsumexp(values))
+            for pk, values in terms.items()])
+
+
+def recompute_all(batch_size=500):
+    """Пакетный пересчет всех рейтингов по возрастанию pk"""
+    total = 0
+    for model, recompute in ((Theme, recompute_themes),
+                             (Message, recompute_messages)):
+        last_pk = 0
+        while True:
+            ids = list(model.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            recompute(ids)
+            total += len(ids)
+            last_pk = ids[-1]
+    return total
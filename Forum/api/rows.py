@@ -0,0 +1,214 @@
+"""
+Быстрое чтение списков: строки страницы выбираются через .values(),
+а ответ строит функция, один раз скомпилированная по полям сериализатора.
+На строку не создаются ни объекты моделей, ни поля сериализатора.
+Вложенные сериализаторы читаются из той же строки через JOIN, списки pk
+обратных связей - по запросу на связь для всей страницы, как prefetch.
+Вывод совпадает с выводом сериализатора побайтно (tests/test_rows.py)
+"""
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import MessageRelation
+from .serializers import MessageSerializer, ThemeSerializer
+
+#  поля, представление которых совпадает со значением из .values()
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField,
+                serializers.BooleanField, serializers.FloatField)
+
+
+def current_timezone():
+    """Часовой пояс представления дат, как DateTimeField.default_timezone"""
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def datetime_converter(field):
+    """
+    Представление даты, как DateTimeField.to_representation поля field.
+    Часовой пояс current_timezone() определяется один раз для страницы
+    и передается вторым аргументом
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    iso = output_format.lower() == ISO_8601
+    field_timezone = getattr(field, 'timezone', False)
+
+    def convert(value, tz):
+        if isinstance(value, str):
+            return value
+        if field_timezone is not False:
+            tz = field_timezone
+        if tz is not None and value.utcoffset() is not None:
+            value = value.astimezone(tz)
+        else:
+            value = field.enforce_timezone(value)
+        if not iso:
+            return value.strftime(output_format)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _representation(field):
+    def convert(value, tz):
+        return field.to_representation(value)
+    return convert
+
+
+class RowMapper:
+    """
+    Преобразователь строк .values() в представление serializer_class.
+    Поля column_fields берутся из столбцов строки с другим именем
+    (аннотации запроса), поля computed_fields вычисляются методами
+    compute_<имя>(row, state), где state возвращает prepare() для страницы
+    """
+    serializer_class = None
+    column_fields = {}
+    computed_fields = ()
+
+    @cached_property
+    def plan(self):
+        """
+        Скомпилированная функция строки map_row, столбцы values()
+        и обратные связи (столбец pk родителя, модель, столбец связи)
+        """
+        plan = SimpleNamespace(columns=[], relations=[], namespace={})
+        expression = self.compile(plan, self.serializer_class(), '', top=True)
+        source = f'def map_row(r, related, state, tz):\n    return {expression}\n'
+        exec(compile(source, f'<{type(self).__name__}>', 'exec'), plan.namespace)
+        plan.map_row = plan.namespace['map_row']
+        return plan
+
+    def compile(self, plan, serializer, prefix, top=False):
+        """Выражение словаря представления serializer по столбцам с prefix"""
+        namespace = plan.namespace
+        model = serializer.Meta.model
+        items = []
+        for field in serializer._readable_fields:
+            name = field.field_name
+            if top and name in self.computed_fields:
+                function = f'compute_{name}'
+                namespace[function] = getattr(self, function)
+                items.append(f'{name!r}: {function}(r, state)')
+                continue
+            if top and name in self.column_fields:
+                value = self.column(plan, self.column_fields[name])
+                items.append(f'{name!r}: {value}')
+                continue
+            source = field.source
+            unsupported = isinstance(field, serializers.SerializerMethodField) or (
+                isinstance(field, serializers.BaseSerializer)
+                and not isinstance(field, serializers.Serializer))
+            if unsupported or '.' in source or source == '*':
+                raise ImproperlyConfigured(
+                    f'{type(self).__name__}: поле {name} ({type(field).__name__}, '
+                    f'источник {source}) не поддерживается')
+            if isinstance(field, ManyRelatedField):
+                items.append(f'{name!r}: {self.relation(plan, model, field, prefix)}')
+            elif isinstance(field, serializers.Serializer):
+                pk = self.column(plan, f'{prefix}{source}__{model._meta.pk.name}')
+                nested = self.compile(plan, field, f'{prefix}{source}__')
+                items.append(f'{name!r}: (None if {pk} is None else {nested})')
+            elif isinstance(field, PrimaryKeyRelatedField):
+                attname = model._meta.get_field(source).attname
+                items.append(f'{name!r}: {self.column(plan, prefix + attname)}')
+            elif isinstance(field, PLAIN_FIELDS):
+                items.append(f'{name!r}: {self.column(plan, prefix + source)}')
+            else:
+                if isinstance(field, serializers.DateTimeField):
+                    convert = datetime_converter(field)
+                else:
+                    convert = _representation(field)
+                value = self.column(plan, prefix + source)
+                if convert is None:
+                    items.append(f'{name!r}: {value}')
+                    continue
+                function = f'convert_{len(namespace)}'
+                namespace[function] = convert
+                items.append(f'{name!r}: (None if {value} is None '
+                             f'else {function}({value}, tz))')
+        return '{' + ', '.join(items) + '}'
+
+    def column(self, plan, name):
+        if name not in plan.columns:
+            plan.columns.append(name)
+        return f'r[{name!r}]'
+
+    def relation(self, plan, model, field, prefix):
+        """Список pk обратной связи: значения загружает load_related()"""
+        if not isinstance(field.child_relation, PrimaryKeyRelatedField):
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}: поддерживаются только списки pk')
+        rel = model._meta.get_field(field.source)
+        if not rel.one_to_many:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}: {field.source} не обратная связь')
+        parent = f'{prefix}{model._meta.pk.name}'
+        plan.relations.append((parent, rel.related_model, rel.field.attname))
+        index = len(plan.relations) - 1
+        return f'related[{index}].get({self.column(plan, parent)}, [])'
+
+    def values(self, queryset, *extra):
+        """queryset строк для map() с дополнительными столбцами extra"""
+        return queryset.select_related(None).prefetch_related(None).values(
+            *self.plan.columns, *extra)
+
+    def load_related(self, rows):
+        """Списки pk обратных связей по запросу на связь, в порядке модели"""
+        related = []
+        for parent, model, attname in self.plan.relations:
+            ids = {row[parent] for row in rows if row[parent] is not None}
+            groups = {}
+            if ids:
+                for key, pk in model._default_manager.filter(
+                        **{f'{attname}__in': ids}).values_list(attname, 'pk'):
+                    groups.setdefault(key, []).append(pk)
+            related.append(groups)
+        return related
+
+    def prepare(self, rows, request):
+        """Данные страницы для compute_<имя>()"""
+        return None
+
+    def map(self, rows, request=None):
+        """Представления строк rows, полученных из values()"""
+        map_row = self.plan.map_row
+        rows = list(rows)
+        related = self.load_related(rows)
+        state = self.prepare(rows, request)
+        tz = current_timezone()
+        return [map_row(row, related, state, tz) for row in rows]
+
+
+class MessageRowMapper(RowMapper):
+    """Строки списка сообщений (MessageSerializer с likes_count из аннотации)"""
+    serializer_class = MessageSerializer
+    column_fields = {'likes_count': 'likes_count'}
+    computed_fields = ('liked_by_me',)
+
+    def prepare(self, rows, request):
+        #  лайки текущего пользователя для всей страницы одним запросом
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return set()
+        return set(MessageRelation.objects.filter(
+            user=user, like=True, message_id__in=[row['id'] for row in rows],
+        ).values_list('message_id', flat=True))
+
+    def compute_liked_by_me(self, row, liked_ids):
+        return row['id'] in liked_ids
+
+
+class ThemeRowMapper(RowMapper):
+    """Строки списка тем (ThemeSerializer с вложенными категорией и разделом)"""
+    serializer_class = ThemeSerializer
@@ -1,8 +1,100 @@
+from collections import OrderedDict
+
+from django.db import models
 from rest_framework import serializers
-from .models import Chapter, Category, Theme, Message, MessageRelation
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from .models import Chapter, Category, Theme, Message, MessageRelation, ArchivedTheme, Job, UserStats, Notification, MAX_REPLY_DEPTH
+from .archive import unpack_messages
+from .fragments import fragment_cache
 from django.contrib.auth.models import User
 
 
+class FragmentListSerializer(serializers.ListSerializer):
+    """
+    Список объектов с кэшем фрагментов (FragmentCacheMixin): фрагменты
+    всей страницы читаются одним get_many, новые сохраняются одним set_many
+    """
+
+    def to_representation(self, data):
+        cache = fragment_cache()
+        if cache is None:
+            return super().to_representation(data)
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        items = list(iterable)
+        self.child.fragments = cache.get_many(
+            [self.child.fragment_key(item) for item in items])
+        self.child.new_fragments = {}
+        try:
+            result = super().to_representation(items)
+            cache.set_many(self.child.new_fragments)
+        finally:
+            self.child.fragments = self.child.new_fragments = None
+        return result
+
+
+class FragmentCacheMixin:
+    """
+    Кэш представления объекта по версии (api.fragments), включается
+    наследованием. Поля fragment_volatile_fields (зависящие от пользователя,
+    от других объектов или от аннотаций запроса) вычисляются каждый раз,
+    остальные берутся из фрагмента, ключ которого включает значение поля
+    fragment_version_field. Результат совпадает с обычной сериализацией,
+    включая порядок полей. Изменения в обход save() (QuerySet.update)
+    должны обновлять поле версии
+    """
+    fragment_version_field = 'updated_at'
+    fragment_volatile_fields = ()
+    fragments = None
+    new_fragments = None
+
+    def fragment_key(self, instance):
+        return (type(self).__name__, instance._meta.label_lower, instance.pk,
+                getattr(instance, self.fragment_version_field))
+
+    def render_fields(self, instance, fields):
+        """Представление полей fields, как в Serializer.to_representation"""
+        ret = OrderedDict()
+        for field in fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(
+                attribute, PKOnlyObject) else attribute
+            ret[field.field_name] = None if check_for_none is None \
+                else field.to_representation(attribute)
+        return ret
+
+    def to_representation(self, instance):
+        cache = fragment_cache()
+        if cache is None or instance.pk is None:
+            return super().to_representation(instance)
+        fields = list(self._readable_fields)
+        key = self.fragment_key(instance)
+        fragment = self.fragments.get(key) if self.fragments is not None \
+            else cache.get(key)
+        if fragment is None:
+            fragment = self.render_fields(instance, [
+                field for field in fields
+                if field.field_name not in self.fragment_volatile_fields])
+            if self.new_fragments is not None:
+                self.new_fragments[key] = fragment
+            else:
+                cache.set(key, fragment)
+        volatile = self.render_fields(instance, [
+            field for field in fields
+            if field.field_name in self.fragment_volatile_fields])
+        ret = OrderedDict()
+        for field in fields:
+            name = field.field_name
+            if name in volatile:
+                ret[name] = volatile[name]
+            elif name in fragment:
+                ret[name] = fragment[name]
+        return ret
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователя"""
 
@@ -11,6 +103,15 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'is_staff']
 
 
+class UserStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор счетчиков пользователя"""
+
+    class Meta:
+        model = UserStats
+        fields = ['user', 'messages_count', 'themes_count', 'likes_received',
+                  'updated_at']
+
+
 class ChapterSerializer(serializers.ModelSerializer):
     """Сериализатор раздела форума"""
     categories = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
@@ -47,15 +148,29 @@ class CategorySerializerChange(serializers.ModelSerializer):
         fields = ['id', 'chapter', 'name', 'description']
 
 
-class ThemeSerializer(serializers.ModelSerializer):
-    """Сериализатор темы на форуме"""
+class ThemeSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    """
+    Сериализатор темы на форуме. Категория и список сообщений зависят
+    от других объектов и не кэшируются во фрагменте темы
+    """
     category = CategorySerializer()
     messages = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    fragment_volatile_fields = ('category', 'messages')
 
     class Meta:
         model = Theme
         fields = ['id', 'category', 'name',
                   'status', 'user', 'messages', 'created_at']
+        list_serializer_class = FragmentListSerializer
+
+
+class TrendingThemeSerializer(ThemeSerializer):
+    """Сериализатор темы из рейтинга с текущим значением рейтинга"""
+    hotness = serializers.FloatField(read_only=True)
+    fragment_volatile_fields = ThemeSerializer.fragment_volatile_fields + ('hotness',)
+
+    class Meta(ThemeSerializer.Meta):
+        fields = ThemeSerializer.Meta.fields + ['hotness']
 
 
 class CategoryRetrieveSerializer(serializers.ModelSerializer):
@@ -77,18 +192,70 @@ class ThemeSerializerChange(serializers.ModelSerializer):
                   'status', 'user']
 
 
-class MessageSerializer(serializers.ModelSerializer):
-    """Сериализатор сообщения на форуме"""
+class MessageListSerializer(FragmentListSerializer):
+    """
+    Список сообщений: лайки текущего пользователя для всей страницы
+    определяются одним запросом до сериализации элементов
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        messages = list(iterable)
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            self.child.liked_ids = set(MessageRelation.objects.filter(
+                user=user, like=True,
+                message_id__in=[message.pk for message in messages],
+            ).values_list('message_id', flat=True))
+        else:
+            self.child.liked_ids = set()
+        return super().to_representation(messages)
+
+
+class MessageSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    """
+    Сериализатор сообщения на форуме (лайки и число ответов, которое
+    меняется без изменения updated_at, не кэшируются во фрагменте)
+    """
     likes_count = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+    fragment_volatile_fields = ('likes_count', 'liked_by_me', 'replies_count')
 
     class Meta:
         model = Message
-        fields = ['id', 'user', 'theme', 'content',
-                  'created_at', 'updated_at', 'likes_count']
+        fields = ['id', 'user', 'theme', 'reply_to', 'content', 'created_at',
+                  'updated_at', 'likes_count', 'liked_by_me', 'replies_count']
+        read_only_fields = ['reply_to', 'replies_count']
+        list_serializer_class = MessageListSerializer
 
     def get_likes_count(self, inctance):
+        #  списки аннотируют количество лайков в основном запросе
+        if hasattr(inctance, 'likes_count'):
+            return inctance.likes_count
         return MessageRelation.objects.filter(message=inctance, like=True).count()
 
+    def get_liked_by_me(self, inctance):
+        #  в списках множество лайкнутых id заполняет MessageListSerializer
+        liked_ids = getattr(self, 'liked_ids', None)
+        if liked_ids is not None:
+            return inctance.pk in liked_ids
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return False
+        return MessageRelation.objects.filter(
+            message=inctance, user=user, like=True).exists()
+
+
+class TopMessageSerializer(MessageSerializer):
+    """Сериализатор сообщения из рейтинга с текущим значением рейтинга"""
+    hotness = serializers.FloatField(read_only=True)
+    fragment_volatile_fields = MessageSerializer.fragment_volatile_fields + ('hotness',)
+
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ['hotness']
+
 
 class ThemeRetrieveSerializer(serializers.ModelSerializer):
     """Сериализатор получения 1 темы на форуме"""
@@ -110,7 +277,8 @@ class MessageCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Message
-        fields = ['id', 'user', 'theme', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'theme', 'reply_to', 'content', 'created_at',
+                  'updated_at']
 
     def validate_theme(self, value):
         """
@@ -122,9 +290,99 @@ class MessageCreateSerializer(serializers.ModelSerializer):
                 "Невозможно создать сообщение в закрытой теме")
         return value
 
+    def validate(self, attrs):
+        """Ответ возможен только на сообщение той же темы и до MAX_REPLY_DEPTH"""
+        reply_to = attrs.get('reply_to')
+        if reply_to is not None:
+            if reply_to.theme_id != attrs['theme'].pk:
+                raise serializers.ValidationError(
+                    {'reply_to': 'Сообщение из другой темы'})
+            if reply_to.depth >= MAX_REPLY_DEPTH:
+                raise serializers.ValidationError(
+                    {'reply_to': 'Превышена глубина ветки ответов'})
+        return attrs
+
 
 class MessageRelationSerializer(serializers.ModelSerializer):
     """Сериализатор для модели MessageRelation"""
     class Meta:
         model = MessageRelation
         fields = ['id', 'user', 'message', 'like']
+
+
+class ArchivedThemeSerializer(serializers.ModelSerializer):
+    """Сериализатор архивной темы (без сообщений)"""
+
+    class Meta:
+        model = ArchivedTheme
+        fields = ['id', 'category', 'name', 'user', 'created_at',
+                  'last_activity_at', 'archived_at', 'messages_count']
+
+
+class ArchivedThemeRetrieveSerializer(ArchivedThemeSerializer):
+    """Сериализатор получения 1 архивной темы вместе с сообщениями"""
+    messages = serializers.SerializerMethodField()
+
+    class Meta(ArchivedThemeSerializer.Meta):
+        fields = ArchivedThemeSerializer.Meta.fields + ['messages']
+
+    def get_messages(self, instance):
+        return unpack_messages(instance.payload)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой операции"""
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'target_id', 'status', 'processed', 'total',
+                  'progress', 'error', 'created_at', 'started_at', 'finished_at']
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Сериализатор уведомления с темой и автором сообщения"""
+    theme = serializers.IntegerField(source='message.theme_id', read_only=True)
+    actor = serializers.IntegerField(source='message.user_id', read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'message', 'theme', 'actor', 'is_read',
+                  'created_at']
+
+
+#  наибольшее число объектов одной массовой операции модерации
+MAX_BULK_OBJECTS = 10000
+
+
+class ThemeBulkSerializer(serializers.Serializer):
+    """Параметры массовой операции над темами"""
+    themes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1,
+        max_length=MAX_BULK_OBJECTS)
+
+
+class ThemeMoveSerializer(ThemeBulkSerializer):
+    """Параметры переноса тем в категорию"""
+    category = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.only('id'))
+
+
+class UserMessagesDeleteSerializer(serializers.Serializer):
+    """Параметры удаления сообщений пользователя за промежуток времени"""
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.only('id'))
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if 'since' in attrs and 'until' in attrs and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError(
+                {'until': 'Конец промежутка должен быть позже начала'})
+        return attrs
+
+
+class MessageVersionSerializer(serializers.Serializer):
+    """Сериализатор версии сообщения из истории изменений"""
+    revision = serializers.IntegerField(allow_null=True)
+    content = serializers.CharField()
+    valid_from = serializers.DateTimeField()
+    editor = serializers.IntegerField(allow_null=True)
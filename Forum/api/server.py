@@ -0,0 +1,36 @@
+"""
+Промышленный WSGI сервер для команды serve - gunicorn, запущенный из
+manage.py с настройками Django. Главный процесс загружает приложение
+(preload) и запускает workers процессов с воркером gthread: threads
+потоков на процесс, число одновременно принятых соединений ограничено
+worker_connections, остальные ждут в очереди сокета (backlog). Рабочий
+процесс перезапускается после max_requests запросов с разбросом
+max_requests_jitter. Сигналы главного процесса - сигналы gunicorn:
+    SIGHUP - плавный перезапуск рабочих процессов,
+    SIGTERM - плавная остановка (с ожиданием graceful_timeout),
+    SIGTTIN, SIGTTOU - добавить или убрать рабочий процесс
+"""
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connections
+from django.urls import get_resolver
+from gunicorn.app.base import BaseApplication
+
+
+class ForumApplication(BaseApplication):
+    """Приложение gunicorn с параметрами из команды serve вместо файла конфигурации"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        application = get_internal_wsgi_application()
+        #  импорт представлений и сериализаторов до fork
+        get_resolver().url_patterns
+        #  соединения с базой не должны наследоваться рабочими процессами
+        connections.close_all()
+        return application
@@ -0,0 +1,166 @@
+"""
+Обработчики сигналов моделей приложения, подключаются в ApiConfig.ready().
+Массовые операции (QuerySet.update, api.deletion) сигналов не отправляют,
+поэтому там те же действия выполняются явно.
+В очередь задач (api.tasks) вынесены только уведомления и операции
+модерации. Счетчики (ThemeCounter, CategoryCounter, UserStats) и рейтинги
+остаются в транзакции записи намеренно: это приращения, а не пересчет, и
+фиксируются вместе с самим изменением, поэтому не расходятся с данными,
+если задача будет потеряна или исчерпает попытки. Их сразу читают
+пагинация, дерево и профиль автора, а постановка задачи сама стоит одного
+INSERT - столько же, сколько приращение счетчика
+"""
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from . import ranking
+from .caching import bump_content_version
+from .notifications import enqueue_notifications
+from .tree import bump_tree_version
+from .models import (Category, CategoryCounter, Chapter, ChangeLog, Message,
+                     MessageRelation, MessageScore, Theme, ThemeCounter,
+                     ThemeSubscription, UserStats)
+
+CONTENT_MODELS = (Chapter, Category, Theme)
+SYNCED_MODELS = (Category, Theme, Message)
+TREE_MODELS = (Chapter, Category)
+
+
+def invalidate_response_cache(sender, **kwargs):
+    """Изменение разделов, категорий и тем инвалидирует весь кэш ответов"""
+    bump_content_version()
+
+
+def invalidate_messages_cache(sender, instance, **kwargs):
+    """Изменение сообщения инвалидирует ответы с сообщениями его темы"""
+    bump_content_version(f'theme:{instance.theme_id}', 'messages')
+
+
+def invalidate_tree(sender, **kwargs):
+    """Изменение разделов и категорий устаревает снимки дерева форума"""
+    bump_tree_version()
+
+
+def record_saved(sender, instance, created, raw=False, **kwargs):
+    """Создание или изменение объекта попадает в журнал изменений"""
+    if not raw:
+        ChangeLog.objects.record(sender, [instance.pk], ChangeLog.CREATED
+                                 if created else ChangeLog.UPDATED)
+
+
+def record_deleted(sender, instance, **kwargs):
+    """Удаление объекта попадает в журнал изменений"""
+    ChangeLog.objects.record(sender, [instance.pk], ChangeLog.DELETED)
+
+
+def theme_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Новая тема: базовый рейтинг, счетчики тем автора и категории,
+    подписка автора на тему
+    """
+    if created and not raw:
+        ranking.on_theme_created(instance)
+        UserStats.objects.apply_deltas({instance.user_id: {'themes_count': 1}})
+        CategoryCounter.objects.apply_deltas({instance.category_id: 1})
+        ThemeSubscription.objects.subscribe([(instance.user_id, instance.pk)])
+
+
+def theme_moved(sender, instance, created, raw=False, **kwargs):
+    """Смена категории живой темы переносит ее в счетчиках категорий"""
+    old = getattr(instance, 'loaded_category_id', None)
+    instance.loaded_category_id = instance.category_id
+    if created or raw or old is None or old == instance.category_id:
+        return
+    if not instance.is_deleted:
+        CategoryCounter.objects.apply_deltas({old: -1, instance.category_id: 1})
+
+
+def message_moved(sender, instance, created, raw=False, **kwargs):
+    """
+    Смена темы живого сообщения переносит его в счетчиках и рейтинге
+    сообщений тем, ответы с сообщениями прежней темы инвалидируются
+    """
+    old = getattr(instance, 'loaded_theme_id', None)
+    instance.loaded_theme_id = instance.theme_id
+    if created or raw or old is None or old == instance.theme_id:
+        return
+    bump_content_version(f'theme:{old}')
+    if not instance.is_deleted:
+        ThemeCounter.objects.apply_deltas({old: -1, instance.theme_id: 1})
+        MessageScore.objects.filter(message_id=instance.pk).update(
+            theme_id=instance.theme_id)
+
+
+def message_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Новое сообщение: вклад в рейтинги, счетчики сообщений автора и темы,
+    для ответа - счетчик ответов родителя (родитель попадает в журнал
+    изменений), подписка автора на тему и рассылка уведомлений в очереди задач
+    """
+    if created and not raw:
+        ranking.on_message_created(instance)
+        UserStats.objects.apply_deltas({instance.user_id: {'messages_count': 1}})
+        ThemeCounter.objects.apply_deltas({instance.theme_id: 1})
+        ThemeSubscription.objects.subscribe([(instance.user_id, instance.theme_id)])
+        if instance.reply_to_id is not None:
+            Message.objects.filter(pk=instance.reply_to_id).update(
+                replies_count=F('replies_count') + 1)
+            ChangeLog.objects.record(Message, [instance.reply_to_id],
+                                     ChangeLog.UPDATED)
+        enqueue_notifications(instance)
+
+
+def like_changed(sender, instance, raw=False, **kwargs):
+    """
+    Изменение лайка (а не повторное сохранение старого значения):
+    вклад в рейтинги или его вычитание при снятии, счетчик полученных
+    лайков автора сообщения, запись в журнал изменений и инвалидация
+    ответов с сообщениями темы
+    """
+    was_liked = bool(getattr(instance, 'loaded_like', False))
+    liked_at = getattr(instance, 'loaded_updated_at', None)
+    instance.loaded_like = instance.like
+    instance.loaded_updated_at = instance.updated_at
+    if raw or instance.like == was_liked:
+        return
+    if instance.like:
+        ranking.on_like(instance)
+    else:
+        ranking.on_unlike(instance, liked_at)
+    ChangeLog.objects.record('like', [instance.message_id], ChangeLog.UPDATED)
+    message = Message.objects.filter(
+        pk=instance.message_id).values_list('user_id', 'theme_id').first()
+    if message is not None:
+        author, theme_id = message
+        UserStats.objects.apply_deltas(
+            {author: {'likes_received': 1 if instance.like else -1}})
+        bump_content_version(f'theme:{theme_id}', 'messages')
+
+
+def connect():
+    for model in CONTENT_MODELS:
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_response_cache, sender=model,
+                           dispatch_uid=f'invalidate_response_cache_{model.__name__}')
+    for signal in (post_save, post_delete):
+        signal.connect(invalidate_messages_cache, sender=Message,
+                       dispatch_uid='invalidate_messages_cache')
+    post_delete.connect(invalidate_response_cache, sender=MessageRelation,
+                        dispatch_uid='invalidate_response_cache_MessageRelation')
+    for model in TREE_MODELS:
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_tree, sender=model,
+                           dispatch_uid=f'invalidate_tree_{model.__name__}')
+    for model in SYNCED_MODELS:
+        post_save.connect(record_saved, sender=model,
+                          dispatch_uid=f'record_saved_{model.__name__}')
+        post_delete.connect(record_deleted, sender=model,
+                            dispatch_uid=f'record_deleted_{model.__name__}')
+    post_save.connect(theme_created, sender=Theme,
+                      dispatch_uid='theme_created')
+    post_save.connect(message_created, sender=Message,
+                      dispatch_uid='message_created')
+    post_save.connect(theme_moved, sender=Theme, dispatch_uid='theme_moved')
+    post_save.connect(message_moved, sender=Message, dispatch_uid='message_moved')
+    post_save.connect(like_changed, sender=MessageRelation,
+                      dispatch_uid='like_changed')
@@ -0,0 +1,107 @@
+"""
+Профилирование запуска рабочего процесса (команда profile_startup).
+Холодный запуск выполняется в отдельном интерпретаторе с -X importtime:
+django.setup(), загрузка WSGI приложения и всех url. Время импорта и
+выделенная при запуске память (tracemalloc) группируются по приложениям
+INSTALLED_APPS, остальные модули - по пакету верхнего уровня
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+PROBE = '''
+import json, os, sys, time, tracemalloc
+trace = sys.argv[1] == 'trace'
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.urls import get_resolver
+get_internal_wsgi_application()
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+memory = {}
+if trace:
+    files = {getattr(module, '__file__', None): name
+             for name, module in list(sys.modules.items())}
+    for stat in tracemalloc.take_snapshot().statistics('filename'):
+        name = files.get(stat.traceback[0].filename)
+        if name:
+            memory[name] = memory.get(name, 0) + stat.size
+try:
+    with open('/proc/self/statm') as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+except OSError:
+    # без /proc (macOS, BSD) - пиковый RSS, в Linux в КБ, в macOS в байтах
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        rss *= 1024
+print(json.dumps({'seconds': elapsed, 'rss': rss, 'modules': len(sys.modules),
+                  'apps': list(settings.INSTALLED_APPS), 'memory': memory}))
+'''
+
+IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|\s+(.*)$')
+
+
+def run_probe(settings_module, trace=False):
+    """Холодный запуск в отдельном процессе, возвращает (отчет, время импорта модулей)"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE,
+         'trace' if trace else 'time'],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        check=True)
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            imports[match.group(3).strip()] = int(match.group(1))
+    return json.loads(result.stdout.splitlines()[-1]), imports
+
+
+def group_of(module, apps):
+    """Приложение INSTALLED_APPS, к которому относится модуль, иначе пакет"""
+    best = None
+    for app in apps:
+        if (module == app or module.startswith(app + '.')) and (
+                best is None or len(app) > len(best)):
+            best = app
+    return best or module.split('.')[0]
+
+
+def profile(settings_module, runs=3):
+    """
+    Отчет о запуске: медиана времени по runs запускам, RSS процесса,
+    время импорта (собственное, в мс) и память по группам модулей
+    """
+    timings = [run_probe(settings_module) for _ in range(runs)]
+    traced, _ = run_probe(settings_module, trace=True)
+    apps = [app.rsplit('.apps.', 1)[0] for app in traced['apps']]
+    groups = {}
+    for report, imports in timings:
+        for module, micros in imports.items():
+            group = groups.setdefault(group_of(module, apps),
+                                      {'import_ms': 0.0, 'memory_kb': 0.0})
+            group['import_ms'] += micros / 1000 / runs
+    for module, size in traced['memory'].items():
+        group = groups.setdefault(group_of(module, apps),
+                                  {'import_ms': 0.0, 'memory_kb': 0.0})
+        group['memory_kb'] += size / 1024
+    return {
+        'settings': settings_module,
+        'startup_ms': statistics.median(
+            report['seconds'] for report, _ in timings) * 1000,
+        'rss_mb': statistics.median(
+            report['rss'] for report, _ in timings) / 2 ** 20,
+        'modules': timings[0][0]['modules'],
+        'groups': groups,
+    }
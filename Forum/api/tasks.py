@@ -0,0 +1,191 @@
+"""
+Легковесная очередь отложенной работы на базе таблицы Task.
+Задача регистрируется декоратором task, ставится в очередь функцией enqueue
+после фиксации транзакции и выполняется командой run_tasks в пуле процессов.
+Поддерживаются повторы с задержкой и дедупликация ожидающих задач по ключу.
+Задача, исчерпавшая попытки (в том числе зависшая в выполнении), получает
+статус FAILED, и вызывается ее обработчик on_failure с аргументами задачи.
+При TASKS_EAGER = True задачи выполняются сразу после фиксации транзакции
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name, max_attempts=3, retry_delay=30, on_failure=None):
+    """
+    Регистрирует функцию как задачу очереди.
+    retry_delay - базовая задержка повтора в секундах, растет с номером попытки,
+    on_failure - функция, вызываемая с аргументами задачи после последней
+    неудачной попытки
+    """
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        func.retry_delay = retry_delay
+        func.on_failure = on_failure
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, *args, dedup_key=None, delay=0):
+    """
+    Ставит задачу в очередь после фиксации текущей транзакции.
+    Если задача с тем же dedup_key уже ожидает выполнения, новая не создается
+    """
+    func = TASKS[name]
+
+    def insert():
+        if getattr(settings, 'TASKS_EAGER', False):
+            func(*args)
+            return
+        try:
+            with transaction.atomic():
+                Task.objects.create(
+                    name=name, args=list(args), dedup_key=dedup_key,
+                    max_attempts=func.max_attempts,
+                    run_after=timezone.now() + timedelta(seconds=delay))
+        except IntegrityError:
+            logger.debug('Задача %s с ключом %s уже в очереди', name, dedup_key)
+
+    transaction.on_commit(insert)
+
+
+def claim_tasks(limit):
+    """Атомарно захватывает до limit готовых к выполнению задач"""
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.PENDING, run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    claimed = []
+    for task_id in candidates:
+        #  условный UPDATE гарантирует, что задачу получит один обработчик
+        if Task.objects.filter(pk=task_id, status=Task.PENDING).update(
+                status=Task.RUNNING, started_at=now,
+                attempts=F('attempts') + 1):
+            claimed.append(task_id)
+    return claimed
+
+
+def _failed(task_obj):
+    """Вызывает обработчик on_failure задачи, исчерпавшей попытки"""
+    func = TASKS.get(task_obj.name)
+    if func is None or func.on_failure is None:
+        return
+    try:
+        func.on_failure(*task_obj.args)
+    except Exception:
+        logger.exception('Обработчик отказа задачи %s (%s) завершился с ошибкой',
+                         task_obj.pk, task_obj.name)
+
+
+def execute(task_id):
+    """Выполняет захваченную задачу, при ошибке планирует повтор"""
+    task_obj = Task.objects.get(pk=task_id)
+    func = TASKS.get(task_obj.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task_obj.name}')
+        func(*task_obj.args)
+    except Exception as exc:
+        logger.exception('Задача %s (%s) завершилась с ошибкой',
+                         task_obj.pk, task_obj.name)
+        task_obj.last_error = repr(exc)
+        if func is not None and task_obj.attempts < task_obj.max_attempts:
+            task_obj.status = Task.PENDING
+            task_obj.run_after = timezone.now() + timedelta(
+                seconds=func.retry_delay * task_obj.attempts)
+        else:
+            task_obj.status = Task.FAILED
+            task_obj.finished_at = timezone.now()
+    else:
+        task_obj.status = Task.DONE
+        task_obj.finished_at = timezone.now()
+    try:
+        with transaction.atomic():
+            task_obj.save(update_fields=[
+                'status', 'last_error', 'run_after', 'finished_at'])
+    except IntegrityError:
+        #  пока задача выполнялась, в очередь встала такая же
+        task_obj.status = Task.FAILED
+        Task.objects.filter(pk=task_obj.pk).update(
+            status=Task.FAILED, finished_at=timezone.now())
+    if task_obj.status == Task.FAILED:
+        _failed(task_obj)
+    return task_obj.status
+
+
+def requeue_stale(seconds):
+    """
+    Возвращает в очередь задачи, зависшие в выполнении дольше seconds.
+    Зависшие задачи без оставшихся попыток завершаются со статусом FAILED.
+    Возвращает число возвращенных в очередь и завершенных задач
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.RUNNING,
+                                started_at__lt=now - timedelta(seconds=seconds))
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Task.PENDING)
+    failed = 0
+    for task_obj in stale.filter(attempts__gte=F('max_attempts')).only(
+            'name', 'args'):
+        #  условный UPDATE: задачу мог завершить сам обработчик
+        if Task.objects.filter(pk=task_obj.pk, status=Task.RUNNING).update(
+                status=Task.FAILED, finished_at=now,
+                last_error='Задача зависла в выполнении'):
+            failed += 1
+            _failed(task_obj)
+    return requeued, failed
+
+
+def queue_metrics(window=timedelta(hours=1)):
+    """
+    Метрики очереди: глубина по статусам, возраст старейшей ожидающей
+    задачи и задержки выполненных за окно window задач по именам
+    """
+    now = timezone.now()
+    depth = dict(Task.objects.order_by().values_list(
+        'status').annotate(count=Count('id')))
+    oldest = Task.objects.filter(status=Task.PENDING).aggregate(
+        oldest=Min('created_at'))['oldest']
+    latency = Task.objects.filter(
+        status=Task.DONE, finished_at__gte=now - window
+    ).order_by().values('name').annotate(
+        done=Count('id'),
+        avg_wait=Avg(F('started_at') - F('created_at')),
+        avg_run=Avg(F('finished_at') - F('started_at')),
+    )
+    return {
+        'depth': {status: depth.get(status, 0)
+                  for status, _ in Task.STATUS_CHOICES},
+        'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'tasks': [
+            {
+                'name': row['name'],
+                'done': row['done'],
+                'avg_wait_seconds': _seconds(row['avg_wait']),
+                'avg_run_seconds': _seconds(row['avg_run']),
+            } for row in latency
+        ],
+    }
+
+
+def _seconds(value):
+    """Приводит результат Avg по интервалу к секундам"""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    #  SQLite возвращает среднее интервала в микросекундах
+    return value / 1_000_000
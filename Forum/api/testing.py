@@ -0,0 +1,101 @@
+"""
+Инфраструктура тестов: запуск набора в нескольких процессах, базовый
+класс для тестов с данными уровня класса (setUpTestData) и проверка
+бюджетов эндпоинтов (api.budgets)
+"""
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from rest_framework.test import APITestCase
+
+from . import budgets
+from .caching import shared_cache
+from .fragments import fragment_cache
+
+
+class ParallelTestRunner(DiscoverRunner):
+    """
+    Тесты выполняются параллельно по процессу на ядро (--parallel 1
+    отключает, DJANGO_TEST_PROCESSES ограничивает число процессов).
+    Каждый процесс работает с собственной копией тестовой базы и своим
+    локальным кэшем, общий кэш ('shared') тоже заменяется локальным.
+    Пароли хэшируются MD5: стойкое хэширование
+    занимает заметную долю времени тестов регистрации и входа.
+    При поиске тестов по каталогу (весь набор) добавляется BudgetTestCase,
+    --exclude-tag budgets отключает проверку бюджетов
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel='auto')
+
+    def load_tests_for_label(self, label, discover_kwargs):
+        tests = super().load_tests_for_label(label, discover_kwargs)
+        is_directory = os.path.isdir(os.path.abspath(label)) or os.path.isdir(
+            label.replace('.', os.sep))
+        if is_directory and not getattr(self, 'budgets_added', False):
+            self.budgets_added = True
+            tests.addTests(self.test_loader.loadTestsFromTestCase(BudgetTestCase))
+        return tests
+
+    def setup_test_environment(self, **kwargs):
+        self.test_settings = override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.MD5PasswordHasher'], CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': alias}
+            for alias in settings.CACHES})
+        self.test_settings.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self.test_settings.disable()
+
+
+class FixtureTestCase(APITestCase):
+    """
+    Тесты с данными, созданными один раз в setUpTestData.
+    Откат транзакции после теста не возвращает версию контента в кэше,
+    и закэшированный предыдущим тестом ответ мог бы совпасть по ключу,
+    поэтому кэши и кэш фрагментов очищаются перед каждым тестом
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        shared_cache().clear()
+        fragments = fragment_cache()
+        if fragments is not None:
+            fragments.clear()
+        super().setUp()
+
+
+@tag('budgets')
+class BudgetTestCase(TestCase):
+    """
+    Проверка бюджетов эндпоинтов: маршрут api.urls - подтест test_budgets.
+    Проверяются только число запросов и размер ответа, время SQL зависит
+    от машины и выводится командой check_budgets
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = budgets.seed()
+
+    def test_every_route_has_budget(self):
+        """Каждый маршрут api.urls имеет бюджет и каждый бюджет - маршрут"""
+        self.assertEqual(set(budgets.routes()), set(budgets.BUDGETS))
+
+    def test_budgets(self):
+        """Число запросов и размер ответа каждого маршрута в пределах бюджета"""
+        for name in budgets.BUDGETS:
+            with self.subTest(route=name):
+                actual = budgets.measure(name, self.data)
+                problems = budgets.violations(name, actual, timing=False)
+                if problems:
+                    self.fail('{}: {}\n{}'.format(name, '; '.join(problems),
+                                                   '\n'.join(actual['sql'])))
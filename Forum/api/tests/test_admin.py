@@ -0,0 +1,57 @@
+"""
+Модуль тестирования админки
+AdminChangelistTestCase - класс с тестами страниц списков больших таблиц
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from api import models
+from api.paginator import EstimatedCountPaginator
+
+
+class AdminChangelistTestCase(TestCase):
+    """Тестирование страниц списков в админке"""
+
+    def setUp(self) -> None:
+        self.admin = User.objects.create_superuser('admin', password='admin')
+        chapter = models.Chapter.objects.create(name='chapter 1')
+        category = models.Category.objects.create(
+            chapter=chapter, name='Category 1')
+        self.client.force_login(self.admin)
+        self.category = category
+
+    def create_messages(self, count):
+        theme = models.Theme.objects.create(
+            category=self.category, name='Theme', user=self.admin)
+        messages = models.Message.objects.bulk_create([
+            models.Message(user=self.admin, theme=theme, content=f'c {i}')
+            for i in range(count)])
+        models.MessageRelation.objects.bulk_create([
+            models.MessageRelation(user=self.admin, message=message, like=True)
+            for message in messages])
+
+    def changelist_queries(self, model_name):
+        url = reverse(f'admin:api_{model_name}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов страницы списка не зависит от числа строк"""
+        for model_name in ('message', 'theme', 'messagerelation'):
+            with self.subTest(model=model_name):
+                self.create_messages(2)
+                few = self.changelist_queries(model_name)
+                self.create_messages(20)
+                self.assertEqual(few, self.changelist_queries(model_name))
+
+    def test_estimated_paginator_falls_back_to_count(self):
+        """Без оценки планировщика используется точный COUNT"""
+        self.create_messages(3)
+        paginator = EstimatedCountPaginator(
+            models.Message.objects.order_by('id'), 2)
+        self.assertEqual(3, paginator.count)
@@ -8,69 +8,83 @@ MessageApiTestCase - класс с тестами api сообщений фор
 AuthTokenTest - класс с тестами api авторизации и регистрации по токенам
 """
 from datetime import datetime
+from io import StringIO
 import json
 from rest_framework.test import APITestCase
 from django.urls import reverse
+from django.test import override_settings
 from rest_framework import status
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from api import factories
 from api import models
 from api import serializers
+from api.testing import FixtureTestCase
 
 
-class DateForTests(APITestCase):
+class DateForTests(FixtureTestCase):
     """
     Тестовые данные для тестирование api содержаться в этом классе
     Каждый класс-модуль тестирования - наследуется от этого класса
     """
 
-    def setUp(self) -> None:
-        """Запускается перед запуском кажого из тестов"""
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """
+        Запускается один раз для класса, объекты создаются пачками,
+        каждый тест получает свою копию атрибутов
+        """
         #  создаем тестовые юзеры, чтобы не аутентифицироваться
-        self.user1 = User.objects.create(username='user1')
-        self.user2 = User.objects.create(username='user2')
-        self.user_admin = User.objects.create(username='admin', is_staff=True)
+        cls.user1, cls.user2, cls.user_admin = factories.create(User, [
+            {'username': 'user1'},
+            {'username': 'user2'},
+            {'username': 'admin', 'is_staff': True},
+        ])
 
         #  создаем тестовые разделы
-        self.chapter1 = models.Chapter.objects.create(
-            name='chapter 1', description='desc 1')
-        self.chapter2 = models.Chapter.objects.create(
-            name='chapter 2', description='desc 2')
+        cls.chapter1, cls.chapter2 = factories.create(models.Chapter, [
+            {'name': 'chapter 1', 'description': 'desc 1'},
+            {'name': 'chapter 2', 'description': 'desc 2'},
+        ])
 
         #  создаем тестовые категории
-        self.category1 = models.Category.objects.create(
-            chapter=self.chapter1, name='Category 1', description='desc category 1')
-        self.category2 = models.Category.objects.create(
-            chapter=self.chapter1, name='Category 2', description='desc category 2')
-        self.category3 = models.Category.objects.create(
-            chapter=self.chapter2, name='Category 3', description='desc category 3')
+        cls.category1, cls.category2, cls.category3 = factories.create(models.Category, [
+            {'chapter': cls.chapter1, 'name': 'Category 1', 'description': 'desc category 1'},
+            {'chapter': cls.chapter1, 'name': 'Category 2', 'description': 'desc category 2'},
+            {'chapter': cls.chapter2, 'name': 'Category 3', 'description': 'desc category 3'},
+        ])
 
         #  создаем тестовые темы
-        self.theme1 = models.Theme.objects.create(
-            category=self.category1, name='Theme 1', user=self.user1)
-        self.theme2 = models.Theme.objects.create(
-            category=self.category1, name='Theme 2', status=False, user=self.user1)
-        self.theme3 = models.Theme.objects.create(
-            category=self.category2, name='Theme 3', user=self.user2)
+        cls.theme1, cls.theme2, cls.theme3 = factories.create(models.Theme, [
+            {'category': cls.category1, 'name': 'Theme 1', 'user': cls.user1},
+            {'category': cls.category1, 'name': 'Theme 2', 'status': False, 'user': cls.user1},
+            {'category': cls.category2, 'name': 'Theme 3', 'user': cls.user2},
+        ])
 
         #  создаем тестовые сообщения
-        self.message1 = models.Message.objects.create(
-            user=self.user1, theme=self.theme1, content='content 1')
-        self.message2 = models.Message.objects.create(
-            user=self.user2, theme=self.theme1, content='content 2')
-        self.message3 = models.Message.objects.create(
-            user=self.user1, theme=self.theme2, content='content 3')
+        cls.message1, cls.message2, cls.message3 = factories.create(models.Message, [
+            {'user': cls.user1, 'theme': cls.theme1, 'content': 'content 1'},
+            {'user': cls.user2, 'theme': cls.theme1, 'content': 'content 2'},
+            {'user': cls.user1, 'theme': cls.theme2, 'content': 'content 3'},
+        ])
 
         #  создаем тестовый relation
-        self.relation1 = models.MessageRelation.objects.create(
-            user=self.user1, message=self.message1)
+        cls.relation1, = factories.create(models.MessageRelation, [
+            {'user': cls.user1, 'message': cls.message1},
+        ])
+
+        #  рейтинги, счетчики и журнал изменений, которые создали бы сигналы
+        factories.finish(
+            [cls.user1, cls.user2, cls.user_admin],
+            [cls.category1, cls.category2, cls.category3],
+            [cls.theme1, cls.theme2, cls.theme3],
+            [cls.message1, cls.message2, cls.message3],
+            [cls.relation1])
 
 
 class ChapterApiTestCase(DateForTests):
     """Модуль тестирования раздела (Chapter)"""
 
-    def setUp(self) -> None:
-        return super().setUp()
-
     def test_get_chapter(self):
         """Тестирование получение 1 раздела"""
         #  создаем url по которому будем делать get запрос
@@ -130,13 +144,42 @@ class ChapterApiTestCase(DateForTests):
         self.assertEqual(2, models.Chapter.objects.all().count())
 
     def test_delete_chapter(self):
-        """Удаление раздела"""
+        """Удаление раздела (фоновой операцией)"""
         self.assertEqual(2, models.Chapter.objects.all().count())
         url = reverse('chapter-update', args=(self.chapter1.id,))
         self.client.force_login(self.user_admin)
-        response = self.client.delete(url)
-        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(url)
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        self.assertEqual(models.Job.PENDING, response.data['status'])
+        self.assertEqual(2, models.Chapter.objects.all().count())
+        with override_settings(TASKS_EAGER=True):
+            for callback in callbacks:
+                callback()
         self.assertEqual(1, models.Chapter.objects.all().count())
+        self.assertEqual(1, models.Category.objects.all().count())
+        self.assertEqual(0, models.Theme.all_objects.count())
+        self.assertEqual(0, models.Message.all_objects.count())
+        self.assertEqual(0, models.MessageRelation.objects.count())
+
+    def test_delete_chapter_job_status(self):
+        """Статус и прогресс операции удаления раздела"""
+        url = reverse('chapter-update', args=(self.chapter1.id,))
+        self.client.force_login(self.user_admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            job_id = self.client.delete(url).data['id']
+            #  повторный запрос не создает вторую операцию
+            self.assertEqual(job_id, self.client.delete(url).data['id'])
+        self.assertEqual(1, models.Task.objects.count())
+        call_command('run_tasks', processes=0, once=True, stdout=StringIO())
+        response = self.client.get(reverse('job-detail', args=(job_id,)))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(models.Job.DONE, response.data['status'])
+        progress = response.data['progress']
+        self.assertEqual(sum(progress.values()), response.data['processed'])
+        self.assertGreaterEqual(response.data['total'], response.data['processed'])
+        self.assertEqual(3, progress['message'])
+        self.assertEqual(3, progress['theme'])
 
     def test_delete_chapter_not_admin(self):
         """Тестирование удаления раздела не администратором"""
@@ -179,9 +222,6 @@ class ChapterApiTestCase(DateForTests):
 class CategoryApiTestCase(DateForTests):
     """Модуль тестирования категории (Category)"""
 
-    def setUp(self) -> None:
-        return super().setUp()
-
     def test_get_category(self):
         """Тестирование получение 1 категории"""
         url = reverse('category-detail', args=(self.category1.id,))
@@ -236,13 +276,16 @@ class CategoryApiTestCase(DateForTests):
         self.assertEqual(3, models.Category.objects.all().count())
 
     def test_delete_category(self):
-        """Удаление категории"""
+        """Удаление категории (фоновой операцией)"""
         self.assertEqual(3, models.Category.objects.all().count())
         url = reverse('category-update', args=(self.category1.id,))
         self.client.force_login(self.user_admin)
-        response = self.client.delete(url)
-        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        with override_settings(TASKS_EAGER=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(url)
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
         self.assertEqual(2, models.Category.objects.all().count())
+        self.assertEqual(1, models.Theme.objects.all().count())
 
     def test_delete_category_not_admin(self):
         """Тестирование удаления категории не администратором"""
@@ -294,9 +337,6 @@ class CategoryApiTestCase(DateForTests):
 class ThemeApiTestCase(DateForTests):
     """Модуль тестирования темы (Theme)"""
 
-    def setUp(self) -> None:
-        return super().setUp()
-
     def test_get_theme(self):
         """Тестирование получение 1 темы"""
         url = reverse('theme-detail', args=(self.theme1.id,))
@@ -456,13 +496,22 @@ class ThemeApiTestCase(DateForTests):
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         self.assertEqual(serializer_data, response.data["results"])
 
+    def test_batch_themes(self):
+        """Пакетное получение тем по списку id"""
+        url = reverse('theme-list')
+        ids = f'{self.theme3.id},{self.theme1.id},999'
+        with self.assertNumQueries(4):
+            response = self.client.get(url, data={'ids': ids})
+        serializer_data = serializers.ThemeSerializer(
+            [self.theme3, self.theme1], many=True).data
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertEqual([999], response.data['missing'])
+
 
 class MessageApiTestCase(DateForTests):
     """Модуль тестирования сообщении (Message)"""
 
-    def setUp(self) -> None:
-        return super().setUp()
-
     def test_get_mesage(self):
         """Тестирование получение 1 сообщения"""
         url = reverse('message-detail', args=(self.message1.id,))
@@ -617,6 +666,54 @@ class MessageApiTestCase(DateForTests):
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         self.assertEqual(serializer_data, response.data["results"])
 
+    def test_batch_messages(self):
+        """Пакетное получение сообщений по списку id в заданном порядке"""
+        url = reverse('message-list')
+        ids = f'{self.message3.id},{self.message1.id},{self.message3.id},0'
+        with self.assertNumQueries(1):
+            response = self.client.get(url, data={'ids': ids})
+        serializer_data = serializers.MessageSerializer(
+            [self.message3, self.message1], many=True).data
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertEqual([0], response.data['missing'])
+
+    def test_liked_by_me(self):
+        """Отметка лайка текущего пользователя в списке сообщений"""
+        models.MessageRelation.objects.filter(pk=self.relation1.pk).update(like=True)
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse('message-list'))
+        liked = {message['id']: message['liked_by_me']
+                 for message in response.data['results']}
+        self.assertEqual({self.message1.id: True, self.message2.id: False,
+                          self.message3.id: False}, liked)
+        self.client.force_login(self.user2)
+        response = self.client.get(reverse('message-list'))
+        self.assertFalse(any(message['liked_by_me']
+                             for message in response.data['results']))
+
+    def test_liked_by_me_constant_queries(self):
+        """Число запросов страницы не зависит от числа сообщений на ней"""
+        self.client.force_login(self.user1)
+        url = reverse('message-list')
+        with self.assertNumQueries(5):
+            self.client.get(url, data={'page': 1, 'x': 1})
+        models.Message.objects.bulk_create([
+            models.Message(user=self.user2, theme=self.theme1, content='more')
+            for _ in range(10)])
+        with self.assertNumQueries(5):
+            self.client.get(url, data={'page': 1, 'x': 2})
+
+    def test_batch_messages_bounds(self):
+        """Слишком большой или некорректный пакет отклоняется"""
+        url = reverse('message-list')
+        ids = ','.join(str(i) for i in range(1, 202))
+        response = self.client.get(url, data={'ids': ids})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        for raw in ('1,abc', '1,²', '1,٣'):
+            response = self.client.get(url, data={'ids': raw})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
 
 class AuthTokenTest(APITestCase):
     """Тестирование аутентификации, регистрации, логаута по токену"""
@@ -654,9 +751,6 @@ class AuthTokenTest(APITestCase):
 class MessageRelationApiTestCase(DateForTests):
     """Тестирование оценок (MessageRelation)"""
 
-    def setUp(self) -> None:
-        return super().setUp()
-
     def test_like(self):
         """Тестирование лайка"""
         url = reverse('message-like', args=(self.message1.id,))
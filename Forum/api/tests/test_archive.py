@@ -0,0 +1,152 @@
+"""
+Модуль тестирования мягкого удаления и архивации тем
+SoftDeleteTestCase - класс с тестами мягкого удаления и очистки
+ArchiveTestCase - класс с тестами архивации тем
+"""
+from datetime import timedelta
+from io import StringIO
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import ProtectedError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from api import models
+from api.archive import archive_theme, inactive_themes
+from api.deletion import purge_queryset
+from api.testing import FixtureTestCase
+
+
+class ArchiveDataMixin:
+    """Тестовые данные: открытая и закрытая тема с сообщениями и оценкой"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user1 = User.objects.create(username='user1')
+        cls.user_admin = User.objects.create(username='admin', is_staff=True)
+        cls.chapter = models.Chapter.objects.create(name='chapter 1')
+        cls.category = models.Category.objects.create(
+            chapter=cls.chapter, name='Category 1')
+        cls.theme_open = models.Theme.objects.create(
+            category=cls.category, name='Theme 1', user=cls.user1)
+        cls.theme_closed = models.Theme.objects.create(
+            category=cls.category, name='Theme 2', status=False, user=cls.user1)
+        cls.message1 = models.Message.objects.create(
+            user=cls.user1, theme=cls.theme_closed, content='content 1')
+        cls.message2 = models.Message.objects.create(
+            user=cls.user_admin, theme=cls.theme_closed, content='content 2')
+        cls.message3 = models.Message.objects.create(
+            user=cls.user1, theme=cls.theme_open, content='content 3')
+        models.MessageRelation.objects.create(
+            user=cls.user1, message=cls.message1, like=True)
+
+
+class SoftDeleteTestCase(ArchiveDataMixin, FixtureTestCase):
+    """Тестирование мягкого удаления и очистки"""
+
+    def test_delete_theme_is_soft(self):
+        """Удаленная тема и ее сообщения остаются в таблице с пометкой"""
+        self.client.force_login(self.user_admin)
+        url = reverse('theme-delete', args=(self.theme_closed.id,))
+        response = self.client.delete(url)
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertFalse(models.Theme.objects.filter(
+            pk=self.theme_closed.id).exists())
+        self.assertTrue(models.Theme.all_objects.get(
+            pk=self.theme_closed.id).is_deleted)
+        self.assertEqual(1, models.Message.objects.count())
+        self.assertEqual(3, models.Message.all_objects.count())
+        self.assertEqual(1, models.MessageRelation.objects.count())
+
+    def test_deleted_messages_hidden_from_list(self):
+        """Удаленные сообщения не попадают в список"""
+        self.message3.soft_delete()
+        response = self.client.get(reverse('message-list'))
+        ids = [message['id'] for message in response.data['results']]
+        self.assertEqual([self.message1.id, self.message2.id], ids)
+
+    def test_purge_deleted(self):
+        """Очистка физически удаляет помеченные записи вместе с оценками"""
+        self.theme_closed.soft_delete()
+        call_command('purge_deleted', grace_hours=0, batch_size=1, stdout=StringIO())
+        self.assertEqual(1, models.Theme.all_objects.count())
+        self.assertEqual(1, models.Message.all_objects.count())
+        self.assertEqual(0, models.MessageRelation.objects.count())
+
+    def test_purge_respects_grace_period(self):
+        """Недавно удаленные записи не очищаются до истечения срока"""
+        self.message3.soft_delete()
+        call_command('purge_deleted', stdout=StringIO())
+        self.assertEqual(3, models.Message.all_objects.count())
+        self.assertEqual(1, models.MessageRelation.objects.count())
+
+
+class ArchiveTestCase(ArchiveDataMixin, FixtureTestCase):
+    """Тестирование архивации тем"""
+
+    def make_inactive(self, days=100):
+        """Сдвигает даты закрытой темы и ее сообщений в прошлое"""
+        past = timezone.now() - timedelta(days=days)
+        models.Theme.objects.filter(
+            pk=self.theme_closed.pk).update(created_at=past)
+        models.Message.objects.filter(theme=self.theme_closed).update(
+            created_at=past, updated_at=past)
+
+    def test_inactive_themes(self):
+        """В архив попадают только закрытые темы без активности"""
+        self.assertEqual([], list(inactive_themes(90)))
+        self.make_inactive()
+        self.assertEqual([self.theme_closed], list(inactive_themes(90)))
+
+    def test_archive_theme(self):
+        """Тема переносится в архив и удаляется из горячих таблиц"""
+        self.make_inactive()
+        call_command('archive_themes', inactive_days=90, stdout=StringIO())
+        self.assertFalse(models.Theme.all_objects.filter(
+            pk=self.theme_closed.pk).exists())
+        self.assertEqual(1, models.Message.all_objects.count())
+        archived = models.ArchivedTheme.objects.get(pk=self.theme_closed.pk)
+        self.assertEqual(2, archived.messages_count)
+
+    def test_get_archived_theme(self):
+        """Архивная тема отдается вместе с распакованными сообщениями"""
+        archive_theme(self.theme_closed)
+        url = reverse('archived-theme-detail', args=(self.theme_closed.id,))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        messages = response.data['messages']
+        self.assertEqual(['content 1', 'content 2'],
+                         [message['content'] for message in messages])
+        self.assertEqual(1, messages[0]['likes_count'])
+        self.assertEqual(self.user_admin.id, messages[1]['user'])
+
+    def test_archive_rolled_back_on_error(self):
+        """Ошибка удаления тем отменяет и архивную запись"""
+        with mock.patch('api.archive.purge_queryset', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                archive_theme(self.theme_closed)
+        self.assertFalse(models.ArchivedTheme.objects.exists())
+        self.assertTrue(models.Theme.objects.filter(
+            pk=self.theme_closed.pk).exists())
+
+    def test_purge_protected(self):
+        """Записи со ссылками по PROTECT не удаляются, даже частично"""
+        users = User.objects.filter(pk__in=[self.user1.pk, self.user_admin.pk])
+        with self.assertRaises(ProtectedError):
+            purge_queryset(users, batch_size=1)
+        self.assertEqual(2, users.count())
+        self.assertEqual(3, models.Message.all_objects.count())
+        self.assertEqual(1, models.MessageRelation.objects.count())
+
+    def test_archive_is_read_only(self):
+        """Архивные темы доступны только на чтение"""
+        archive_theme(self.theme_closed)
+        url = reverse('archived-theme-detail', args=(self.theme_closed.id,))
+        self.client.force_login(self.user_admin)
+        response = self.client.delete(url)
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED,
+                         response.status_code)
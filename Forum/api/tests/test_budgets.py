@@ -0,0 +1,66 @@
+"""
+Модуль тестирования бюджетов эндпоинтов
+BudgetGuardTestCase - класс с тестами обнаружения превышений и отчета check_budgets
+"""
+import time
+from unittest import mock
+
+from django.db.backends.utils import CursorWrapper
+from django.test import TestCase
+
+from api import budgets, models, views
+
+
+class BudgetGuardTestCase(TestCase):
+    """Тестирование api.budgets и команды check_budgets"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = budgets.seed()
+
+    def test_n_plus_one_detected(self):
+        """Запрос на каждый объект списка превышает бюджет"""
+        name = 'chapter-list'
+        self.assertEqual([], budgets.violations(
+            name, budgets.measure(name, self.data)))
+        with mock.patch.object(views.ChapterAPIList, 'queryset',
+                               models.Chapter.objects.all()):
+            actual = budgets.measure(name, self.data)
+        self.assertEqual(1 + len(self.data.chapters), actual['queries'])
+        self.assertEqual(['запросов 3 > 2'], budgets.violations(name, actual))
+
+    def test_timing_reported_only(self):
+        """Время SQL - нарушение в отчете, но не для тестов"""
+        name = 'chapter-list'
+        actual = dict(budgets.measure(name, self.data), sql_ms=10 ** 6)
+        self.assertEqual([], budgets.violations(name, actual, timing=False))
+        self.assertEqual(1, len(budgets.violations(name, actual)))
+
+    def test_slow_query_detected(self):
+        """Медленный запрос превышает бюджет времени SQL"""
+        name = 'chapter-list'
+        self.assertGreater(budgets.measure(name, self.data)['sql_ms'], 0)
+        execute = CursorWrapper._execute
+
+        def slow(cursor, *args):
+            time.sleep(budgets.BUDGETS[name].sql_ms / 1000)
+            return execute(cursor, *args)
+
+        with mock.patch.object(CursorWrapper, '_execute', slow):
+            actual = budgets.measure(name, self.data)
+        self.assertGreater(actual['sql_ms'], budgets.BUDGETS[name].sql_ms)
+        self.assertEqual([], budgets.violations(name, actual, timing=False))
+        self.assertTrue(budgets.violations(name, actual)[0].startswith('время SQL'))
+
+    def test_writes_rolled_back(self):
+        """Изменяющий запрос не оставляет следов в данных"""
+        budgets.measure('theme-delete', self.data)
+        self.assertTrue(models.Theme.objects.filter(
+            pk=self.data.themes[0].pk).exists())
+
+    def test_report(self):
+        """Таблица команды check_budgets содержит строку для каждого маршрута"""
+        rows, failed = budgets.report(self.data)
+        self.assertEqual(budgets.routes(), [row['route'] for row in rows])
+        self.assertEqual({}, failed)
+        self.assertEqual({'ok'}, {row['result'] for row in rows})
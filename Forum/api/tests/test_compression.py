@@ -0,0 +1,169 @@
+"""
+Модуль тестирования сжатого хранения текста сообщений
+CompressTextTestCase - класс с тестами кодирования значений
+CompressedFieldTestCase - класс с тестами поля и команды сжатия
+ResponseCompressionTestCase - класс с тестами сжатия и кэша ответов
+"""
+import gzip
+import json
+import warnings
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.compression import negotiate
+from api.fields import (COMPRESSED_PREFIX, ESCAPED_PREFIX, compress_text,
+                        decompress_text)
+from api.models import Category, Chapter, Message, Theme
+
+LONG_TEXT = '> цитата предыдущего сообщения\n' * 100 + 'ответ'
+
+
+class CompressTextTestCase(SimpleTestCase):
+    """Тестирование кодирования значений"""
+
+    def test_short_text_is_stored_as_is(self):
+        """Короткий текст хранится без изменений"""
+        self.assertEqual('короткий текст', compress_text('короткий текст'))
+
+    def test_long_text_is_compressed(self):
+        """Длинный текст сжимается и восстанавливается"""
+        stored = compress_text(LONG_TEXT)
+        self.assertTrue(stored.startswith(COMPRESSED_PREFIX))
+        self.assertLess(len(stored), len(LONG_TEXT))
+        self.assertEqual(LONG_TEXT, decompress_text(stored))
+
+    def test_marker_in_text_is_escaped(self):
+        """Текст, начинающийся с маркера, экранируется"""
+        for value in (COMPRESSED_PREFIX + 'x', ESCAPED_PREFIX + 'y'):
+            stored = compress_text(value)
+            self.assertTrue(stored.startswith(ESCAPED_PREFIX))
+            self.assertEqual(value, decompress_text(stored))
+
+
+class CompressedFieldTestCase(TestCase):
+    """Тестирование поля Message.content и команды compress_messages"""
+
+    def setUp(self) -> None:
+        user = User.objects.create(username='user1')
+        chapter = Chapter.objects.create(name='chapter 1')
+        category = Category.objects.create(chapter=chapter, name='Category 1')
+        self.theme = Theme.objects.create(
+            category=category, name='Theme 1', user=user)
+        self.user = user
+
+    def stored_content(self, message):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM api_message WHERE id = %s',
+                           [message.id])
+            return cursor.fetchone()[0]
+
+    def test_transparent_roundtrip(self):
+        """Сжатие прозрачно для кода, работающего с моделью"""
+        message = Message.objects.create(
+            user=self.user, theme=self.theme, content=LONG_TEXT)
+        self.assertTrue(self.stored_content(message).startswith(
+            COMPRESSED_PREFIX))
+        self.assertEqual(LONG_TEXT, Message.objects.get(pk=message.pk).content)
+        self.assertEqual(
+            [LONG_TEXT], list(Message.objects.values_list('content', flat=True)))
+
+    def test_compress_existing_rows(self):
+        """Команда сжимает старые несжатые строки, не трогая короткие"""
+        long_message = Message.objects.create(
+            user=self.user, theme=self.theme, content='x')
+        short_message = Message.objects.create(
+            user=self.user, theme=self.theme, content='короткий')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE api_message SET content = %s WHERE id = %s',
+                           [LONG_TEXT, long_message.id])
+        updated_at = Message.objects.get(pk=long_message.pk).updated_at
+        call_command('compress_messages', batch_size=1, stdout=StringIO())
+        self.assertTrue(self.stored_content(long_message).startswith(
+            COMPRESSED_PREFIX))
+        self.assertEqual('короткий', self.stored_content(short_message))
+        long_message.refresh_from_db()
+        self.assertEqual(LONG_TEXT, long_message.content)
+        self.assertEqual(updated_at, long_message.updated_at)
+
+
+class ResponseCompressionTestCase(APITestCase):
+    """Тестирование сжатия и кэша ответов"""
+
+    def setUp(self) -> None:
+        user = User.objects.create(username='user1')
+        chapter = Chapter.objects.create(name='chapter 1')
+        category = Category.objects.create(chapter=chapter, name='Category 1')
+        self.theme = Theme.objects.create(
+            category=category, name='Theme 1', user=user)
+        Message.objects.bulk_create([
+            Message(user=user, theme=self.theme, content=f'content {i}')
+            for i in range(15)])
+
+    def test_negotiate(self):
+        """Выбор кодировки по Accept-Encoding с учетом q"""
+        self.assertEqual('gzip', negotiate('gzip, deflate'))
+        self.assertEqual('gzip', negotiate('*'))
+        self.assertIsNone(negotiate('gzip;q=0, identity'))
+        self.assertIsNone(negotiate(''))
+
+    def test_gzip_list(self):
+        """Большой список сообщений отдается сжатым"""
+        response = self.client.get(reverse('message-list'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(15, len(data['results']))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_not_compressed(self):
+        """Ответ меньше порога не сжимается"""
+        response = self.client.get(reverse('message-list'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cache_hit_skips_serialization(self):
+        """Повторный запрос отдается из кэша без обращений к базе"""
+        url = reverse('theme-detail', args=(self.theme.id,))
+        first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual('gzip', second['Content-Encoding'])
+        self.assertEqual(first.content, second.content)
+        for header in ('Content-Type', 'Vary', 'Allow'):
+            self.assertEqual(first[header], second[header])
+
+    def test_cache_key_bounded(self):
+        """Длинная строка запроса не попадает в ключ кэша"""
+        url = reverse('message-list')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = self.client.get(url, {'ordering': 'id', 'x': 'y' * 500})
+        self.assertEqual(200, response.status_code)
+
+    def test_cache_scoped_by_theme(self):
+        """Сообщение в одной теме не инвалидирует список сообщений другой"""
+        other = Theme.objects.create(category=self.theme.category,
+                                     name='Theme 2', user=self.theme.user)
+        url = reverse('message-list')
+        self.client.get(url, {'theme': self.theme.id})
+        self.client.get(url, {'theme': other.id})
+        Message.objects.create(user=other.user, theme=other, content='new')
+        with self.assertNumQueries(0):
+            self.client.get(url, {'theme': self.theme.id})
+        self.assertEqual(1, self.client.get(
+            url, {'theme': other.id}).data['count'])
+
+    def test_cache_invalidated_on_change(self):
+        """Изменение контента инвалидирует закэшированный ответ"""
+        url = reverse('message-list')
+        self.client.get(url)
+        Message.objects.filter(theme=self.theme).first().soft_delete()
+        response = self.client.get(url)
+        self.assertEqual(14, response.data['count'])
@@ -0,0 +1,33 @@
+"""
+Модуль тестирования фабрик данных
+FactoriesTestCase - класс с тестами пакетного создания и производных данных
+"""
+from django.test import TestCase
+
+from api import factories, models
+
+
+class FactoriesTestCase(TestCase):
+    """Тестирование api.factories"""
+
+    def test_forum_derived_data(self):
+        """Производные данные совпадают с созданными обработчиками сигналов"""
+        data = factories.forum(users=3, chapters=1, categories=2, themes=2,
+                               messages=3, likes=2)
+        self.assertEqual(4, len(data.themes))
+        self.assertEqual(12, len(data.messages))
+        self.assertEqual(24, len(data.relations))
+        self.assertEqual(4, models.ThemeScore.objects.count())
+        self.assertEqual(12, models.MessageScore.objects.count())
+        self.assertEqual(2 + 4 + 12, models.ChangeLog.objects.count())
+        stats = models.UserStats.objects.get(user=data.users[0])
+        self.assertEqual((4, 2, 8), (stats.messages_count, stats.themes_count,
+                                     stats.likes_received))
+        #  инкрементальное создание через сигналы дает тот же результат
+        theme = models.Theme.objects.create(
+            category=data.categories[0], name='theme', user=data.users[0])
+        models.Message.objects.create(
+            user=data.users[0], theme=theme, content='content')
+        stats.refresh_from_db()
+        self.assertEqual((5, 3, 8), (stats.messages_count, stats.themes_count,
+                                     stats.likes_received))
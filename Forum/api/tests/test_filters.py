@@ -0,0 +1,108 @@
+"""
+Модуль тестирования фильтров списков
+IndexedFilterTestCase - класс с тестами диапазонных фильтров и проверки сочетаний по индексам
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from api import models
+from api.filters import MessageFilter, ThemeFilter
+from api.testing import FixtureTestCase
+
+
+class IndexedFilterTestCase(FixtureTestCase):
+    """Тестирование фильтров тем и сообщений"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user1 = User.objects.create(username='user1')
+        cls.user2 = User.objects.create(username='user2')
+        chapter = models.Chapter.objects.create(name='chapter 1')
+        cls.category = models.Category.objects.create(
+            chapter=chapter, name='Category 1')
+        cls.theme1 = models.Theme.objects.create(
+            category=cls.category, name='Theme 1', user=cls.user1)
+        cls.theme2 = models.Theme.objects.create(
+            category=cls.category, name='Theme 2', user=cls.user2, status=False)
+        cls.messages = [models.Message.objects.create(
+            user=cls.user1, theme=cls.theme1, content=f'content {i}')
+            for i in range(5)]
+
+    def ids(self, response):
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [item['id'] for item in response.data['results']]
+
+    def test_messages_since_id(self):
+        """Новые сообщения темы после id в порядке id"""
+        response = self.client.get(reverse('message-list'), {
+            'theme': self.theme1.id, 'id_gt': self.messages[2].id})
+        self.assertEqual([message.id for message in self.messages[3:]],
+                         self.ids(response))
+
+    def test_messages_updated_since(self):
+        """Измененные с момента сообщения"""
+        moment = self.messages[0].updated_at + timedelta(days=1)
+        models.Message.objects.filter(pk=self.messages[1].pk).update(
+            updated_at=moment)
+        response = self.client.get(reverse('message-list'), {
+            'theme': self.theme1.id, 'updated_since': moment.isoformat()})
+        self.assertEqual([self.messages[1].id], self.ids(response))
+
+    def test_themes_created_after(self):
+        """Темы категории, созданные позже момента"""
+        response = self.client.get(reverse('theme-list'), {
+            'category': self.category.id,
+            'created_after': self.theme1.created_at.isoformat()})
+        self.assertEqual([self.theme2.id], self.ids(response))
+
+    def test_indexed_combinations(self):
+        """Сочетания, обслуживаемые индексом, принимаются"""
+        cases = [
+            ('theme-list', {'category': self.category.id, 'status': False}),
+            ('theme-list', {'status': True, 'ordering': '-created_at'}),
+            ('theme-list', {'id_gt': 0, 'ordering': '-id'}),
+            ('message-list', {'theme': self.theme1.id, 'ordering': 'updated_at'}),
+            ('message-list', {'created_after': self.theme1.created_at.isoformat()}),
+        ]
+        for name, params in cases:
+            with self.subTest(params=params):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_unindexed_combinations_rejected(self):
+        """Сочетания без подходящего индекса отклоняются"""
+        cases = [
+            ('theme-list', {'category': self.category.id, 'user': self.user1.id}),
+            ('theme-list', {'user': self.user1.id, 'id_gt': 0}),
+            ('message-list', {'theme': self.theme1.id, 'id_gt': 0,
+                              'ordering': 'created_at'}),
+            ('message-list', {'id_gt': 0, 'updated_since': '2022-01-01T00:00:00Z'}),
+            ('message-list', {'ordering': 'created_at,id'}),
+        ]
+        for name, params in cases:
+            with self.subTest(params=params):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+                self.assertIn('__all__', response.data)
+
+
+class FilterIndexesTestCase(TestCase):
+    """Индексы, объявленные в фильтрах, существуют в базе"""
+
+    def test_declared_indexes_exist(self):
+        for filterset in (ThemeFilter, MessageFilter):
+            model = filterset._meta.model
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(
+                    cursor, model._meta.db_table)
+            existing = {tuple(info['columns']) for info in constraints.values()
+                        if info['index'] or info['primary_key']}
+            for columns in filterset.index_columns:
+                with self.subTest(model=model.__name__, columns=columns):
+                    self.assertIn(tuple(model._meta.get_field(name).column
+                                        for name in columns), existing)
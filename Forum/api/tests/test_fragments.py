@@ -0,0 +1,91 @@
+"""
+Модуль тестирования кэша сериализованных фрагментов
+FragmentCacheTestCase - класс с тестами LRU кэша с учетом размера
+FragmentSerializerTestCase - класс с тестами сериализаторов с кэшем фрагментов
+"""
+import json
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from api import factories, models, serializers
+from api.fragments import FragmentCache, fragment_cache, fragment_size
+from api.testing import FixtureTestCase
+from api.views import ThemeAPIList
+
+
+class FragmentCacheTestCase(SimpleTestCase):
+    """Тестирование FragmentCache"""
+
+    def test_lru_eviction_by_size(self):
+        """При превышении объема вытесняются давно не использованные фрагменты"""
+        fragment = {'content': 'x' * 100}
+        size = fragment_size(fragment)
+        cache = FragmentCache(max_bytes=size * 2)
+        cache.set_many({'a': fragment, 'b': fragment})
+        self.assertEqual({'a': fragment}, cache.get_many(['a']))
+        cache.set('c', fragment)
+        self.assertEqual({'a', 'c'}, set(cache.get_many(['a', 'b', 'c'])))
+        stats = cache.stats()
+        self.assertEqual(2, stats['entries'])
+        self.assertEqual(size * 2, stats['bytes'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_oversized_fragment_skipped(self):
+        """Фрагмент больше всего кэша не сохраняется"""
+        cache = FragmentCache(max_bytes=10)
+        cache.set('a', {'content': 'x' * 100})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, cache.stats()['bytes'])
+
+
+class FragmentSerializerTestCase(FixtureTestCase):
+    """Тестирование сериализаторов с кэшем фрагментов"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=3, chapters=1, categories=2, themes=3,
+                                   messages=4, likes=2)
+
+    def render(self, serializer_class, objects):
+        return JSONRenderer().render(serializer_class(objects, many=True).data)
+
+    def test_output_identical(self):
+        """Вывод совпадает побайтно с обычной сериализацией, холодный и теплый"""
+        lists = [
+            (serializers.MessageSerializer,
+             lambda: list(models.Message.objects.with_likes_count())),
+            (serializers.ThemeSerializer, lambda: list(ThemeAPIList.queryset.all())),
+        ]
+        for serializer_class, load in lists:
+            with self.settings(FRAGMENT_CACHE_MAX_BYTES=0):
+                expected = self.render(serializer_class, load())
+            fragment_cache().clear()
+            self.assertEqual(expected, self.render(serializer_class, load()))
+            self.assertEqual(expected, self.render(serializer_class, load()))
+        self.assertGreater(fragment_cache().stats()['hits'], 0)
+
+    def test_changed_object_rerendered(self):
+        """Изменение объекта меняет ключ, остальные берутся из кэша"""
+        message = models.Message.objects.get(pk=self.data.messages[0].pk)
+        url = reverse('theme-detail', args=(message.theme_id,))
+        self.client.get(url)
+        message.content = 'changed'
+        message.save()
+        stats = fragment_cache().stats()
+        response = self.client.get(url)
+        contents = {item['id']: item['content'] for item in response.data['messages']}
+        self.assertEqual('changed', contents[message.pk])
+        after = fragment_cache().stats()
+        self.assertEqual(1, after['misses'] - stats['misses'])
+
+    def test_user_fields_not_cached(self):
+        """Поля, зависящие от пользователя, вычисляются для каждого запроса"""
+        url = reverse('message-detail', args=(self.data.messages[0].pk,))
+        self.client.force_authenticate(self.data.users[0])
+        self.assertTrue(self.client.get(url).data['liked_by_me'])
+        self.client.force_authenticate(self.data.users[2])
+        response = self.client.get(url)
+        self.assertFalse(response.data['liked_by_me'])
+        self.assertEqual(2, json.loads(response.content)['likes_count'])
@@ -0,0 +1,88 @@
+"""
+Модуль тестирования истории изменений сообщений
+PatchTestCase - класс с тестами построения и применения дельт
+MessageHistoryApiTestCase - класс с тестами api истории сообщений
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import models
+from api.history import apply_patch, make_patch
+
+
+class PatchTestCase(SimpleTestCase):
+    """Тестирование дельт"""
+
+    def test_roundtrip(self):
+        """Патч восстанавливает предыдущую версию из новой"""
+        cases = [
+            ('', 'новый текст'),
+            ('старый текст', ''),
+            ('один два три', 'один 2 три четыре'),
+            ('> цитата\n\nответ', 'ответ\n\n> цитата  с пробелами'),
+            ('same', 'same'),
+        ]
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertEqual(old, apply_patch(new, make_patch(new, old)))
+
+    def test_patch_is_smaller_than_copy(self):
+        """Дельта небольшой правки много меньше полной копии"""
+        old = ' '.join(f'слово{i}' for i in range(2000))
+        new = old.replace('слово1000 ', 'исправлено ')
+        self.assertLess(len(make_patch(new, old)) * 20,
+                        len(old.encode('utf-8')))
+
+
+class MessageHistoryApiTestCase(APITestCase):
+    """Тестирование api истории сообщений"""
+
+    def setUp(self) -> None:
+        self.user1 = User.objects.create(username='user1')
+        self.user_admin = User.objects.create(username='admin', is_staff=True)
+        chapter = models.Chapter.objects.create(name='chapter 1')
+        category = models.Category.objects.create(
+            chapter=chapter, name='Category 1')
+        theme = models.Theme.objects.create(
+            category=category, name='Theme 1', user=self.user1)
+        self.message = models.Message.objects.create(
+            user=self.user1, theme=theme, content='content 1')
+
+    def edit(self, user, content):
+        self.client.force_login(user)
+        url = reverse('message-update', args=(self.message.id,))
+        response = self.client.patch(url, data=json.dumps(
+            {'content': content}), content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_history(self):
+        """История содержит все версии от новой к старой"""
+        self.edit(self.user1, 'content 2')
+        self.edit(self.user_admin, 'content 3 (исправлено модератором)')
+        self.assertEqual(2, self.message.revisions.count())
+        url = reverse('message-history', args=(self.message.id,))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            ['content 3 (исправлено модератором)', 'content 2', 'content 1'],
+            [version['content'] for version in response.data])
+        self.assertEqual(
+            [self.user_admin.id, self.user1.id, None],
+            [version['editor'] for version in response.data])
+
+    def test_unchanged_content_has_no_revision(self):
+        """Правка без изменения текста не создает версию"""
+        self.edit(self.user1, 'content 1')
+        self.assertEqual(0, self.message.revisions.count())
+
+    def test_history_not_admin(self):
+        """История доступна только модераторам"""
+        self.client.force_login(self.user1)
+        url = reverse('message-history', args=(self.message.id,))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
@@ -0,0 +1,144 @@
+"""
+Модуль тестирования массовой модерации
+ModerationTestCase - класс с тестами массовых операций и их api
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api import factories, models, tree
+from api.jobs import run_job
+from api.testing import FixtureTestCase
+
+
+class ModerationTestCase(FixtureTestCase):
+    """Тестирование массовых операций модерации"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=3, chapters=1, categories=2, themes=3,
+                                   messages=3, likes=2)
+        cls.admin = models.User.objects.create(username='admin', is_staff=True)
+        cls.spammer = cls.data.users[2]
+
+    def run_bulk(self, name, body):
+        """Запрос массовой операции и ее выполнение после фиксации"""
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse(name), body, format='json')
+        self.assertEqual(202, response.status_code)
+        self.assertEqual(models.Job.PENDING, response.data['status'])
+        with override_settings(TASKS_EAGER=True):
+            for callback in callbacks:
+                callback()
+        return models.Job.objects.get(pk=response.data['id'])
+
+    def run_handler(self, kind, target_id=None, **params):
+        job = models.Job.objects.create(kind=kind, target_id=target_id,
+                                        params=params, status=models.Job.RUNNING)
+        return run_job(job)
+
+    def assertCountersExact(self):
+        """Поддерживаемые счетчики совпадают с полным пересчетом"""
+        counters = [
+            (models.UserStats, ('user_id', 'messages_count', 'themes_count',
+                                'likes_received')),
+            (models.ThemeCounter, ('theme_id', 'count')),
+            (models.CategoryCounter, ('category_id', 'count')),
+        ]
+        maintained = {model: sorted(model.objects.values_list(*fields))
+                      for model, fields in counters}
+        for model, fields in counters:
+            model.objects.reconcile([row[0] for row in maintained[model]])
+            self.assertEqual(sorted(model.objects.values_list(*fields)),
+                             maintained[model], model.__name__)
+
+    def test_close_themes(self):
+        """Темы закрываются, версия темы для кэша фрагментов меняется"""
+        themes = self.data.themes[:4]
+        job = self.run_bulk('moderation-close-themes',
+                            {'themes': [theme.pk for theme in themes] * 2})
+        self.assertEqual(models.Job.DONE, job.status)
+        self.assertEqual((4, 4), (job.total, job.processed))
+        for theme in themes:
+            old = theme.updated_at
+            theme.refresh_from_db()
+            self.assertFalse(theme.status)
+            self.assertGreater(theme.updated_at, old)
+        self.assertTrue(models.Theme.objects.filter(status=True).exists())
+        self.assertEqual(4, models.ChangeLog.objects.filter(
+            kind='theme', action=models.ChangeLog.UPDATED).count())
+
+    def test_move_themes(self):
+        """Перенос пачками поддерживает счетчики категорий и версию дерева"""
+        source, target = self.data.categories[:2]
+        ids = list(source.themes.values_list('pk', flat=True))
+        version = tree.tree_version()
+        job = self.run_handler(models.Job.MOVE_THEMES, target.pk,
+                               themes=ids, batch_size=2)
+        self.assertEqual(models.Job.DONE, job.status)
+        self.assertEqual({'theme': 3}, job.progress)
+        self.assertFalse(source.themes.exists())
+        self.assertEqual(6, models.CategoryCounter.objects.count_for(target.pk))
+        self.assertNotEqual(version, tree.tree_version())
+        self.assertCountersExact()
+
+    def test_delete_user_messages(self):
+        """Удаление сообщений пользователя за промежуток с поддержкой счетчиков"""
+        root = self.data.messages[0]
+        reply = models.Message.objects.create(
+            theme=root.theme, user=self.spammer, reply_to=root, content='spam')
+        old = models.Message.objects.filter(user=self.spammer).first()
+        models.Message.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=10))
+        spam = models.Message.objects.filter(
+            user=self.spammer, created_at__gte=timezone.now() - timedelta(days=1))
+        expected = spam.count()
+        job = self.run_handler(
+            models.Job.DELETE_USER_MESSAGES, self.spammer.pk, batch_size=2,
+            since=(timezone.now() - timedelta(days=1)).isoformat())
+        self.assertEqual(models.Job.DONE, job.status)
+        self.assertEqual((expected, expected), (job.total, job.processed))
+        self.assertFalse(spam.exists())
+        self.assertTrue(models.Message.objects.filter(pk=old.pk).exists())
+        self.assertFalse(models.MessageScore.objects.filter(message=reply).exists())
+        root.refresh_from_db()
+        self.assertEqual(0, root.replies_count)
+        self.assertCountersExact()
+
+    def test_request_is_constant(self):
+        """Запрос только ставит операцию: число запросов не зависит от числа тем"""
+        self.client.force_authenticate(self.admin)
+        for count in (1, len(self.data.themes)):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(reverse('moderation-close-themes'), {
+                    'themes': [theme.pk for theme in self.data.themes[:count]]},
+                    format='json')
+            self.assertEqual(202, response.status_code)
+            self.assertEqual(1, len(context))
+        #  операции с разными параметрами не схлопываются в одну
+        self.assertEqual(2, models.Job.objects.count())
+
+    def test_validation_and_permissions(self):
+        """Некорректные параметры отклоняются, не модераторам доступ запрещен"""
+        self.client.force_authenticate(self.admin)
+        cases = [
+            ('moderation-close-themes', {'themes': []}),
+            ('moderation-move-themes', {'themes': [1], 'category': 0}),
+            ('moderation-delete-messages', {
+                'user': self.spammer.pk, 'since': '2024-01-02T00:00:00Z',
+                'until': '2024-01-01T00:00:00Z'}),
+        ]
+        for name, body in cases:
+            with self.subTest(name=name):
+                response = self.client.post(reverse(name), body, format='json')
+                self.assertEqual(400, response.status_code)
+        self.client.force_authenticate(self.data.users[0])
+        response = self.client.post(reverse('moderation-close-themes'),
+                                    {'themes': [1]}, format='json')
+        self.assertEqual(403, response.status_code)
+        self.assertFalse(models.Job.objects.exists())
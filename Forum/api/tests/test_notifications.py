@@ -0,0 +1,132 @@
+"""
+Модуль тестирования уведомлений
+MentionTestCase - класс с тестами разбора упоминаний
+NotificationTestCase - класс с тестами рассылки и api уведомлений
+"""
+import json
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import factories, models
+from api.notifications import MAX_MENTIONS, notify, parse_mentions
+from api.testing import FixtureTestCase
+
+
+class MentionTestCase(SimpleTestCase):
+    """Тестирование parse_mentions"""
+
+    def test_mentions(self):
+        """Упоминания без повторов, точка в конце и адреса почты не учитываются"""
+        self.assertEqual(
+            ['ivan', 'anna.k', 'petr'],
+            parse_mentions('@ivan, @anna.k. and @ivan, mail a@b.com (@petr)'))
+        self.assertEqual([], parse_mentions('a@b.com, @ alone'))
+
+    def test_limit(self):
+        """Число упоминаний ограничено MAX_MENTIONS"""
+        content = ' '.join(f'@user{i}' for i in range(MAX_MENTIONS + 5))
+        self.assertEqual(MAX_MENTIONS, len(parse_mentions(content)))
+
+
+class NotificationTestCase(FixtureTestCase):
+    """Тестирование рассылки уведомлений и api"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=4, chapters=1, categories=1, themes=1,
+                                   messages=0)
+        cls.theme = cls.data.themes[0]
+        cls.users = cls.data.users
+        cls.root = models.Message.objects.create(
+            theme=cls.theme, user=cls.users[1], content='root')
+
+    def post(self, user, content, reply_to=None):
+        return models.Message.objects.create(
+            theme=self.theme, user=user, reply_to=reply_to, content=content)
+
+    def kinds(self, message):
+        return dict(models.Notification.objects.filter(
+            message=message).values_list('user_id', 'kind'))
+
+    def test_fan_out(self):
+        """Ответ, упоминание и сообщение в теме, по одному на получателя"""
+        message = self.post(
+            self.users[2], f'@{self.users[3].username} @{self.users[2].username}',
+            reply_to=self.root)
+        notify(message.pk, batch_size=1)
+        self.assertEqual({
+            self.theme.user_id: models.Notification.THEME,
+            self.users[1].pk: models.Notification.REPLY,
+            self.users[3].pk: models.Notification.MENTION,
+        }, self.kinds(message))
+        notify(message.pk)
+        self.assertEqual(3, models.Notification.objects.filter(
+            message=message).count())
+
+    def test_enqueued_on_create(self):
+        """Создание сообщения ставит рассылку в очередь, а не выполняет ее"""
+        self.client.force_authenticate(self.users[2])
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('message-create'), {
+                'theme': self.theme.pk, 'user': self.users[2].pk,
+                'reply_to': self.root.pk, 'content': 'reply'})
+        self.assertEqual(201, response.status_code)
+        self.assertFalse(models.Notification.objects.exists())
+        with override_settings(TASKS_EAGER=True):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(models.Notification.REPLY,
+                         self.kinds(response.data['id'])[self.users[1].pk])
+
+    def test_list_keyset(self):
+        """Страницы по ключу без пропусков и повторов, фиксированное число запросов"""
+        messages = [self.post(self.users[2], f'@{self.users[1].username} {i}')
+                    for i in range(5)]
+        for message in messages:
+            notify(message.pk)
+        self.client.force_authenticate(self.users[1])
+        ids, params = [], {'limit': 2}
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse('notification-list'), params)
+            self.assertEqual(2, len(context))
+            data = json.loads(response.content)
+            self.assertEqual(5, data['unread'])
+            ids.extend(item['id'] for item in data['results'])
+            if data['next'] is None:
+                break
+            params['before'] = data['next']
+        self.assertEqual(sorted(ids, reverse=True), ids)
+        self.assertEqual(5, len(set(ids)))
+        item = data['results'][-1]
+        self.assertEqual((messages[0].pk, self.theme.pk, self.users[2].pk, 'm'),
+                         (item['message'], item['theme'], item['actor'], item['kind']))
+        for raw in ('x', '²'):
+            response = self.client.get(reverse('notification-list'),
+                                       {'before': raw})
+            self.assertEqual(400, response.status_code)
+
+    def test_mark_all_read(self):
+        """Все уведомления до up_to отмечаются прочитанными одним UPDATE"""
+        for _ in range(3):
+            notify(self.post(self.users[2], f'@{self.users[1].username}').pk)
+        ids = list(models.Notification.objects.filter(
+            user=self.users[1]).order_by('pk').values_list('pk', flat=True))
+        self.client.force_authenticate(self.users[1])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('notification-read'),
+                                        {'up_to': ids[1]})
+        self.assertEqual(1, len(context))
+        self.assertEqual(2, response.data['updated'])
+        data = json.loads(self.client.get(
+            reverse('notification-list'), {'unread': 1}).content)
+        self.assertEqual([ids[2]], [item['id'] for item in data['results']])
+        self.assertEqual(400, self.client.post(
+            reverse('notification-read'), {'up_to': '²'}).status_code)
+        self.assertEqual(1, self.client.post(
+            reverse('notification-read')).data['updated'])
+        self.assertEqual(0, models.Notification.objects.filter(
+            user=self.users[1], is_read=False).count())
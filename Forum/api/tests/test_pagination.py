@@ -0,0 +1,164 @@
+"""
+Модуль тестирования способов подсчета count в пагинации
+CountingPaginatorTestCase - класс с тестами пагинатора с неточным count
+CountStrategyTestCase - класс с тестами способов подсчета списков api
+"""
+import io
+import json
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import factories, models
+from api.archive import archive_theme
+from api.paginator import CountingPaginator
+from api.testing import FixtureTestCase
+
+
+class CountingPaginatorTestCase(SimpleTestCase):
+    """Тестирование CountingPaginator"""
+
+    def paginator(self, count, exact=False):
+        return CountingPaginator(list(range(25)), 10,
+                                 counter=lambda: (count, exact))
+
+    def test_underestimate_corrected(self):
+        """Заниженный count не мешает перейти на следующие страницы"""
+        paginator = self.paginator(5)
+        page = paginator.page(2)
+        self.assertEqual(list(range(10, 20)), list(page))
+        self.assertTrue(page.has_next())
+        self.assertEqual(21, paginator.count)
+        last = self.paginator(5).page(3)
+        self.assertFalse(last.has_next())
+        self.assertEqual(25, last.paginator.count)
+
+    def test_overestimate_corrected(self):
+        """Завышенный count становится точным на последней странице"""
+        page = self.paginator(1000).page(3)
+        self.assertEqual([20, 21, 22, 23, 24], list(page))
+        self.assertFalse(page.has_next())
+        self.assertEqual(3, page.paginator.num_pages)
+
+    def test_empty_page(self):
+        """Страница за концом данных - ошибка, пустая первая страница - нет"""
+        with self.assertRaises(EmptyPage):
+            self.paginator(1000).page(4)
+        paginator = CountingPaginator([], 10, counter=lambda: (100, False))
+        self.assertEqual([], list(paginator.page(1)))
+        self.assertEqual(0, paginator.count)
+
+    def test_exact_count(self):
+        """Точный count проверяет номер страницы как обычный Paginator"""
+        paginator = self.paginator(25, exact=True)
+        self.assertEqual(3, paginator.num_pages)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+
+class CountStrategyTestCase(FixtureTestCase):
+    """Тестирование способов подсчета списков тем и сообщений"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=2, chapters=1, categories=2, themes=2,
+                                   messages=3)
+
+    def get(self, name, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(name), params)
+        self.assertEqual(200, response.status_code)
+        counts = [query['sql'] for query in context
+                  if query['sql'].startswith('SELECT COUNT(')]
+        return json.loads(response.content), counts
+
+    def test_counter_used_for_parent_filter(self):
+        """Список сообщений темы считается по счетчику темы без COUNT(*)"""
+        theme = self.data.themes[0]
+        data, counts = self.get('message-list', {'theme': theme.pk})
+        self.assertEqual(3, data['count'])
+        self.assertEqual([], counts)
+        data, counts = self.get('theme-list',
+                                {'category': self.data.categories[0].pk})
+        self.assertEqual(2, data['count'])
+        self.assertEqual([], counts)
+
+    def test_counter_fallback(self):
+        """Без фильтра родителя или с другими фильтрами выполняется COUNT(*)"""
+        theme = self.data.themes[0]
+        for params in ({}, {'theme': theme.pk, 'id_gt': 0}):
+            with self.subTest(params=params):
+                data, counts = self.get('message-list', params)
+                self.assertEqual(len(counts), 1)
+        self.assertEqual(12, self.get('message-list', {})[0]['count'])
+
+    def test_counters_maintained(self):
+        """Создание, удаление и архивация поддерживают счетчики"""
+        theme, category = self.data.themes[0], self.data.categories[0]
+        self.client.force_authenticate(self.data.users[0])
+        self.client.post(reverse('message-create'), {
+            'theme': theme.pk, 'user': self.data.users[0].pk, 'content': 'new'})
+        self.assertEqual(4, models.ThemeCounter.objects.count_for(theme.pk))
+        models.Message.objects.filter(theme=theme).first().soft_delete()
+        self.assertEqual(3, models.ThemeCounter.objects.count_for(theme.pk))
+        models.Theme.objects.create(category=category, name='new',
+                                    user=self.data.users[0])
+        self.assertEqual(3, models.CategoryCounter.objects.count_for(category.pk))
+        theme.soft_delete()
+        theme.soft_delete()
+        self.assertEqual(2, models.CategoryCounter.objects.count_for(category.pk))
+        closed = self.data.themes[1]
+        models.Theme.objects.filter(pk=closed.pk).update(status=False)
+        closed.refresh_from_db()
+        archive_theme(closed)
+        self.assertEqual(1, models.CategoryCounter.objects.count_for(category.pk))
+
+    def test_counters_follow_moves(self):
+        """Смена категории темы и темы сообщения переносит счетчики"""
+        source, target = self.data.categories[:2]
+        theme = source.themes.first()
+        other = target.themes.first()
+        message = theme.messages.first()
+        self.client.force_authenticate(theme.user)
+        response = self.client.patch(reverse('theme-update', args=[theme.pk]),
+                                     {'category': target.pk})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual((1, 3), (
+            models.CategoryCounter.objects.count_for(source.pk),
+            models.CategoryCounter.objects.count_for(target.pk)))
+        self.client.force_authenticate(message.user)
+        response = self.client.patch(reverse('message-update', args=[message.pk]),
+                                     {'theme': other.pk})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual((2, 4), (
+            models.ThemeCounter.objects.count_for(theme.pk),
+            models.ThemeCounter.objects.count_for(other.pk)))
+        self.assertEqual(other.pk, models.MessageScore.objects.get(
+            message=message).theme_id)
+        self.assertEqual(400, self.client.get(
+            reverse('message-list'), {'theme': '²'}).status_code)
+
+    def test_missing_counter_computed(self):
+        """Отсутствующие и испорченные счетчики пересчитываются"""
+        theme = self.data.themes[0]
+        models.ThemeCounter.objects.all().delete()
+        self.assertEqual(3, models.ThemeCounter.objects.count_for(theme.pk))
+        models.CategoryCounter.objects.update(count=100)
+        call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertEqual(
+            [2, 2], list(models.CategoryCounter.objects.values_list('count', flat=True)))
+
+    def test_cached_count(self):
+        """Список архива кэширует COUNT(*) по тексту запроса"""
+        _, counts = self.get('archived-theme-list', {})
+        self.assertEqual(1, len(counts))
+        _, counts = self.get('archived-theme-list', {'page': 1})
+        self.assertEqual([], counts)
+        cache.clear()
+        _, counts = self.get('archived-theme-list', {'user': self.data.users[0].pk})
+        self.assertEqual(1, len(counts))
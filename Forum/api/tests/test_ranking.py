@@ -0,0 +1,156 @@
+"""
+Модуль тестирования рейтингов
+RankingMathTestCase - класс с тестами формул затухания
+RankingApiTestCase - класс с тестами инкрементального обновления и api
+"""
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from api import models, ranking
+from api.testing import FixtureTestCase
+
+
+class RankingMathTestCase(SimpleTestCase):
+    """Тестирование формул рейтинга"""
+
+    def test_half_life(self):
+        """Вклад события уменьшается вдвое за период полураспада"""
+        moment = ranking.EPOCH + timedelta(days=300)
+        score = ranking.event_score(1.0, moment)
+        now = moment + timedelta(hours=24)
+        with self.settings(RANKING_HALF_LIFE_HOURS=24):
+            self.assertAlmostEqual(0.5, ranking.hotness(score, now))
+
+    def test_logsumexp_large_values(self):
+        """Сумма логарифмов не переполняется на больших значениях"""
+        self.assertAlmostEqual(1000 + 0.6931471805599453,
+                               ranking.logsumexp([1000, 1000]))
+
+
+class RankingApiTestCase(FixtureTestCase):
+    """Тестирование инкрементального рейтинга и api"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user1 = User.objects.create(username='user1')
+        cls.user2 = User.objects.create(username='user2')
+        chapter = models.Chapter.objects.create(name='chapter 1')
+        category = models.Category.objects.create(
+            chapter=chapter, name='Category 1')
+        cls.theme1 = models.Theme.objects.create(
+            category=category, name='Theme 1', user=cls.user1)
+        cls.theme2 = models.Theme.objects.create(
+            category=category, name='Theme 2', user=cls.user1)
+        cls.message1 = models.Message.objects.create(
+            user=cls.user1, theme=cls.theme1, content='content 1')
+        cls.message2 = models.Message.objects.create(
+            user=cls.user1, theme=cls.theme2, content='content 2')
+        for user in (cls.user1, cls.user2):
+            models.MessageRelation.objects.create(
+                user=user, message=cls.message2)
+
+    def like(self, user, message, like=True):
+        relation = models.MessageRelation.objects.get(user=user, message=message)
+        self.client.force_login(user)
+        url = reverse('message-like', args=(relation.id,))
+        response = self.client.patch(url, data=json.dumps({'like': like}),
+                                     content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_scores_created_with_message(self):
+        """Новое сообщение получает рейтинг, тема - вклад ответа"""
+        self.assertTrue(models.MessageScore.objects.filter(
+            message=self.message1, theme=self.theme1).exists())
+        self.assertTrue(models.ThemeScore.objects.filter(
+            theme=self.theme1).exists())
+
+    def test_like_raises_rank(self):
+        """Лайки поднимают сообщение и тему в выдаче"""
+        self.like(self.user1, self.message2)
+        self.like(self.user2, self.message2)
+        response = self.client.get(reverse('theme-trending'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.theme2.id, self.theme1.id],
+                         [theme['id'] for theme in response.data])
+        self.assertGreater(response.data[0]['hotness'],
+                           response.data[1]['hotness'])
+        response = self.client.get(reverse('message-top'))
+        self.assertEqual([self.message2.id, self.message1.id],
+                         [message['id'] for message in response.data])
+
+    def test_repeated_like_counted_once(self):
+        """Повторная отправка того же лайка не меняет рейтинг"""
+        self.like(self.user1, self.message2)
+        score = models.MessageScore.objects.get(message=self.message2).score
+        self.like(self.user1, self.message2)
+        self.assertEqual(
+            score, models.MessageScore.objects.get(message=self.message2).score)
+
+    def test_unlike_subtracts(self):
+        """Снятый лайк вычитает свой вклад, повторный лайк не накручивает рейтинг"""
+        scores = (models.MessageScore.objects.get(message=self.message2).score,
+                  models.ThemeScore.objects.get(theme=self.theme2).score)
+        for _ in range(3):
+            self.like(self.user1, self.message2)
+            self.like(self.user1, self.message2, like=False)
+        self.assertAlmostEqual(scores[0], models.MessageScore.objects.get(
+            message=self.message2).score)
+        self.assertAlmostEqual(scores[1], models.ThemeScore.objects.get(
+            theme=self.theme2).score)
+
+    def test_unlike_without_moment_recomputes(self):
+        """Без момента лайка рейтинг пересчитывается полностью"""
+        self.like(self.user1, self.message2)
+        relation = models.MessageRelation.objects.get(
+            user=self.user1, message=self.message2)
+        relation.like = False
+        relation.loaded_updated_at = None
+        relation.save()
+        score = models.MessageScore.objects.get(message=self.message2).score
+        self.assertAlmostEqual(ranking.event_score(
+            ranking.MESSAGE_BASE_WEIGHT, self.message2.created_at), score)
+
+    def test_top_by_theme(self):
+        """Фильтр лучших сообщений по теме и проверка параметра"""
+        response = self.client.get(reverse('message-top'),
+                                   {'theme': self.theme1.id, 'limit': 5})
+        self.assertEqual([self.message1.id],
+                         [message['id'] for message in response.data])
+        for theme in ('abc', '²'):
+            response = self.client.get(reverse('message-top'), {'theme': theme})
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_recompute_matches_incremental(self):
+        """Полный пересчет совпадает с инкрементальными значениями"""
+        self.like(self.user1, self.message2)
+        self.like(self.user2, self.message2)
+        before = dict(models.ThemeScore.objects.values_list('theme_id', 'score'))
+        messages = dict(
+            models.MessageScore.objects.values_list('message_id', 'score'))
+        self.assertEqual(4, ranking.recompute_all(batch_size=1))
+        after = dict(models.ThemeScore.objects.values_list('theme_id', 'score'))
+        self.assertEqual(before.keys(), after.keys())
+        for theme_id, score in before.items():
+            self.assertAlmostEqual(score, after[theme_id], places=6)
+        for message_id, score in messages.items():
+            self.assertAlmostEqual(score, models.MessageScore.objects.get(
+                message_id=message_id).score, places=6)
+
+    def test_soft_delete_removes_scores(self):
+        """Удаленные тема и сообщение пропадают из рейтинга"""
+        self.message1.soft_delete()
+        self.assertFalse(models.MessageScore.objects.filter(
+            message=self.message1).exists())
+        self.theme2.soft_delete()
+        self.assertFalse(models.ThemeScore.objects.filter(
+            theme=self.theme2).exists())
+        self.assertFalse(models.MessageScore.objects.filter(
+            theme=self.theme2).exists())
+        response = self.client.get(reverse('theme-trending'))
+        self.assertEqual([self.theme1.id],
+                         [theme['id'] for theme in response.data])
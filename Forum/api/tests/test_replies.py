@@ -0,0 +1,112 @@
+"""
+Модуль тестирования ответов на сообщения
+RepliesTestCase - класс с тестами пути, счетчика ответов и ветки api
+"""
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api import factories, models
+from api.testing import FixtureTestCase
+
+
+class RepliesTestCase(FixtureTestCase):
+    """Тестирование ответов и ветки сообщения"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=2, chapters=1, categories=1, themes=2,
+                                   messages=2)
+        cls.root = cls.data.themes[0].messages.first()
+        cls.first = cls.reply(cls.root, 'first')
+        cls.second = cls.reply(cls.root, 'second')
+        cls.nested = cls.reply(cls.first, 'nested')
+
+    @classmethod
+    def reply(cls, message, content):
+        return models.Message.objects.create(
+            theme_id=message.theme_id, user=cls.data.users[0],
+            reply_to=message, content=content)
+
+    def thread(self, message, **params):
+        response = self.client.get(
+            reverse('message-thread', args=[message.pk]), params)
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.content)
+
+    def test_path_and_depth(self):
+        """Путь ответа - путь родителя и id родителя"""
+        self.assertEqual('', self.root.path)
+        self.assertEqual(self.root.subtree_prefix, self.first.path)
+        self.assertEqual(self.first.subtree_prefix, self.nested.path)
+        self.assertEqual([0, 1, 2], [self.root.depth, self.first.depth,
+                                     self.nested.depth])
+        self.assertEqual(
+            {self.first.pk, self.second.pk, self.nested.pk},
+            set(models.Message.objects.replies_of(self.root).values_list(
+                'pk', flat=True)))
+
+    def test_replies_count(self):
+        """Счетчик прямых ответов растет при ответе и падает при удалении"""
+        self.root.refresh_from_db()
+        self.assertEqual(2, self.root.replies_count)
+        self.second.soft_delete()
+        self.root.refresh_from_db()
+        self.assertEqual(1, self.root.replies_count)
+
+    def test_create_validation(self):
+        """Ответ на сообщение другой темы и слишком глубокий ответ отклоняются"""
+        self.client.force_authenticate(self.data.users[0])
+        other = self.data.themes[1]
+        response = self.client.post(reverse('message-create'), {
+            'theme': other.pk, 'user': self.data.users[0].pk,
+            'reply_to': self.root.pk, 'content': 'reply'})
+        self.assertEqual(400, response.status_code)
+        self.assertIn('reply_to', response.data)
+        deep = self.nested
+        while deep.depth < models.MAX_REPLY_DEPTH:
+            deep = self.reply(deep, 'deep')
+        response = self.client.post(reverse('message-create'), {
+            'theme': deep.theme_id, 'user': self.data.users[0].pk,
+            'reply_to': deep.pk, 'content': 'reply'})
+        self.assertEqual(400, response.status_code)
+        with self.assertRaises(ValueError):
+            self.reply(deep, 'deep')
+        response = self.client.post(reverse('message-create'), {
+            'theme': self.root.theme_id, 'user': self.data.users[0].pk,
+            'reply_to': self.first.pk, 'content': 'reply'})
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(self.first.pk, response.data['reply_to'])
+
+    def test_thread(self):
+        """Ветка возвращается вложенным деревом двумя запросами"""
+        with CaptureQueriesContext(connection) as context:
+            data = self.thread(self.root)
+        self.assertEqual(2, len(context))
+        self.assertEqual(3, data['replies_total'])
+        self.assertFalse(data['truncated'])
+        thread = data['thread']
+        self.assertEqual(self.root.pk, thread['id'])
+        self.assertEqual(2, thread['replies_count'])
+        self.assertEqual([self.first.pk, self.second.pk],
+                         [reply['id'] for reply in thread['replies']])
+        self.assertEqual([self.nested.pk],
+                         [reply['id'] for reply in thread['replies'][0]['replies']])
+        self.assertEqual(self.first.pk, self.thread(self.first)['thread']['id'])
+
+    def test_deleted_parent(self):
+        """Ответы удаленного сообщения прикрепляются к ближайшему предку"""
+        self.first.soft_delete()
+        thread = self.thread(self.root)['thread']
+        self.assertEqual([self.second.pk, self.nested.pk],
+                         sorted(reply['id'] for reply in thread['replies']))
+
+    def test_limit(self):
+        """limit ограничивает ответы, replies_total считает всю ветку"""
+        data = self.thread(self.root, limit=2)
+        self.assertTrue(data['truncated'])
+        self.assertEqual(3, data['replies_total'])
+        self.assertEqual([self.first.pk, self.second.pk],
+                         [reply['id'] for reply in data['thread']['replies']])
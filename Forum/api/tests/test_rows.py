@@ -0,0 +1,110 @@
+"""
+Модуль тестирования быстрого чтения списков через .values()
+RowMapperTestCase - класс с тестами совпадения вывода с сериализаторами
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api import factories, models, serializers
+from api.fragments import fragment_cache
+from api.rows import MessageRowMapper, RowMapper, ThemeRowMapper
+from api.testing import FixtureTestCase
+from api.views import MessageAPIList, ThemeAPIList
+
+
+class RowMapperTestCase(FixtureTestCase):
+    """Тестирование RowMapper"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=3, chapters=2, categories=2, themes=3,
+                                   messages=4, likes=2)
+        #  тема без сообщений и категория без тем
+        factories.create(models.Theme, [{'name': 'empty'}],
+                         category=cls.data.categories[0], user=cls.data.users[0])
+        factories.create(models.Category, [{'name': 'empty'}],
+                         chapter=cls.data.chapters[0])
+
+    def request(self, user=None):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def assertSameOutput(self, mapper, serializer_class, queryset, user=None):
+        request = self.request(user)
+        expected = JSONRenderer().render(serializer_class(
+            list(queryset), many=True, context={'request': request}).data)
+        actual = JSONRenderer().render(
+            mapper.map(mapper.values(queryset), request))
+        self.assertEqual(expected, actual)
+
+    def test_messages_identical(self):
+        """Строки сообщений совпадают побайтно для гостя и пользователя"""
+        queryset = MessageAPIList.queryset.all()
+        for user in (None, self.data.users[0], self.data.users[2]):
+            with self.subTest(user=user):
+                self.assertSameOutput(MessageRowMapper(),
+                                      serializers.MessageSerializer, queryset,
+                                      user or AnonymousUser())
+        liked = MessageRowMapper().map(
+            MessageRowMapper().values(queryset), self.request(self.data.users[0]))
+        self.assertTrue(all(row['liked_by_me'] for row in liked))
+
+    def test_themes_identical(self):
+        """Строки тем с вложенными категорией и разделом совпадают побайтно"""
+        self.assertSameOutput(ThemeRowMapper(), serializers.ThemeSerializer,
+                              ThemeAPIList.queryset.all())
+        self.assertSameOutput(ThemeRowMapper(), serializers.ThemeSerializer,
+                              ThemeAPIList.queryset.order_by('-id')[:2])
+
+    def test_identical_with_fragment_cache(self):
+        """Вывод совпадает с сериализатором, читающим фрагменты из кэша"""
+        queryset = MessageAPIList.queryset.all()
+        serializers.MessageSerializer(list(queryset), many=True).data
+        self.assertGreater(fragment_cache().stats()['entries'], 0)
+        self.assertSameOutput(MessageRowMapper(), serializers.MessageSerializer,
+                              queryset, AnonymousUser())
+
+    def test_identical_in_other_timezone(self):
+        """Даты переводятся в текущий часовой пояс, как в DateTimeField"""
+        with self.settings(TIME_ZONE='Asia/Yekaterinburg'), \
+                timezone.override('Asia/Yekaterinburg'):
+            self.assertSameOutput(ThemeRowMapper(), serializers.ThemeSerializer,
+                                  ThemeAPIList.queryset.all())
+            row = ThemeRowMapper().map(ThemeRowMapper().values(
+                ThemeAPIList.queryset.all()))[0]
+        self.assertTrue(row['created_at'].endswith('+05:00'))
+
+    def test_list_endpoints(self):
+        """Ответы списков с фильтрами, сортировкой и пагинацией не изменились"""
+        theme = self.data.themes[0]
+        cases = [
+            ('message-list', {'theme': theme.pk, 'ordering': '-id'},
+             serializers.MessageSerializer,
+             models.Message.objects.with_likes_count().filter(
+                 theme=theme).order_by('-id')),
+            ('theme-list', {'ordering': '-id'}, serializers.ThemeSerializer,
+             ThemeAPIList.queryset.order_by('-id')[:15]),
+        ]
+        self.client.force_authenticate(self.data.users[1])
+        for name, params, serializer_class, queryset in cases:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(200, response.status_code)
+                request = self.request(self.data.users[1])
+                expected = serializer_class(list(queryset), many=True,
+                                            context={'request': request}).data
+                self.assertEqual(JSONRenderer().render(expected),
+                                 JSONRenderer().render(response.data['results']))
+
+    def test_unsupported_field(self):
+        """Поля, которые нельзя прочитать из строки, отклоняются при компиляции"""
+        class DetailRowMapper(RowMapper):
+            serializer_class = serializers.ThemeRetrieveSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            DetailRowMapper().plan
@@ -6,59 +6,56 @@ TestSerializers - класс содержит тесты сериализато
 from django.test import TestCase
 from django.contrib.auth.models import User
 from api.models import Category, Chapter, Theme, Message, MessageRelation
-from api import serializers
-from django.contrib.auth.models import User
+from api import factories
 from api import serializers
 
 
 class TestSerializers(TestCase):
     """Тестирование сереализаторов"""
 
-    def setUp(self) -> None:
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """
+        Данные создаются один раз для класса пачками. Сериализаторам
+        производные данные (рейтинги, счетчики) не нужны, поэтому
+        factories.finish() не вызывается
+        """
         #  создаем тестовые юзеры
-        self.user1 = User.objects.create(username='user1')
-        self.user2 = User.objects.create(username='user2')
-        self.user3 = User.objects.create(username='user3')
+        cls.user1, cls.user2, cls.user3 = factories.create(
+            User, [{'username': 'user1'}, {'username': 'user2'}, {'username': 'user3'}])
 
         #  создаем тестовые разделы
-        self.chapter1 = Chapter.objects.create(
-            name='chapter 1', description='desc 1')
-        self.chapter2 = Chapter.objects.create(
-            name='chapter 2', description='desc 2')
-        self.chapter3 = Chapter.objects.create(
-            name='chapter 3', description='desc 3')
+        cls.chapter1, cls.chapter2, cls.chapter3 = factories.create(Chapter, [
+            {'name': 'chapter 1', 'description': 'desc 1'},
+            {'name': 'chapter 2', 'description': 'desc 2'},
+            {'name': 'chapter 3', 'description': 'desc 3'},
+        ])
 
         #  создаем тестовые категории
-        self.category1 = Category.objects.create(
-            chapter=self.chapter1, name='category 1', description='decs category 1')
-        self.category2 = Category.objects.create(
-            chapter=self.chapter1, name='category 2', description='decs category 2')
-        self.category3 = Category.objects.create(
-            chapter=self.chapter1, name='category 3', description='decs category 3')
+        cls.category1, cls.category2, cls.category3 = factories.create(Category, [
+            {'name': 'category 1', 'description': 'decs category 1'},
+            {'name': 'category 2', 'description': 'decs category 2'},
+            {'name': 'category 3', 'description': 'decs category 3'},
+        ], chapter=cls.chapter1)
 
         #  создаем тестовые темы
-        self.theme1 = Theme.objects.create(
-            category=self.category1, name='theme 1', user=self.user1)
-        self.theme2 = Theme.objects.create(
-            category=self.category1, name='theme 2', status=False, user=self.user2)
-        self.theme3 = Theme.objects.create(
-            category=self.category1, name='theme 3', user=self.user3)
+        cls.theme1, cls.theme2, cls.theme3 = factories.create(Theme, [
+            {'name': 'theme 1', 'user': cls.user1},
+            {'name': 'theme 2', 'status': False, 'user': cls.user2},
+            {'name': 'theme 3', 'user': cls.user3},
+        ], category=cls.category1)
 
         #  создаем сообщения для тем
-        self.message1 = Message.objects.create(
-            user=self.user1, theme=self.theme1, content='Content 1')
-        self.message2 = Message.objects.create(
-            user=self.user2, theme=self.theme1, content='Content 2')
-        self.message3 = Message.objects.create(
-            user=self.user3, theme=self.theme1, content='Content 3')
+        cls.message1, cls.message2, cls.message3 = factories.create(Message, [
+            {'user': cls.user1, 'content': 'Content 1'},
+            {'user': cls.user2, 'content': 'Content 2'},
+            {'user': cls.user3, 'content': 'Content 3'},
+        ], theme=cls.theme1)
 
         #  создаем тестовые оценки
-        self.grade1 = MessageRelation.objects.create(
-            user=self.user1, message=self.message1, like=True)
-        self.grade2 = MessageRelation.objects.create(
-            user=self.user2, message=self.message1, like=True)
-        self.grade3 = MessageRelation.objects.create(
-            user=self.user3, message=self.message1, like=True)
+        cls.grade1, cls.grade2, cls.grade3 = factories.create(MessageRelation, [
+            {'user': cls.user1}, {'user': cls.user2}, {'user': cls.user3},
+        ], message=cls.message1, like=True)
 
     def test_user_serializer(self):
         """Сереализация пользователя"""
@@ -199,8 +196,11 @@ class TestSerializers(TestCase):
             'id': self.message1.id,
             'user': self.user1.id,
             'theme': self.theme1.id,
+            'reply_to': None,
             'content': 'Content 1',
             'likes_count': 3,
+            'liked_by_me': False,
+            'replies_count': 0,
             'created_at': data.get('created_at'),
             'updated_at': data.get('updated_at')
         }
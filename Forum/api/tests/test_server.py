@@ -0,0 +1,62 @@
+"""
+Модуль тестирования сервера gunicorn (команда serve)
+ServeCommandTestCase - класс с тестами запуска, перезапуска процессов и остановки
+"""
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from api.benchmarks import _listener
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'Требуется POSIX система')
+class ServeCommandTestCase(SimpleTestCase):
+    """Тестирование команды serve"""
+
+    def get_status(self, port, path):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        try:
+            connection.request('GET', path)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_serve_recycle_and_stop(self):
+        """Сервер отвечает, заменяет процессы после max-requests и плавно останавливается"""
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ,
+                       DJANGO_SETTINGS_MODULE='Forum.settings_production',
+                       DJANGO_SECRET_KEY='test',
+                       DJANGO_ALLOWED_HOSTS='127.0.0.1',
+                       DJANGO_DATABASE_NAME=os.path.join(directory, 'db.sqlite3'))
+            #  свободный порт выбирает система, сокет передается серверу
+            with _listener() as listener:
+                server = subprocess.Popen(
+                    [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'serve',
+                     '--bind', f'fd://{listener.fileno()}', '--workers', '2',
+                     '--threads', '2', '--max-requests', '2',
+                     '--max-requests-jitter', '0'],
+                    env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    pass_fds=(listener.fileno(),))
+                try:
+                    port = listener.getsockname()[1]
+                    statuses = [self.get_status(port, '/missing/')
+                                for _ in range(10)]
+                finally:
+                    server.send_signal(signal.SIGTERM)
+                    returncode = server.wait(timeout=30)
+        self.assertEqual([404] * 10, statuses)
+        self.assertEqual(0, returncode)
+
+    def test_bad_bind(self):
+        """Адрес без порта отклоняется"""
+        with self.assertRaises(CommandError):
+            call_command('serve', bind='localhost')
@@ -0,0 +1,30 @@
+"""
+Модуль тестирования профилирования запуска
+StartupProfileTestCase - класс с тестами группировки модулей и облегченных настроек
+"""
+from django.test import SimpleTestCase
+
+from api.startup import group_of, profile
+
+
+class StartupProfileTestCase(SimpleTestCase):
+    """Тестирование профилирования запуска"""
+
+    def test_group_of(self):
+        """Модуль относится к самому длинному подходящему приложению"""
+        apps = ['django.contrib.auth', 'rest_framework', 'rest_framework.authtoken']
+        self.assertEqual('django.contrib.auth',
+                         group_of('django.contrib.auth.models', apps))
+        self.assertEqual('rest_framework.authtoken',
+                         group_of('rest_framework.authtoken.models', apps))
+        self.assertEqual('django', group_of('django.db.models', apps))
+
+    def test_api_settings_profile(self):
+        """Облегченные настройки не загружают админку, сессии и сообщения"""
+        report = profile('Forum.settings_api', runs=1)
+        self.assertGreater(report['startup_ms'], 0)
+        self.assertGreater(report['rss_mb'], 0)
+        self.assertIn('api', report['groups'])
+        for app in ('django.contrib.admin', 'django.contrib.sessions',
+                    'django.contrib.messages'):
+            self.assertNotIn(app, report['groups'])
@@ -0,0 +1,106 @@
+"""
+Модуль тестирования счетчиков пользователей
+UserStatsTestCase - класс с тестами поддержки счетчиков и api
+"""
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from api import models
+from api.jobs import run_job
+from api.testing import FixtureTestCase
+
+
+class UserStatsTestCase(FixtureTestCase):
+    """Тестирование счетчиков пользователей"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user1 = User.objects.create(username='user1')
+        cls.user2 = User.objects.create(username='user2')
+        chapter = models.Chapter.objects.create(name='chapter 1')
+        cls.category = models.Category.objects.create(
+            chapter=chapter, name='Category 1')
+        cls.theme = models.Theme.objects.create(
+            category=cls.category, name='Theme 1', user=cls.user1)
+        cls.message1 = models.Message.objects.create(
+            user=cls.user1, theme=cls.theme, content='content 1')
+        cls.message2 = models.Message.objects.create(
+            user=cls.user2, theme=cls.theme, content='content 2')
+        cls.relation = models.MessageRelation.objects.create(
+            user=cls.user2, message=cls.message1)
+
+    def stats(self, user):
+        return models.UserStats.objects.values_list(
+            'messages_count', 'themes_count', 'likes_received').get(user=user)
+
+    def set_like(self, like):
+        self.client.force_login(self.user2)
+        url = reverse('message-like', args=(self.relation.id,))
+        response = self.client.patch(url, data=json.dumps({'like': like}),
+                                     content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_counters_on_create_and_like(self):
+        """Счетчики растут при создании и лайке, снятие лайка уменьшает их"""
+        self.assertEqual((1, 1, 0), self.stats(self.user1))
+        self.assertEqual((1, 0, 0), self.stats(self.user2))
+        self.set_like(True)
+        self.set_like(True)
+        self.assertEqual((1, 1, 1), self.stats(self.user1))
+        self.set_like(False)
+        self.assertEqual((1, 1, 0), self.stats(self.user1))
+
+    def test_soft_delete(self):
+        """Мягкое удаление вычитает сообщения, темы и лайки"""
+        self.set_like(True)
+        self.message1.soft_delete()
+        self.assertEqual((0, 1, 0), self.stats(self.user1))
+        self.theme.soft_delete()
+        self.assertEqual((0, 0, 0), self.stats(self.user1))
+        self.assertEqual((0, 0, 0), self.stats(self.user2))
+
+    def test_endpoint(self):
+        """Эндпоинт отдает строку счетчиков одним запросом"""
+        url = reverse('user-stats', args=(self.user1.id,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data['messages_count'])
+        self.assertEqual(1, response.data['themes_count'])
+        response = self.client.get(reverse('user-stats', args=(999,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_missing_row_backfilled_by_command(self):
+        """Запрос не создает отсутствующую строку, ее заполняет команда"""
+        models.UserStats.objects.all().delete()
+        url = reverse('user-stats', args=(self.user1.id,))
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(0, response.data['messages_count'])
+        self.assertFalse(models.UserStats.objects.exists())
+        call_command('reconcile_user_stats', missing=True, stdout=StringIO())
+        self.assertEqual(1, self.client.get(url).data['messages_count'])
+
+    def test_reconcile_command(self):
+        """Команда исправляет расхождения после массовых операций"""
+        self.set_like(True)
+        models.UserStats.objects.update(
+            messages_count=10, themes_count=10, likes_received=10)
+        call_command('reconcile_user_stats', batch_size=1, stdout=StringIO())
+        self.assertEqual((1, 1, 1), self.stats(self.user1))
+        self.assertEqual((1, 0, 0), self.stats(self.user2))
+
+    def test_delete_category_job(self):
+        """Фоновое удаление категории вычитает ее содержимое"""
+        self.set_like(True)
+        job = models.Job.objects.create(
+            kind=models.Job.DELETE_CATEGORY, target_id=self.category.id)
+        run_job(job)
+        self.assertEqual(models.Job.DONE, job.status)
+        self.assertEqual((0, 0, 0), self.stats(self.user1))
+        self.assertEqual((0, 0, 0), self.stats(self.user2))
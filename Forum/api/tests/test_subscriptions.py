@@ -0,0 +1,115 @@
+"""
+Модуль тестирования подписок на темы
+SubscriptionTestCase - класс с тестами подписки, рассылки и дайджестов
+"""
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api import factories, models
+from api.digests import build_digests, run_digests
+from api.notifications import notify
+from api.testing import FixtureTestCase
+
+
+class SubscriptionTestCase(FixtureTestCase):
+    """Тестирование подписок на темы и дайджестов"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=3, chapters=1, categories=1, themes=3,
+                                   messages=0)
+        cls.users = cls.data.users
+        cls.reader = models.User.objects.create(username='reader')
+        cls.themes = cls.data.themes
+        since = timezone.now() - timedelta(hours=1)
+        models.ThemeSubscription.objects.bulk_create([
+            models.ThemeSubscription(user=cls.reader, theme=theme,
+                                     digested_at=since)
+            for theme in cls.themes[:2]])
+
+    def post(self, theme, user, content='new'):
+        return models.Message.objects.create(theme=theme, user=user,
+                                             content=content)
+
+    def test_watch_unwatch(self):
+        """Подписка и отписка через api, повторная подписка не дублируется"""
+        self.client.force_authenticate(self.reader)
+        url = reverse('theme-watch', args=[self.themes[2].pk])
+        self.assertEqual(201, self.client.post(url).status_code)
+        self.assertEqual(200, self.client.post(url).status_code)
+        self.assertEqual(3, self.reader.theme_subscriptions.count())
+        self.assertEqual(204, self.client.delete(url).status_code)
+        self.assertEqual(2, self.reader.theme_subscriptions.count())
+        self.assertEqual(404, self.client.post(
+            reverse('theme-watch', args=[0])).status_code)
+
+    def test_auto_subscribe(self):
+        """Автор темы и автор сообщения подписываются на тему"""
+        theme = models.Theme.objects.create(
+            category=self.data.categories[0], name='new', user=self.users[0])
+        self.post(theme, self.users[1])
+        self.assertEqual({self.users[0].pk, self.users[1].pk}, set(
+            theme.subscriptions.values_list('user_id', flat=True)))
+
+    def test_fan_out_to_subscribers(self):
+        """Уведомления о сообщении получают подписчики, кроме отписавшихся"""
+        theme = self.themes[0]
+        models.ThemeSubscription.objects.filter(
+            theme=theme, user=theme.user).delete()
+        message = self.post(theme, self.users[1])
+        notify(message.pk)
+        self.assertEqual([self.reader.pk], list(models.Notification.objects.filter(
+            message=message).values_list('user_id', flat=True)))
+
+    def test_digests(self):
+        """Дайджест пачки пользователей одним запросом, свои сообщения не считаются"""
+        for _ in range(2):
+            self.post(self.themes[0], self.users[1])
+        self.post(self.themes[1], self.reader)
+        self.post(self.themes[2], self.users[1])
+        users = [self.reader.pk] + [user.pk for user in self.users]
+        with CaptureQueriesContext(connection) as context:
+            digests = build_digests(users)
+        self.assertEqual(1, len(context))
+        self.assertEqual([{'theme': self.themes[0].pk, 'name': self.themes[0].name,
+                           'new_messages': 2, 'first_message': digests[
+                               self.reader.pk][0]['first_message']}],
+                         digests[self.reader.pk])
+        #  автор сообщений в темах 0 и 2 подписан на них, но видит только тему 1
+        self.assertEqual([self.themes[1].pk],
+                         [row['theme'] for row in digests[self.users[1].pk]])
+
+    def test_run_digests(self):
+        """Граница дайджеста сдвигается, повторная сборка пустая"""
+        self.post(self.themes[0], self.users[1])
+        delivered = {}
+        result = run_digests(delivered.update, batch_size=2)
+        self.assertEqual(self.themes[0].pk, delivered[self.reader.pk][0]['theme'])
+        self.assertEqual(models.ThemeSubscription.objects.values(
+            'user_id').distinct().count(), result['users'])
+        self.assertEqual({'users': result['users'], 'digests': 0},
+                         run_digests(delivered.update))
+        self.post(self.themes[1], self.users[2])
+        stdout = io.StringIO()
+        call_command('build_digests', stdout=stdout, stderr=io.StringIO())
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertIn({'user': self.reader.pk, 'themes': [{
+            'theme': self.themes[1].pk, 'name': self.themes[1].name,
+            'new_messages': 1, 'first_message': models.Message.objects.latest(
+                'id').pk}]}, lines)
+
+    def test_watched(self):
+        """Список подписок с числом новых сообщений"""
+        self.post(self.themes[1], self.users[1])
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(reverse('theme-watched'))
+        self.assertEqual([(self.themes[0].pk, 0), (self.themes[1].pk, 1)],
+                         [(row['theme'], row['new_messages'])
+                          for row in response.data])
@@ -0,0 +1,131 @@
+"""
+Модуль тестирования очереди задач
+TaskQueueTestCase - класс с тестами постановки, выполнения, повторов и зависших задач
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Job, Task
+from api.tasks import claim_tasks, enqueue, execute, requeue_stale, task
+
+CALLS = []
+FAILURES = []
+
+
+@task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@task('tests.fail', max_attempts=2, retry_delay=0, on_failure=FAILURES.append)
+def fail(value):
+    raise ValueError('fail')
+
+
+class TaskQueueTestCase(APITestCase):
+    """Тестирование очереди задач"""
+
+    def setUp(self) -> None:
+        CALLS.clear()
+        FAILURES.clear()
+
+    def test_enqueue_after_commit(self):
+        """Задача попадает в очередь только после фиксации транзакции"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', 1)
+            self.assertEqual(0, Task.objects.count())
+        task_obj = Task.objects.get()
+        self.assertEqual(Task.PENDING, task_obj.status)
+        self.assertEqual([1], task_obj.args)
+
+    def test_dedup_key(self):
+        """Ожидающая задача с тем же ключом не дублируется"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', 1, dedup_key='record')
+            enqueue('tests.record', 2, dedup_key='record')
+        self.assertEqual(1, Task.objects.count())
+
+    def test_worker_executes_tasks(self):
+        """Обработчик выполняет задачи и отмечает их выполненными"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', 1)
+            enqueue('tests.record', 2)
+        call_command('run_tasks', processes=0, once=True, stdout=StringIO())
+        self.assertEqual([1, 2], CALLS)
+        self.assertEqual(2, Task.objects.filter(status=Task.DONE).count())
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется до исчерпания попыток"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.fail', 3)
+        task_id = claim_tasks(10)[0]
+        with self.assertLogs('api.tasks', 'ERROR'):
+            self.assertEqual(Task.PENDING, execute(task_id))
+            self.assertEqual([task_id], claim_tasks(10))
+            self.assertEqual(Task.FAILED, execute(task_id))
+        task_obj = Task.objects.get(pk=task_id)
+        self.assertEqual(2, task_obj.attempts)
+        self.assertIn('fail', task_obj.last_error)
+        self.assertEqual([3], FAILURES)
+
+    def test_retry_conflict_fails(self):
+        """Повтор, столкнувшийся с такой же ожидающей задачей, завершается FAILED"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.fail', 1, dedup_key='fail')
+        task_id = claim_tasks(10)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.fail', 2, dedup_key='fail')
+        with self.assertLogs('api.tasks', 'ERROR'):
+            self.assertEqual(Task.FAILED, execute(task_id))
+        self.assertEqual(Task.FAILED, Task.objects.get(pk=task_id).status)
+        self.assertEqual([1], FAILURES)
+
+    def test_requeue_stale(self):
+        """Зависшие задачи возвращаются в очередь, исчерпавшие попытки - FAILED"""
+        job = Job.objects.create(kind=Job.CLOSE_THEMES, status=Job.RUNNING)
+        started_at = timezone.now() - timedelta(hours=2)
+        retry = Task.objects.create(name='tests.fail', args=[1], status=Task.RUNNING,
+                                    attempts=1, max_attempts=2, started_at=started_at)
+        exhausted = Task.objects.create(
+            name='api.run_job', args=[job.pk], status=Task.RUNNING, attempts=1,
+            max_attempts=1, started_at=started_at)
+        Task.objects.create(name='tests.record', args=[1], status=Task.RUNNING,
+                            attempts=1, started_at=timezone.now())
+        self.assertEqual((1, 1), requeue_stale(3600))
+        self.assertEqual(Task.PENDING, Task.objects.get(pk=retry.pk).status)
+        self.assertEqual(Task.FAILED, Task.objects.get(pk=exhausted.pk).status)
+        job.refresh_from_db()
+        self.assertEqual(Job.FAILED, job.status)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual((0, 0), requeue_stale(3600))
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        """В режиме TASKS_EAGER задача выполняется сразу после фиксации"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', 1)
+        self.assertEqual([1], CALLS)
+        self.assertEqual(0, Task.objects.count())
+
+    def test_metrics(self):
+        """Метрики очереди доступны администратору"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', 1)
+            enqueue('tests.record', 2)
+        execute(claim_tasks(1)[0])
+        admin = User.objects.create(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('task-metrics'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data['depth'][Task.PENDING])
+        self.assertEqual(1, response.data['depth'][Task.DONE])
+        self.assertEqual('tests.record', response.data['tasks'][0]['name'])
+        self.assertIsNotNone(response.data['tasks'][0]['avg_run_seconds'])
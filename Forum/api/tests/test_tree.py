@@ -0,0 +1,115 @@
+"""
+Модуль тестирования дерева форума
+ForumTreeTestCase - класс с тестами снимка дерева и api
+"""
+import json
+import threading
+import time
+from unittest import mock
+
+from django.urls import reverse
+
+from api import factories, models, tree
+from api.caching import shared_cache
+from api.testing import FixtureTestCase
+
+
+class ForumTreeTestCase(FixtureTestCase):
+    """Тестирование снимка дерева форума"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.data = factories.forum(users=2, chapters=2, categories=2, themes=2,
+                                   messages=3)
+
+    def get_tree(self):
+        response = self.client.get(reverse('tree'))
+        self.assertEqual(200, response.status_code)
+        return json.loads(response.content)
+
+    def test_structure_and_counts(self):
+        """Разделы с категориями и счетчиками тем и сообщений"""
+        chapters = self.get_tree()['chapters']
+        self.assertEqual([chapter.pk for chapter in self.data.chapters],
+                         [chapter['id'] for chapter in chapters])
+        category = chapters[0]['categories'][0]
+        self.assertEqual(
+            {'id': self.data.categories[0].pk, 'name': self.data.categories[0].name,
+             'description': '', 'themes_count': 2, 'messages_count': 6},
+            category)
+        self.assertEqual(4, chapters[0]['themes_count'])
+        self.assertEqual(12, chapters[0]['messages_count'])
+
+    def test_snapshot_reused(self):
+        """Повторный запрос отдается из снимка без обращения к базе"""
+        self.get_tree()
+        with self.assertNumQueries(0):
+            self.get_tree()
+
+    def test_structure_change_rebuilds(self):
+        """Изменение категории меняет версию, снимок перестраивается"""
+        version = self.get_tree()['version']
+        category = self.data.categories[0]
+        category.name = 'renamed'
+        category.save()
+        data = self.get_tree()
+        self.assertNotEqual(version, data['version'])
+        self.assertEqual('renamed', data['chapters'][0]['categories'][0]['name'])
+        models.Category.objects.create(chapter=self.data.chapters[1], name='new')
+        self.assertEqual(3, len(self.get_tree()['chapters'][1]['categories']))
+
+    def test_lost_version_rebuilds(self):
+        """Потерянный ключ версии в кэше не оставляет старый снимок"""
+        version = self.get_tree()['version']
+        shared_cache().clear()
+        self.assertNotEqual(version, self.get_tree()['version'])
+
+    def test_read_does_not_write_counters(self):
+        """Чтение дерева не пишет счетчики, отсутствующий счетчик равен нулю"""
+        category = self.data.categories[0]
+        models.CategoryCounter.objects.filter(category=category).delete()
+        models.ThemeCounter.objects.filter(theme__category=category).delete()
+        tree.bump_tree_version()
+        with self.assertNumQueries(4):
+            chapters = self.get_tree()['chapters']
+        self.assertEqual((0, 0), (chapters[0]['categories'][0]['themes_count'],
+                                  chapters[0]['categories'][0]['messages_count']))
+        self.assertFalse(models.CategoryCounter.objects.filter(
+            category=category).exists())
+
+    def test_counts_refreshed_by_age(self):
+        """Новые сообщения попадают в счетчики после TREE_COUNTS_MAX_AGE"""
+        self.get_tree()
+        models.Message.objects.create(theme=self.data.themes[0],
+                                      user=self.data.users[0], content='new')
+        category = self.get_tree()['chapters'][0]['categories'][0]
+        self.assertEqual(6, category['messages_count'])
+        with self.settings(TREE_COUNTS_MAX_AGE=0):
+            category = self.get_tree()['chapters'][0]['categories'][0]
+        self.assertEqual(7, category['messages_count'])
+
+    def test_not_modified(self):
+        """If-None-Match с текущим ETag возвращает 304"""
+        etag = self.client.get(reverse('tree'))['ETag']
+        response = self.client.get(reverse('tree'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.content)
+
+    def test_single_rebuild_for_threads(self):
+        """Устаревший снимок перестраивает один поток, остальные ждут его"""
+        tree.bump_tree_version()
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return []
+
+        with mock.patch.object(tree, 'build_tree', build):
+            threads = [threading.Thread(target=tree.current_tree)
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(1, len(calls))
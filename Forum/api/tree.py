@@ -0,0 +1,95 @@
+"""
+Дерево форума (разделы и категории со счетчиками тем и сообщений)
+из снимка в памяти процесса. Снимок общий для всех потоков процесса и
+неизменяем: ответ отрисовывается в JSON один раз при построении.
+Изменение разделов и категорий меняет версию дерева в общем кэше
+процессов (api.caching.shared_cache, случайный токен, а не счетчик, поэтому потерянный ключ кэша тоже
+приводит к перестроению), и каждый процесс при следующем запросе
+перестраивает свой снимок, сравнив версию одним чтением кэша.
+Счетчики меняются с каждым сообщением, поэтому сами версию не меняют:
+снимок со старыми счетчиками перестраивается не чаще, чем раз в
+TREE_COUNTS_MAX_AGE секунд. Счетчики поддерживают обработчики сигналов
+и команда reconcile_counters, чтение дерева их не пишет: отсутствующий
+счетчик считается нулевым
+"""
+import hashlib
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .caching import shared_cache
+from .models import Category, CategoryCounter, Chapter, ThemeCounter
+
+TREE_VERSION_KEY = 'api:tree-version'
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def tree_version():
+    """Текущая версия дерева"""
+    cache = shared_cache()
+    version = cache.get(TREE_VERSION_KEY)
+    if version is None:
+        cache.add(TREE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(TREE_VERSION_KEY)
+    return version
+
+
+def bump_tree_version():
+    """Снимки дерева во всех процессах устаревают"""
+    shared_cache().set(TREE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def build_tree():
+    """Разделы с категориями и счетчиками, по запросу на таблицу"""
+    themes = dict(CategoryCounter.objects.values_list('category_id', 'count'))
+    messages = dict(ThemeCounter.objects.filter(
+        theme__is_deleted=False).order_by().values('theme__category_id').annotate(
+        total=Sum('count')).values_list('theme__category_id', 'total'))
+    chapters = {row['id']: dict(row, themes_count=0, messages_count=0,
+                                categories=[])
+                for row in Chapter.objects.order_by('pk').values(
+                    'id', 'name', 'description')}
+    for row in Category.objects.order_by('pk').values(
+            'id', 'chapter_id', 'name', 'description'):
+        chapter = chapters[row.pop('chapter_id')]
+        row['themes_count'] = themes.get(row['id'], 0)
+        row['messages_count'] = messages.get(row['id'], 0)
+        chapter['categories'].append(row)
+        chapter['themes_count'] += row['themes_count']
+        chapter['messages_count'] += row['messages_count']
+    return list(chapters.values())
+
+
+def current_tree():
+    """
+    Снимок дерева текущей версии: version, chapters, body (JSON),
+    etag и built_at. Перестраивается одним потоком, остальные ждут его
+    """
+    global _snapshot
+    version = tree_version()
+    max_age = getattr(settings, 'TREE_COUNTS_MAX_AGE', 30)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version and \
+            time.monotonic() - snapshot.built_at < max_age:
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.version == version and \
+                time.monotonic() - snapshot.built_at < max_age:
+            return snapshot
+        #  модуль импортируется в ApiConfig.ready, DRF нужен только здесь
+        from rest_framework.renderers import JSONRenderer
+
+        built_at = time.monotonic()
+        chapters = build_tree()
+        body = JSONRenderer().render({'version': version, 'chapters': chapters})
+        _snapshot = SimpleNamespace(
+            version=version, chapters=chapters, body=body, built_at=built_at,
+            etag='"{}"'.format(hashlib.md5(body).hexdigest()))
+        return _snapshot
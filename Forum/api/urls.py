@@ -24,8 +24,15 @@ urlpatterns = [
     path('categories/create/',
          views.CategoryAPICreateUpdateDestroy.as_view(), name='category-create'),
 
+    #  дерево разделов и категорий
+    path('tree/', views.ForumTree.as_view(), name='tree'),
+
     #  urls для тем
     path('themes/', views.ThemeAPIList.as_view(), name='theme-list'),
+    path('themes/trending/', views.ThemeTrending.as_view(),
+         name='theme-trending'),
+    path('themes/watched/', views.ThemeWatched.as_view(),
+         name='theme-watched'),
     path('themes/<int:pk>/', views.ThemeAPIRetrieve.as_view(),
          name='theme-detail'),
     path('themes/update/<int:pk>/',
@@ -34,9 +41,18 @@ urlpatterns = [
          views.ThemeCreate.as_view(), name='theme-create'),
     path('themes/delete/<int:pk>/',
          views.ThemeDelete.as_view(), name='theme-delete'),
+    path('themes/<int:pk>/watch/',
+         views.ThemeWatch.as_view(), name='theme-watch'),
+
+    #  urls для архива тем
+    path('themes/archive/', views.ArchivedThemeAPIList.as_view(),
+         name='archived-theme-list'),
+    path('themes/archive/<int:pk>/', views.ArchivedThemeAPIRetrieve.as_view(),
+         name='archived-theme-detail'),
 
     #  urls для сообщений
     path('messages/', views.MessageAPIList.as_view(), name='message-list'),
+    path('messages/top/', views.MessageTop.as_view(), name='message-top'),
     path('messages/<int:pk>/', views.MessageAPIRetrieve.as_view(),
          name='message-detail'),
     path('messages/update/<int:pk>/',
@@ -45,7 +61,37 @@ urlpatterns = [
          views.MessageCreate.as_view(), name='message-create'),
     path('messages/delete/<int:pk>/',
          views.MessageDelete.as_view(), name='message-delete'),
+    path('messages/<int:pk>/history/', views.MessageHistory.as_view(),
+         name='message-history'),
+    path('messages/<int:pk>/thread/', views.MessageThread.as_view(),
+         name='message-thread'),
     
     #  urls для оценок
     path('messages/like/<int:pk>/', views.MessageRelationView.as_view(), name='message-like'),
+
+    #  urls для синхронизации клиентов
+    path('changes/', views.ChangesView.as_view(), name='changes'),
+
+    #  urls для пользователей
+    path('users/<int:pk>/stats/', views.UserStatsRetrieve.as_view(),
+         name='user-stats'),
+
+    #  urls для уведомлений
+    path('notifications/', views.NotificationList.as_view(),
+         name='notification-list'),
+    path('notifications/read/', views.NotificationRead.as_view(),
+         name='notification-read'),
+
+    #  urls для массовой модерации
+    path('moderation/themes/close/', views.ThemesClose.as_view(),
+         name='moderation-close-themes'),
+    path('moderation/themes/move/', views.ThemesMove.as_view(),
+         name='moderation-move-themes'),
+    path('moderation/messages/delete/', views.UserMessagesDelete.as_view(),
+         name='moderation-delete-messages'),
+
+    #  urls для фоновых операций
+    path('jobs/<int:pk>/', views.JobAPIRetrieve.as_view(), name='job-detail'),
+    path('tasks/metrics/', views.TaskMetricsView.as_view(),
+         name='task-metrics'),
 ]
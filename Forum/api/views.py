@@ -1,35 +1,61 @@
-from .models import Chapter, Category, Theme, Message, MessageRelation
+from .models import Chapter, Category, Theme, Message, MessageRelation, ArchivedTheme, Job, ThemeScore, MessageScore, UserStats, ChangeLog, ThemeCounter, CategoryCounter, Notification, ThemeSubscription
+from .ranking import hotness
+from .tasks import queue_metrics
+from .history import message_history, record_revision
+from .tree import current_tree
+from .digests import watched_themes
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch, Q
 from . import serializers
 from rest_framework import generics
 from rest_framework import permissions
+from rest_framework import status
 from rest_framework import mixins
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
+from .filters import MessageFilter, ThemeFilter
 from .permissions import IsOwnerOrStaff
 from .paginator import CustomPagination
+from .mixins import (BackgroundDestroyMixin, BackgroundJobMixin, BatchLookupMixin,
+                     CompressedCacheMixin, ValuesListMixin, parse_id)
+from .rows import MessageRowMapper, ThemeRowMapper
 
 
 #  представления для разделов
 class ChapterAPIList(generics.ListAPIView):
     """Получение списка разделов"""
-    queryset = Chapter.objects.all()
+    queryset = Chapter.objects.prefetch_related(
+        Prefetch('categories', queryset=Category.objects.only('id', 'chapter_id')))
     serializer_class = serializers.ChapterSerializer
 
 
 class ChapterAPIRetrieve(generics.RetrieveAPIView):
     """Получение 1 раздела"""
-    queryset = Chapter.objects.all()
+    queryset = Chapter.objects.prefetch_related(Prefetch(
+        'categories', queryset=Category.objects.select_related('chapter').prefetch_related(
+            Prefetch('chapter__categories',
+                     queryset=Category.objects.only('id', 'chapter_id')),
+            Prefetch('themes', queryset=Theme.objects.only('id', 'category_id')),
+        )))
     serializer_class = serializers.ChapterRetrieveSerializer
 
 
-class ChapterAPICreateUpdateDestroy(mixins.CreateModelMixin,
+class ChapterAPICreateUpdateDestroy(BackgroundDestroyMixin,
+                                    mixins.CreateModelMixin,
                                     mixins.UpdateModelMixin,
-                                    mixins.DestroyModelMixin,
                                     generics.GenericAPIView):
-    """Изменение и удаление раздела"""
+    """Изменение и удаление раздела (удаление выполняется в фоне)"""
     queryset = Chapter.objects.all()
     serializer_class = serializers.ChapterSerializer
     permission_classes = [permissions.IsAdminUser]
+    job_kind = Job.DELETE_CHAPTER
 
     #  методы для вызова по соответствующим методам http запросов
     def patch(self, request, *args, **kwargs):
@@ -45,7 +71,11 @@ class ChapterAPICreateUpdateDestroy(mixins.CreateModelMixin,
 #  представления для категорий
 class CategoryAPIList(generics.ListAPIView):
     """Получение списка категорий"""
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('chapter').prefetch_related(
+        Prefetch('chapter__categories',
+                 queryset=Category.objects.only('id', 'chapter_id')),
+        Prefetch('themes', queryset=Theme.objects.only('id', 'category_id')),
+    )
     serializer_class = serializers.CategorySerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['chapter']
@@ -53,18 +83,30 @@ class CategoryAPIList(generics.ListAPIView):
 
 class CategoryAPIRetrieve(generics.RetrieveAPIView):
     """Получение 1 категории"""
-    queryset = Category.objects.all()
+    queryset = Category.objects.select_related('chapter').prefetch_related(
+        Prefetch('chapter__categories',
+                 queryset=Category.objects.only('id', 'chapter_id')),
+        Prefetch('themes', queryset=Theme.objects.select_related(
+            'category__chapter').prefetch_related(
+            Prefetch('messages', queryset=Message.objects.only('id', 'theme_id')),
+            Prefetch('category__themes',
+                     queryset=Theme.objects.only('id', 'category_id')),
+            Prefetch('category__chapter__categories',
+                     queryset=Category.objects.only('id', 'chapter_id')),
+        )),
+    )
     serializer_class = serializers.CategoryRetrieveSerializer
 
 
-class CategoryAPICreateUpdateDestroy(mixins.CreateModelMixin,
+class CategoryAPICreateUpdateDestroy(BackgroundDestroyMixin,
+                                     mixins.CreateModelMixin,
                                      mixins.UpdateModelMixin,
-                                     mixins.DestroyModelMixin,
                                      generics.GenericAPIView):
-    """Изменение и удаление категории"""
+    """Изменение и удаление категории (удаление выполняется в фоне)"""
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializerChange
     permission_classes = [permissions.IsAdminUser]
+    job_kind = Job.DELETE_CATEGORY
 
     #  методы для вызова по соответствующим методам http запросов
     def patch(self, request, *args, **kwargs):
@@ -77,22 +119,94 @@ class CategoryAPICreateUpdateDestroy(mixins.CreateModelMixin,
         return self.create(request, *args, **kwargs)
 
 
+def get_limit(request, default=20, maximum=100):
+    """Размер выборки из параметра ?limit= в пределах maximum"""
+    raw = request.query_params.get('limit', default)
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({'limit': 'Ожидается целое число'})
+    return max(1, min(limit, maximum))
+
+
+def ranked(scores, queryset):
+    """
+    Объекты рейтинга в порядке убывания score: scores - пары (pk, score),
+    полученные одним проходом по индексу рейтинга
+    """
+    objects = queryset.in_bulk([pk for pk, _ in scores])
+    result = []
+    for pk, score in scores:
+        if pk in objects:
+            objects[pk].hotness = hotness(score)
+            result.append(objects[pk])
+    return result
+
+
+class ForumTree(APIView):
+    """
+    Дерево форума: разделы с категориями и счетчиками тем и сообщений
+    из снимка в памяти процесса (api.tree), поддерживает If-None-Match
+    """
+
+    def get(self, request, *args, **kwargs):
+        snapshot = current_tree()
+        if request.META.get('HTTP_IF_NONE_MATCH') == snapshot.etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot.body, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        return response
+
+
 #  представления для тем
-class ThemeAPIList(generics.ListAPIView):
-    """Получение списка тем"""
-    queryset = Theme.objects.all()
+class ThemeAPIList(BatchLookupMixin, ValuesListMixin, generics.ListAPIView):
+    """
+    Получение списка тем (строки из .values(), api.rows)
+    или пакета тем по ?ids=
+    """
+    queryset = Theme.objects.select_related('category__chapter').prefetch_related(
+        Prefetch('messages', queryset=Message.objects.only('id', 'theme_id')),
+        Prefetch('category__themes', queryset=Theme.objects.only('id', 'category_id')),
+        Prefetch('category__chapter__categories',
+                 queryset=Category.objects.only('id', 'chapter_id')),
+    )
     serializer_class = serializers.ThemeSerializer
+    row_mapper = ThemeRowMapper()
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['category', 'user', 'status']
-    ordering_fields = ['created_at']
-
-
-class ThemeAPIRetrieve(generics.RetrieveAPIView):
-    """Получение 1 темы"""
-    queryset = Theme.objects.all()
+    count_strategy = 'counter'
+    count_counters = {'category': CategoryCounter}
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = ThemeFilter
+    ordering_fields = ['id', 'created_at']
+
+
+class ThemeTrending(generics.ListAPIView):
+    """Темы с наибольшим рейтингом, ?limit= (не более 100)"""
+    queryset = ThemeAPIList.queryset
+    serializer_class = serializers.TrendingThemeSerializer
+
+    def list(self, request, *args, **kwargs):
+        scores = ThemeScore.objects.order_by('-score').values_list(
+            'theme_id', 'score')[:get_limit(request)]
+        themes = ranked(list(scores), self.get_queryset())
+        return Response(self.get_serializer(themes, many=True).data)
+
+
+class ThemeAPIRetrieve(CompressedCacheMixin, generics.RetrieveAPIView):
+    """Получение 1 темы (ответ кэшируется в сжатом виде)"""
+    cache_vary_on_user = True
+    queryset = Theme.objects.select_related('category__chapter').prefetch_related(
+        Prefetch('messages', queryset=Message.objects.with_likes_count()),
+        Prefetch('category__themes', queryset=Theme.objects.only('id', 'category_id')),
+        Prefetch('category__chapter__categories',
+                 queryset=Category.objects.only('id', 'chapter_id')),
+    )
     serializer_class = serializers.ThemeRetrieveSerializer
 
+    def get_cache_scopes(self, request):
+        return (f'theme:{self.kwargs["pk"]}',)
+
 
 class ThemeCreate(generics.CreateAPIView):
     """Создание новой темы"""
@@ -102,11 +216,42 @@ class ThemeCreate(generics.CreateAPIView):
 
 
 class ThemeDelete(generics.DestroyAPIView):
-    """Удаление темы"""
+    """Мягкое удаление темы, физически удаляет команда purge_deleted"""
     queryset = Theme.objects.all()
     serializer_class = serializers.ThemeSerializerChange
     permission_classes = [permissions.IsAdminUser]
 
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+
+class ThemeWatch(APIView):
+    """
+    Подписка текущего пользователя на тему (POST, 201 - новая подписка)
+    и отписка (DELETE)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        theme = get_object_or_404(Theme.objects.only('id'), pk=kwargs['pk'])
+        _, created = ThemeSubscription.objects.get_or_create(
+            user=request.user, theme=theme)
+        return Response({'theme': theme.pk, 'watching': True},
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        ThemeSubscription.objects.filter(
+            user=request.user, theme_id=kwargs['pk']).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ThemeWatched(APIView):
+    """Темы из подписок текущего пользователя с числом новых сообщений"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(watched_themes(request.user.pk))
+
 
 class ThemeUpdate(generics.UpdateAPIView):
     """Изменение темы"""
@@ -115,19 +260,118 @@ class ThemeUpdate(generics.UpdateAPIView):
     permission_classes = [IsOwnerOrStaff]
 
 
+#  представления для архива тем (только чтение)
+class ArchivedThemeAPIList(generics.ListAPIView):
+    """Получение списка архивных тем"""
+    queryset = ArchivedTheme.objects.defer('payload')
+    serializer_class = serializers.ArchivedThemeSerializer
+    pagination_class = CustomPagination
+    count_strategy = 'cached'
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['category', 'user']
+
+
+class ArchivedThemeAPIRetrieve(generics.RetrieveAPIView):
+    """Получение 1 архивной темы с сообщениями"""
+    queryset = ArchivedTheme.objects.all()
+    serializer_class = serializers.ArchivedThemeRetrieveSerializer
+
+
 #  представления для сообщений
-class MessageAPIList(generics.ListAPIView):
-    """Получение списка сообщений"""
-    queryset = Message.objects.all()
+class MessageAPIList(CompressedCacheMixin, BatchLookupMixin, ValuesListMixin,
+                     generics.ListAPIView):
+    """
+    Получение списка сообщений (строки из .values(), api.rows) или пакета
+    сообщений по ?ids= (ответ кэшируется в сжатом виде)
+    """
+    cache_vary_on_user = True
+    queryset = Message.objects.with_likes_count()
     serializer_class = serializers.MessageSerializer
+    row_mapper = MessageRowMapper()
     pagination_class = CustomPagination
+    count_strategy = 'counter'
+    count_counters = {'theme': ThemeCounter}
     filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = ['theme']
+    filterset_class = MessageFilter
+    ordering_fields = ['id', 'created_at', 'updated_at']
+
+    def get_cache_scopes(self, request):
+        theme = parse_id(request.query_params.get('theme', ''))
+        if theme is None or self.batch_param in request.query_params:
+            return ('messages',)
+        return (f'theme:{theme}',)
+
+
+class MessageTop(generics.ListAPIView):
+    """Сообщения с наибольшим рейтингом, ?theme= и ?limit= (не более 100)"""
+    queryset = Message.objects.with_likes_count()
+    serializer_class = serializers.TopMessageSerializer
+
+    def list(self, request, *args, **kwargs):
+        scores = MessageScore.objects.order_by('-score')
+        theme = request.query_params.get('theme')
+        if theme is not None:
+            theme_id = parse_id(theme)
+            if theme_id is None:
+                raise ValidationError({'theme': 'Ожидается id темы'})
+            scores = scores.filter(theme_id=theme_id)
+        scores = scores.values_list('message_id', 'score')[:get_limit(request)]
+        messages = ranked(list(scores), self.get_queryset())
+        return Response(self.get_serializer(messages, many=True).data)
+
+
+def nest_replies(rows, messages):
+    """
+    Вложенное дерево ветки: rows - строки с path в порядке пути
+    (первая - корень), messages - их представления. Ответ на
+    удаленное сообщение прикрепляется к ближайшему живому предку по пути
+    """
+    nodes = {}
+    for row, message in zip(rows, messages):
+        node = nodes[row['id']] = dict(message, replies=[])
+        if len(nodes) == 1:
+            continue
+        parent = nodes.get(message['reply_to'])
+        if parent is None:
+            ancestors = row['path'].rstrip('/').split('/')
+            parent = next(nodes[pk] for pk in map(int, reversed(ancestors))
+                          if pk in nodes)
+        parent['replies'].append(node)
+    return nodes[rows[0]['id']] if rows else None
+
+
+class MessageThread(generics.GenericAPIView):
+    """
+    Ветка ответов на сообщение вложенным деревом. Сообщение и ответы
+    выбираются одним запросом по префиксу пути, ?limit= ограничивает
+    число ответов (не более 1000, по порядку пути, поэтому вместе с
+    ответом всегда возвращаются его предки)
+    """
+    queryset = Message.objects.with_likes_count()
+    row_mapper = MessageRowMapper()
+
+    def get(self, request, *args, **kwargs):
+        root = get_object_or_404(Message.objects.only('id', 'path'),
+                                 pk=kwargs['pk'])
+        limit = get_limit(request, default=200, maximum=1000)
+        queryset = self.get_queryset().filter(
+            Q(pk=root.pk) | Q(path__startswith=root.subtree_prefix)).order_by(
+            'path', 'created_at')
+        rows = list(self.row_mapper.values(queryset, 'path')[:limit + 2])
+        truncated = len(rows) > limit + 1
+        rows = rows[:limit + 1]
+        total = Message.objects.replies_of(root).count() if truncated \
+            else len(rows) - 1
+        return Response({
+            'thread': nest_replies(rows, self.row_mapper.map(rows, request)),
+            'replies_total': total,
+            'truncated': truncated,
+        })
 
 
 class MessageAPIRetrieve(generics.RetrieveAPIView):
     """Получение 1 сообщения"""
-    queryset = Message.objects.all()
+    queryset = Message.objects.with_likes_count()
     serializer_class = serializers.MessageSerializer
 
 
@@ -139,20 +383,215 @@ class MessageCreate(generics.CreateAPIView):
 
 
 class MessageDelete(generics.DestroyAPIView):
-    """Удаление сообщения"""
+    """Мягкое удаление сообщения, физически удаляет команда purge_deleted"""
     queryset = Message.objects.all()
     serializer_class = serializers.MessageSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
 
 class MessageUpdate(generics.UpdateAPIView):
-    """Изменение сообщения"""
+    """Изменение сообщения с сохранением предыдущей версии в истории"""
     queryset = Message.objects.all()
     serializer_class = serializers.MessageSerializer
     permission_classes = [IsOwnerOrStaff]
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            #  строка перечитывается под блокировкой: параллельное изменение
+            #  не должно попасть между старой версией и сохранением
+            serializer.instance = Message.objects.select_for_update().get(
+                pk=serializer.instance.pk)
+            old_content = serializer.instance.content
+            old_updated_at = serializer.instance.updated_at
+            message = serializer.save()
+            record_revision(message, old_content,
+                            old_updated_at, self.request.user)
+
+
+class MessageHistory(generics.RetrieveAPIView):
+    """История изменений сообщения, версии восстанавливаются из дельт"""
+    queryset = Message.objects.all()
+    serializer_class = serializers.MessageVersionSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def retrieve(self, request, *args, **kwargs):
+        versions = message_history(self.get_object())
+        serializer = self.get_serializer(versions, many=True)
+        return Response(serializer.data)
+
+
 class MessageRelationView(generics.UpdateAPIView):
     """Реализация API для рейтинга"""
     permission_classes = [permissions.IsAuthenticated]
     queryset = MessageRelation.objects.all()
-    serializer_class = serializers.MessageRelationSerializer
\ No newline at end of file
+    serializer_class = serializers.MessageRelationSerializer
+
+
+#  представления для пользователей
+class UserStatsRetrieve(generics.RetrieveAPIView):
+    """
+    Счетчики пользователя из таблицы UserStats, без агрегации по сообщениям.
+    Строки нет у пользователя без активности (счетчики нулевые) и до
+    заполнения командой reconcile_user_stats --missing; запрос ее не создает
+    """
+    queryset = UserStats.objects.all()
+    serializer_class = serializers.UserStatsSerializer
+    lookup_field = 'user_id'
+    lookup_url_kwarg = 'pk'
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            user = get_object_or_404(User.objects.only('pk'), pk=self.kwargs['pk'])
+            return UserStats(user=user)
+
+
+class NotificationList(generics.GenericAPIView):
+    """
+    Уведомления текущего пользователя по убыванию id с постраничной
+    выдачей по ключу: ?before= - значение 'next' предыдущей страницы,
+    ?limit= (не более 100), ?unread=1 - только непрочитанные.
+    'unread' - число непрочитанных уведомлений
+    """
+    serializer_class = serializers.NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        notifications = Notification.objects.filter(user=request.user)
+        unread = notifications.filter(is_read=False)
+        page = unread if request.query_params.get('unread') in ('1', 'true') \
+            else notifications
+        raw = request.query_params.get('before')
+        if raw is not None:
+            before = parse_id(raw)
+            if before is None:
+                raise ValidationError({'before': 'Некорректный курсор'})
+            page = page.filter(pk__lt=before)
+        limit = get_limit(request)
+        items = list(page.select_related('message').only(
+            'id', 'kind', 'is_read', 'created_at', 'message__id',
+            'message__theme_id', 'message__user_id').order_by('-pk')[:limit + 1])
+        has_more = len(items) > limit
+        items = items[:limit]
+        return Response({
+            'results': self.get_serializer(items, many=True).data,
+            'next': str(items[-1].pk) if has_more else None,
+            'unread': unread.count(),
+        })
+
+
+class NotificationRead(APIView):
+    """
+    Отмечает прочитанными все уведомления текущего пользователя одним
+    UPDATE, 'up_to' - только с id не больше указанного (последнее
+    показанное клиенту), чтобы не отметить пришедшие после загрузки
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        unread = Notification.objects.filter(user=request.user, is_read=False)
+        up_to = request.data.get('up_to')
+        if up_to is not None:
+            up_to = parse_id(up_to)
+            if up_to is None:
+                raise ValidationError({'up_to': 'Ожидается id уведомления'})
+            unread = unread.filter(pk__lte=up_to)
+        return Response({'updated': unread.update(is_read=True)})
+
+
+#  представления для синхронизации клиентов
+class ChangesView(APIView):
+    """
+    Изменения после токена ?since= в порядке журнала, ?limit= (не более 1000).
+    Повторные изменения одного объекта на странице схлопываются в последнее.
+    Без since возвращается только текущий токен: клиент загружает данные
+    полностью и дальше синхронизируется от него. Ответ 410 означает, что
+    журнал после токена сокращен и нужна полная синхронизация
+    """
+
+    def get(self, request, *args, **kwargs):
+        raw = request.query_params.get('since')
+        if raw is None:
+            return Response({'changes': [], 'next': str(ChangeLog.objects.head()),
+                             'has_more': False})
+        since = parse_id(raw)
+        if since is None:
+            raise ValidationError({'since': 'Некорректный токен'})
+        if ChangeLog.objects.filter(kind=ChangeLog.RESET,
+                                    object_id__gt=since).exists():
+            return Response({
+                'detail': 'Журнал изменений сокращен, нужна полная синхронизация',
+                'next': str(ChangeLog.objects.head()),
+            }, status=status.HTTP_410_GONE)
+        limit = get_limit(request, default=100, maximum=1000)
+        rows = list(ChangeLog.objects.filter(pk__gt=since).order_by('pk').values_list(
+            'pk', 'kind', 'object_id', 'action')[:limit + 1])
+        #  записи могут фиксироваться не по порядку id, поэтому выдача
+        #  останавливается перед незакрытым пропуском id
+        count = ChangeLog.objects.settled([row[0] for row in rows[:limit]], since)
+        changes = {}
+        last = since
+        for pk, kind, object_id, action in rows[:count]:
+            last = pk
+            if kind == ChangeLog.RESET:
+                continue
+            changes.pop((kind, object_id), None)
+            changes[kind, object_id] = action
+        return Response({
+            'changes': [{'type': kind, 'id': object_id, 'action': action}
+                        for (kind, object_id), action in changes.items()],
+            'next': str(last),
+            'has_more': len(rows) > limit and last == rows[limit - 1][0],
+        })
+
+
+#  представления для массовой модерации
+class ThemesClose(BackgroundJobMixin, generics.GenericAPIView):
+    """Закрытие тем по списку id фоновой операцией"""
+    serializer_class = serializers.ThemeBulkSerializer
+    permission_classes = [permissions.IsAdminUser]
+    job_kind = Job.CLOSE_THEMES
+
+    def job_arguments(self, data):
+        return None, {'themes': sorted(set(data['themes']))}
+
+
+class ThemesMove(BackgroundJobMixin, generics.GenericAPIView):
+    """Перенос тем по списку id в категорию фоновой операцией"""
+    serializer_class = serializers.ThemeMoveSerializer
+    permission_classes = [permissions.IsAdminUser]
+    job_kind = Job.MOVE_THEMES
+
+    def job_arguments(self, data):
+        return data['category'].pk, {'themes': sorted(set(data['themes']))}
+
+
+class UserMessagesDelete(BackgroundJobMixin, generics.GenericAPIView):
+    """Удаление сообщений пользователя за промежуток времени фоновой операцией"""
+    serializer_class = serializers.UserMessagesDeleteSerializer
+    permission_classes = [permissions.IsAdminUser]
+    job_kind = Job.DELETE_USER_MESSAGES
+
+    def job_arguments(self, data):
+        return data['user'].pk, {name: data[name].isoformat()
+                                 for name in ('since', 'until') if name in data}
+
+
+#  представления для фоновых операций
+class JobAPIRetrieve(generics.RetrieveAPIView):
+    """Статус и прогресс фоновой операции"""
+    queryset = Job.objects.all()
+    serializer_class = serializers.JobSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+
+class TaskMetricsView(APIView):
+    """Метрики очереди задач: глубина и задержки выполнения"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(queue_metrics())